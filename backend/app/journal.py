@@ -0,0 +1,191 @@
+"""
+Colección con diario de solo-anexar (pedidos)
+
+En vez de reescribir orders.json en cada pedido, cada alta se agrega como una
+línea JSON a orders.ndjson (O(1) sin importar cuántos pedidos haya):
+
+- Group commit: el fsync se hace fuera del lock; los pedidos que llegan
+  mientras otro hace fsync quedan cubiertos por el siguiente, un solo fsync
+  para todos. La respuesta sale después de que su línea está en disco.
+- Índice en memoria: dict id -> pedido en orden de llegada; la lista se
+  devuelve del más nuevo al más viejo. Los lectores no toman el lock: copian
+  los valores (una sola operación en C, atómica con el GIL) y filtran sobre
+  la copia.
+- Snapshot: cada `snapshot_every` altas el diario se rota y, en un hilo
+  aparte, se copia el índice y todo se guarda en orders.json (escritura
+  atómica) y el diario rotado se borra. Al cargar: snapshot + diario rotado
+  (si quedó) + diario. Reaplicar una línea que ya está en el snapshot no
+  cambia nada, así que el snapshot puede incluir altas del diario nuevo.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .store import generate_id, read_json, select_values, write_json_atomic
+
+SNAPSHOT_EVERY = int(os.getenv("TIENDA_SNAPSHOT_EVERY", 10000))
+
+
+def read_journal(path: Path) -> List[dict]:
+    """Líneas del diario; una última línea incompleta (caída a mitad de escritura) se ignora"""
+    if not path.exists():
+        return []
+    records = []
+    with path.open(encoding="utf-8") as journal:
+        for line in journal:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+def replay(path: Path) -> Dict[str, dict]:
+    """Estado completo de la colección: snapshot + diario rotado + diario (sin abrir nada para escribir)"""
+    items = {item["id"]: item for item in reversed(read_json(path, []))}
+    for journal_path in (path.with_suffix(".ndjson.compacting"), path.with_suffix(".ndjson")):
+        for record in read_journal(journal_path):
+            items[record["id"]] = record
+    return items
+
+
+class JournaledCollection:
+    """Misma interfaz de lectura que JsonCollection, con altas en un diario"""
+
+    def __init__(self, path: Path, snapshot_every: int = None, fsync: bool = True):
+        self.path = path
+        self.journal_path = path.with_suffix(".ndjson")
+        self.rotated_path = path.with_suffix(".ndjson.compacting")
+        self.snapshot_every = snapshot_every or SNAPSHOT_EVERY
+        self.fsync = fsync
+
+        # lock: índice y escritura al diario (trabajo O(1)); sync_lock: un fsync a la vez
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self._items: Optional[Dict[str, dict]] = None
+        self._file = None
+        self._written = 0  # líneas escritas al diario actual desde que se abrió
+        self._synced = 0   # de ellas, cuántas ya pasaron por fsync
+        self._snapshot_thread: Optional[threading.Thread] = None
+
+    # === CARGA ===
+
+    @property
+    def items(self) -> Dict[str, dict]:
+        if self._items is None:
+            with self.lock:
+                return self._loaded()
+        return self._items
+
+    def _loaded(self) -> Dict[str, dict]:
+        """Snapshot + diarios, y abrir el diario para anexar (con el lock tomado)"""
+        if self._items is None:
+            items = replay(self.path)
+            self._truncate_partial_line()
+            self._file = self.journal_path.open("a", encoding="utf-8")
+            self._items = items
+        return self._items
+
+    def _truncate_partial_line(self):
+        """Quitar una línea final incompleta para que la siguiente alta no quede pegada a ella"""
+        if not self.journal_path.exists():
+            return
+        with self.journal_path.open("rb+") as journal:
+            data = journal.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                journal.truncate(end)
+
+    # === LECTURA ===
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, **where) -> List[dict]:
+        # Copia sin el lock: las altas que lleguen mientras se filtra no se ven
+        return select_values(list(self.items.values()), offset, limit, **where)
+
+    def get(self, item_id: str) -> Optional[dict]:
+        return self.items.get(item_id)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    # === ESCRITURA ===
+
+    def add(self, fields: dict) -> dict:
+        """Agregar con un id nuevo; vuelve cuando la línea está en disco"""
+        with self.lock:
+            items = self._loaded()
+            item = {"id": generate_id(items), **fields}
+            self._file.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+            items[item["id"]] = item
+            self._written += 1
+            sequence = self._written
+            generation = self._file
+            rotate = self._written >= self.snapshot_every
+        self._sync(generation, sequence)
+        if rotate:
+            self.snapshot(wait=False, min_records=self.snapshot_every)
+        return item
+
+    def _sync(self, generation, sequence: int):
+        with self.sync_lock:
+            # Otro hilo ya hizo fsync de esta línea (o el diario se rotó con ella adentro)
+            if self._file is not generation or self._synced >= sequence:
+                return
+            with self.lock:
+                self._file.flush()
+                target = self._written
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._synced = target
+
+    # === SNAPSHOT ===
+
+    def snapshot(self, wait: bool = True, min_records: int = 0):
+        """Rotar el diario y guardar todo en el snapshot (en segundo plano si wait=False)"""
+        with self.sync_lock, self.lock:
+            if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+                return
+            if self._items is not None and self._written < min_records:
+                return
+            items = self._loaded()
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            # Un diario rotado que quedó de una caída se conserva: ya está incluido en `items`
+            if self.rotated_path.exists():
+                with self.rotated_path.open("a", encoding="utf-8") as rotated:
+                    rotated.write(self.journal_path.read_text(encoding="utf-8"))
+                self.journal_path.unlink()
+            else:
+                os.replace(self.journal_path, self.rotated_path)
+            self._file = self.journal_path.open("a", encoding="utf-8")
+            self._written = self._synced = 0
+            self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=(items,), daemon=True)
+            self._snapshot_thread.start()
+        if wait:
+            self._snapshot_thread.join()
+
+    def _write_snapshot(self, items: Dict[str, dict]):
+        # Copia O(n) fuera del lock; incluye todo lo que ya estaba en el diario rotado
+        snapshot = list(items.values())
+        snapshot.reverse()
+        write_json_atomic(self.path, snapshot)
+        self.rotated_path.unlink(missing_ok=True)
+
+    def close(self):
+        """Esperar el snapshot en curso y cerrar el diario"""
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        with self.sync_lock, self.lock:
+            if self._file is not None:
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                self._items = None
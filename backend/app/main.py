@@ -1,16 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-import json
+import os
 from pathlib import Path
 
+from .journal import JournaledCollection
+from .sqlite_store import SqliteDatabase, SqliteOrders, SqliteProducts, SqliteRates
+from .store import JsonCollection, JsonDocument
+
 APP_DIR = Path(__file__).resolve().parent
-DATA_DIR = APP_DIR / "data"
+DATA_DIR = Path(os.getenv("TIENDA_DATA_DIR", APP_DIR / "data"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 PRODUCTS_FILE = DATA_DIR / "products.json"
 ORDERS_FILE = DATA_DIR / "orders.json"
 RATES_FILE = DATA_DIR / "rates.json"
+# "json" (archivos en DATA_DIR) o "sqlite" (importar antes con python -m app.sqlite_store)
+TIENDA_STORAGE = os.getenv("TIENDA_STORAGE", "json")
+SQLITE_FILE = Path(os.getenv("TIENDA_SQLITE_PATH", DATA_DIR / "tienda.db"))
+MAX_PAGE_SIZE = 500
 
 # Modelos
 class Product(BaseModel):
@@ -56,37 +64,32 @@ class Rate(BaseModel):
     COP: float
     MXN: float
 
-# Helpers de persistencia
-
-def read_json(path: Path, default):
-    if not path.exists():
-        return default
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return default
-
+# Persistencia: cada archivo se lee una vez; los cambios se guardan sin releerlo
 
-def write_json(path: Path, data):
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+DEFAULT_RATES = {"USD": 1.0, "EUR": 0.92, "COP": 4200, "MXN": 17}
 
 
-# Semilla si no existen
-if not PRODUCTS_FILE.exists():
-    write_json(PRODUCTS_FILE, [
+def seed_products() -> List[dict]:
+    return [
         {"id": "pc-01", "name": "Laptop Pro 14", "description": "Intel Core i7, 16GB RAM, 512GB SSD, 14\"", "price": 1299, "category": "computadores", "image": "https://images.unsplash.com/photo-1517336714731-489689fd1ca8?q=80&w=1200&auto=format&fit=crop"},
         {"id": "pc-02", "name": "Laptop Ultralight 13", "description": "Intel Core i5, 8GB RAM, 256GB SSD, 13\"", "price": 899, "category": "computadores", "image": "https://images.unsplash.com/photo-1518779578993-ec3579fee39f?q=80&w=1200&auto=format&fit=crop"},
         {"id": "pc-03", "name": "Desktop Gamer RTX", "description": "Ryzen 7, 32GB RAM, RTX 4070, 1TB NVMe", "price": 1999, "category": "computadores", "image": "https://images.unsplash.com/photo-1593642702821-c8da6771f0c6?q=80&w=1200&auto=format&fit=crop"},
         {"id": "sp-01", "name": "Parlantes Stereo X2", "description": "Bluetooth 5.0, Sonido 360°, Batería 12h", "price": 149, "category": "parlantes", "image": "https://images.unsplash.com/photo-1518441902113-c1d3b5d0f803?q=80&w=1200&auto=format&fit=crop"},
         {"id": "sp-02", "name": "Barra de Sonido 2.1", "description": "Subwoofer inalámbrico, HDMI ARC, 200W", "price": 299, "category": "parlantes", "image": "https://images.unsplash.com/photo-1546900703-cf06143d1239?q=80&w=1200&auto=format&fit=crop"},
         {"id": "sp-03", "name": "Parlante Portátil IPX7", "description": "Resistente al agua, USB-C, 20W", "price": 99, "category": "parlantes", "image": "https://images.unsplash.com/photo-1585386959984-a4155223168f?q=80&w=1200&auto=format&fit=crop"}
-    ])
+    ]
 
-if not ORDERS_FILE.exists():
-    write_json(ORDERS_FILE, [])
 
-if not RATES_FILE.exists():
-    write_json(RATES_FILE, {"USD": 1.0, "EUR": 0.92, "COP": 4200, "MXN": 17})
+if TIENDA_STORAGE == "sqlite":
+    database = SqliteDatabase(SQLITE_FILE, seed_products=seed_products, default_rates=DEFAULT_RATES)
+    products_store = SqliteProducts(database)
+    orders_store = SqliteOrders(database)
+    rates_store = SqliteRates(database, DEFAULT_RATES)
+else:
+    products_store = JsonCollection(PRODUCTS_FILE, seed=seed_products)
+    # Pedidos: snapshot en orders.json + diario de altas en orders.ndjson
+    orders_store = JournaledCollection(ORDERS_FILE)
+    rates_store = JsonDocument(RATES_FILE, DEFAULT_RATES)
 
 
 app = FastAPI(title="Tienda Tech API", version="1.0.0")
@@ -99,6 +102,19 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def load_stores():
+    """Cargar (o sembrar) los archivos al iniciar, no en la primera petición"""
+    len(products_store)
+    len(orders_store)
+    rates_store.get()
+
+
+@app.on_event("shutdown")
+def close_stores():
+    orders_store.close()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -106,92 +122,74 @@ def health():
 
 # Productos
 @app.get("/products", response_model=List[Product])
-def list_products():
-    data = read_json(PRODUCTS_FILE, [])
-    return data
+def list_products(category: Optional[str] = None):
+    return products_store.list(category=category)
 
 
 @app.post("/products", response_model=Product)
 def create_product(body: ProductIn):
-    products = read_json(PRODUCTS_FILE, [])
-    new_id = generate_id(products)
-    prod = {"id": new_id, **body.model_dump()}
-    products.insert(0, prod)
-    write_json(PRODUCTS_FILE, products)
-    return prod
+    return products_store.add(body.model_dump())
 
 
 @app.put("/products/{product_id}", response_model=Product)
 def update_product(product_id: str, body: ProductIn):
-    products = read_json(PRODUCTS_FILE, [])
-    idx = next((i for i, p in enumerate(products) if p["id"] == product_id), -1)
-    if idx == -1:
+    product = products_store.replace(product_id, body.model_dump())
+    if product is None:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    products[idx] = {"id": product_id, **body.model_dump()}
-    write_json(PRODUCTS_FILE, products)
-    return products[idx]
+    return product
 
 
 @app.delete("/products/{product_id}")
 def delete_product(product_id: str):
-    products = read_json(PRODUCTS_FILE, [])
-    new_list = [p for p in products if p["id"] != product_id]
-    if len(new_list) == len(products):
+    if not products_store.delete(product_id):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    write_json(PRODUCTS_FILE, new_list)
     return {"deleted": product_id}
 
 
 # Tasas
 @app.get("/rates", response_model=Rate)
 def get_rates():
-    return read_json(RATES_FILE, {"USD": 1.0, "EUR": 0.92, "COP": 4200, "MXN": 17})
+    return rates_store.get()
 
 @app.put("/rates", response_model=Rate)
 def update_rates(body: Rate):
-    write_json(RATES_FILE, body.model_dump())
+    rates_store.set(body.model_dump())
     return body
 
 
 # Pedidos
 @app.get("/orders", response_model=List[Order])
-def list_orders():
-    return read_json(ORDERS_FILE, [])
+def list_orders(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Sin limit: todos los pedidos"),
+    offset: int = Query(0, ge=0),
+    email: Optional[str] = None,
+):
+    return orders_store.list(offset=offset, limit=limit, email=email)
+
+@app.get("/orders/{order_id}", response_model=Order)
+def get_order(order_id: str):
+    order = orders_store.get(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    return order
 
 @app.post("/orders", response_model=Order)
 def create_order(body: OrderIn):
-    products = {p["id"]: p for p in read_json(PRODUCTS_FILE, [])}
     total_usd = 0.0
     for item in body.items:
-        if item.product_id not in products:
+        product = products_store.get(item.product_id)
+        if product is None:
             raise HTTPException(status_code=400, detail=f"Producto inválido: {item.product_id}")
         if item.qty <= 0:
             raise HTTPException(status_code=400, detail=f"Cantidad inválida para {item.product_id}")
-        total_usd += products[item.product_id]["price"] * item.qty
-    order = Order(
-        id=generate_id(read_json(ORDERS_FILE, [])),
-        name=body.name,
-        email=body.email,
-        address=body.address,
-        notes=body.notes,
-        currency=body.currency,
-        items=body.items,
-        total_usd=round(total_usd, 2),
-    )
-    orders = read_json(ORDERS_FILE, [])
-    orders.insert(0, order.model_dump())
-    write_json(ORDERS_FILE, orders)
-    return order
-
-
-# Utils
-
-def generate_id(existing: list) -> str:
-    import random, string
-    def rand():
-        return ''.join(random.choices(string.ascii_lowercase + string.digits, k=7))
-    ids = {item.get('id') for item in existing}
-    new_id = rand()
-    while new_id in ids:
-        new_id = rand()
-    return new_id
+        total_usd += product["price"] * item.qty
+    # El id se asigna dentro del lock del store: pedidos simultáneos no chocan
+    return orders_store.add({
+        "name": body.name,
+        "email": body.email,
+        "address": body.address,
+        "notes": body.notes,
+        "currency": body.currency,
+        "items": [item.model_dump() for item in body.items],
+        "total_usd": round(total_usd, 2),
+    })
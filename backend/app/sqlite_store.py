@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Backend SQLite de la tienda (TIENDA_STORAGE=sqlite)
+
+Alternativa a los archivos JSON con la misma interfaz que JsonCollection /
+JsonDocument, pero los filtros y la paginación los resuelve SQLite con
+índices en vez de recorrer todo en memoria:
+
+- WAL: los lectores no bloquean al escritor ni al revés.
+- Una conexión por hilo; las sentencias son constantes con parámetros, así
+  la caché de sentencias de sqlite3 las prepara una sola vez por conexión.
+- Índices: productos por categoría y pedidos por email; el orden del más
+  nuevo al más viejo sale del rowid.
+
+Importar los JSON existentes (una sola vez, desde backend/):
+    python -m app.sqlite_store --data-dir app/data --db app/data/tienda.db
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .store import generate_id
+
+PRODUCT_FIELDS = ("name", "description", "price", "category", "image")
+ORDER_FIELDS = ("name", "email", "address", "notes", "currency", "items", "total_usd")
+# Hasta cuántas veces se reintenta un id repetido (7 caracteres: casi nunca pasa)
+ID_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price REAL NOT NULL,
+    category TEXT NOT NULL,
+    image TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_products_category ON products (category);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    address TEXT NOT NULL,
+    notes TEXT,
+    currency TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_orders_email ON orders (email);
+
+CREATE TABLE IF NOT EXISTS rates (
+    currency TEXT PRIMARY KEY,
+    rate REAL NOT NULL
+);
+"""
+
+SELECT_PRODUCTS = "SELECT id, name, description, price, category, image FROM products"
+SELECT_ORDERS = "SELECT id, name, email, address, notes, currency, items, total_usd FROM orders"
+# El rowid crece con cada alta: ORDER BY rowid DESC es el más nuevo primero
+NEWEST_FIRST = " ORDER BY rowid DESC LIMIT ? OFFSET ?"
+
+
+class SqliteDatabase:
+    """Archivo SQLite con una conexión por hilo"""
+
+    def __init__(self, path: Path, seed_products: Optional[Callable[[], List[dict]]] = None,
+                 default_rates: Optional[dict] = None):
+        self.path = path
+        self.local = threading.local()
+        connection = self.connection()
+        fresh = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'products'").fetchone() is None
+        with connection:
+            connection.executescript(SCHEMA)
+        # Semilla solo al crear la base: borrar todos los productos no la repone
+        if fresh and seed_products is not None:
+            insert_products(connection, seed_products())
+        if fresh and default_rates is not None:
+            replace_rates(connection, default_rates)
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, cached_statements=256)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+
+def page_args(offset: int, limit: Optional[int]) -> tuple:
+    # LIMIT -1: sin límite en SQLite
+    return (-1 if limit is None else limit, offset)
+
+
+# ON CONFLICT ... DO UPDATE y no INSERT OR REPLACE: REPLACE borra y reinserta la
+# fila con un rowid nuevo, y reimportar subiría pedidos viejos sobre los nuevos
+UPSERT_PRODUCT = (
+    "INSERT INTO products (id, name, description, price, category, image) "
+    "VALUES (:id, :name, :description, :price, :category, :image) "
+    "ON CONFLICT (id) DO UPDATE SET name = excluded.name, description = excluded.description, "
+    "price = excluded.price, category = excluded.category, image = excluded.image"
+)
+UPSERT_ORDER = (
+    "INSERT INTO orders (id, name, email, address, notes, currency, items, total_usd) "
+    "VALUES (:id, :name, :email, :address, :notes, :currency, :items, :total_usd) "
+    "ON CONFLICT (id) DO UPDATE SET name = excluded.name, email = excluded.email, "
+    "address = excluded.address, notes = excluded.notes, currency = excluded.currency, "
+    "items = excluded.items, total_usd = excluded.total_usd"
+)
+
+
+def insert_products(connection: sqlite3.Connection, products: List[dict]):
+    """Insertar del más viejo al más nuevo (la lista viene del más nuevo primero)"""
+    with connection:
+        connection.executemany(UPSERT_PRODUCT, list(reversed(products)))
+
+
+def insert_orders(connection: sqlite3.Connection, orders: List[dict]):
+    with connection:
+        connection.executemany(
+            UPSERT_ORDER,
+            [{**order, "items": json.dumps(order["items"], ensure_ascii=False)} for order in reversed(orders)],
+        )
+
+
+def replace_rates(connection: sqlite3.Connection, rates: dict):
+    with connection:
+        connection.execute("DELETE FROM rates")
+        connection.executemany("INSERT INTO rates (currency, rate) VALUES (?, ?)", rates.items())
+
+
+class SqliteProducts:
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, category: Optional[str] = None) -> List[dict]:
+        connection = self.database.connection()
+        if category is None:
+            rows = connection.execute(SELECT_PRODUCTS + NEWEST_FIRST, page_args(offset, limit))
+        else:
+            rows = connection.execute(SELECT_PRODUCTS + " WHERE category = ?" + NEWEST_FIRST,
+                                      (category, *page_args(offset, limit)))
+        return [dict(row) for row in rows]
+
+    def get(self, item_id: str) -> Optional[dict]:
+        row = self.database.connection().execute(SELECT_PRODUCTS + " WHERE id = ?", (item_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def __len__(self) -> int:
+        return self.database.connection().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def add(self, fields: dict) -> dict:
+        connection = self.database.connection()
+        for _ in range(ID_ATTEMPTS):
+            item = {"id": generate_id(()), **{field: fields[field] for field in PRODUCT_FIELDS}}
+            try:
+                with connection:
+                    connection.execute(
+                        "INSERT INTO products (id, name, description, price, category, image) "
+                        "VALUES (:id, :name, :description, :price, :category, :image)", item
+                    )
+                return item
+            except sqlite3.IntegrityError:
+                continue
+        raise RuntimeError("No se pudo generar un id de producto único")
+
+    def replace(self, item_id: str, fields: dict) -> Optional[dict]:
+        item = {"id": item_id, **{field: fields[field] for field in PRODUCT_FIELDS}}
+        connection = self.database.connection()
+        with connection:
+            updated = connection.execute(
+                "UPDATE products SET name = :name, description = :description, price = :price, "
+                "category = :category, image = :image WHERE id = :id", item
+            ).rowcount
+        return item if updated else None
+
+    def delete(self, item_id: str) -> bool:
+        connection = self.database.connection()
+        with connection:
+            return connection.execute("DELETE FROM products WHERE id = ?", (item_id,)).rowcount > 0
+
+
+class SqliteOrders:
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    @staticmethod
+    def _order(row: sqlite3.Row) -> dict:
+        order = dict(row)
+        order["items"] = json.loads(order["items"])
+        return order
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, email: Optional[str] = None) -> List[dict]:
+        connection = self.database.connection()
+        if email is None:
+            rows = connection.execute(SELECT_ORDERS + NEWEST_FIRST, page_args(offset, limit))
+        else:
+            rows = connection.execute(SELECT_ORDERS + " WHERE email = ?" + NEWEST_FIRST,
+                                      (email, *page_args(offset, limit)))
+        return [self._order(row) for row in rows]
+
+    def get(self, item_id: str) -> Optional[dict]:
+        row = self.database.connection().execute(SELECT_ORDERS + " WHERE id = ?", (item_id,)).fetchone()
+        return self._order(row) if row is not None else None
+
+    def __len__(self) -> int:
+        return self.database.connection().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def add(self, fields: dict) -> dict:
+        connection = self.database.connection()
+        for _ in range(ID_ATTEMPTS):
+            item = {"id": generate_id(()), **{field: fields[field] for field in ORDER_FIELDS}}
+            try:
+                with connection:
+                    connection.execute(
+                        "INSERT INTO orders (id, name, email, address, notes, currency, items, total_usd) "
+                        "VALUES (:id, :name, :email, :address, :notes, :currency, :items, :total_usd)",
+                        {**item, "items": json.dumps(item["items"], ensure_ascii=False)},
+                    )
+                return item
+            except sqlite3.IntegrityError:
+                continue
+        raise RuntimeError("No se pudo generar un id de pedido único")
+
+    def close(self):
+        """Nada que vaciar: cada alta ya quedó confirmada en su transacción"""
+
+
+class SqliteRates:
+    """Como JsonDocument: si la tabla está vacía (p. ej. importada sin rates.json) se guarda `default`"""
+
+    def __init__(self, database: SqliteDatabase, default: dict):
+        self.database = database
+        self.default = default
+
+    def get(self) -> dict:
+        connection = self.database.connection()
+        rates = {currency: rate for currency, rate in connection.execute("SELECT currency, rate FROM rates")}
+        if not rates:
+            replace_rates(connection, self.default)
+            rates = dict(self.default)
+        return rates
+
+    def set(self, data: dict) -> dict:
+        replace_rates(self.database.connection(), data)
+        return data
+
+
+# === IMPORTACIÓN DESDE JSON ===
+
+def import_json(data_dir: Path, db_path: Path) -> Dict[str, int]:
+    """Copiar productos, pedidos (snapshot + diario) y tasas a SQLite; reimportar actualiza por id"""
+    from .journal import replay
+    from .store import read_json
+
+    database = SqliteDatabase(db_path)
+    connection = database.connection()
+
+    products = read_json(data_dir / "products.json", [])
+    insert_products(connection, products)
+
+    orders = list(reversed(replay(data_dir / "orders.json").values()))
+    insert_orders(connection, orders)
+
+    rates = read_json(data_dir / "rates.json", None)
+    if rates:
+        replace_rates(connection, rates)
+    return {"products": len(products), "orders": len(orders), "rates": len(rates or {})}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importar los JSON de la tienda a SQLite")
+    parser.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parent / "data")
+    parser.add_argument("--db", type=Path, default=None, help="Archivo SQLite (por defecto <data-dir>/tienda.db)")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or args.data_dir / "tienda.db"
+    print(f"📥 Importando {args.data_dir} -> {db_path}")
+    counts = import_json(args.data_dir, db_path)
+    print(f"✅ {counts['products']} productos, {counts['orders']} pedidos, {counts['rates']} tasas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Almacenamiento en memoria de la tienda
+
+Cada archivo JSON se lee una sola vez; después las lecturas salen de memoria
+(diccionarios indexados por id) y cada cambio se persiste con escritura
+atómica: archivo temporal en el mismo directorio + fsync + rename. Un lock
+por archivo serializa a los escritores, así dos peticiones simultáneas no
+pisan los cambios de la otra y un lector nunca ve un archivo a medio escribir.
+"""
+
+import json
+import os
+import random
+import string
+import tempfile
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ID_ALPHABET = string.ascii_lowercase + string.digits
+ID_LENGTH = 7
+
+
+def generate_id(existing) -> str:
+    """ID aleatorio de 7 caracteres que no esté en `existing`"""
+    new_id = ''.join(random.choices(ID_ALPHABET, k=ID_LENGTH))
+    while new_id in existing:
+        new_id = ''.join(random.choices(ID_ALPHABET, k=ID_LENGTH))
+    return new_id
+
+
+def select(items: Dict[str, dict], offset: int = 0, limit: Optional[int] = None, **where) -> List[dict]:
+    """Del más nuevo al más viejo, filtrando por igualdad (los filtros en None no aplican) y paginando"""
+    return select_values(items.values(), offset, limit, **where)
+
+
+def select_values(values, offset: int = 0, limit: Optional[int] = None, **where) -> List[dict]:
+    """`select` sobre los valores (del más viejo al más nuevo) ya copiados de la colección"""
+    where = {field: value for field, value in where.items() if value is not None}
+    matching = reversed(values)
+    if where:
+        matching = (item for item in matching if all(item.get(field) == value for field, value in where.items()))
+    return list(islice(matching, offset, None if limit is None else offset + limit))
+
+
+def read_json(path: Path, default):
+    if not path.exists():
+        return default
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return default
+
+
+def write_json_atomic(path: Path, data):
+    """Reemplazar `path` de una sola vez: o queda el contenido anterior o el nuevo"""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            json.dump(data, tmp, ensure_ascii=False, separators=(",", ":"))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class JsonCollection:
+    """
+    Lista de objetos con `id` guardada en un archivo JSON (el más nuevo primero).
+
+    En memoria es un dict id -> objeto en orden de inserción (el más viejo
+    primero). Los escritores trabajan sobre una copia y la publican solo
+    después de guardarla: los lectores no toman el lock y nunca ven un cambio
+    que no quedó en disco.
+    """
+
+    def __init__(self, path: Path, seed: Optional[Callable[[], List[dict]]] = None):
+        self.path = path
+        self.seed = seed
+        self.lock = threading.Lock()
+        self._items: Optional[Dict[str, dict]] = None
+
+    @property
+    def items(self) -> Dict[str, dict]:
+        if self._items is None:
+            with self.lock:
+                return self._loaded()
+        return self._items
+
+    def _loaded(self) -> Dict[str, dict]:
+        """Leer el archivo la primera vez (con el lock tomado)"""
+        if self._items is None:
+            if not self.path.exists() and self.seed is not None:
+                write_json_atomic(self.path, self.seed())
+            self._items = {item["id"]: item for item in reversed(read_json(self.path, []))}
+        return self._items
+
+    def _commit(self, items: Dict[str, dict]):
+        write_json_atomic(self.path, list(reversed(items.values())))
+        self._items = items
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, **where) -> List[dict]:
+        return select(self.items, offset, limit, **where)
+
+    def get(self, item_id: str) -> Optional[dict]:
+        return self.items.get(item_id)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, fields: dict) -> dict:
+        """Agregar con un id nuevo (generado bajo el lock: no se repite)"""
+        with self.lock:
+            items = dict(self._loaded())
+            item = {"id": generate_id(items), **fields}
+            items[item["id"]] = item
+            self._commit(items)
+            return item
+
+    def replace(self, item_id: str, fields: dict) -> Optional[dict]:
+        """Reemplazar conservando la posición; None si no existe"""
+        with self.lock:
+            if item_id not in self._loaded():
+                return None
+            items = dict(self._items)
+            items[item_id] = {"id": item_id, **fields}
+            self._commit(items)
+            return items[item_id]
+
+    def delete(self, item_id: str) -> bool:
+        with self.lock:
+            if item_id not in self._loaded():
+                return False
+            items = dict(self._items)
+            del items[item_id]
+            self._commit(items)
+            return True
+
+
+class JsonDocument:
+    """Un único objeto JSON (p. ej. las tasas de cambio)"""
+
+    def __init__(self, path: Path, default: dict):
+        self.path = path
+        self.default = default
+        self.lock = threading.Lock()
+        self._data: Optional[dict] = None
+
+    def get(self) -> dict:
+        if self._data is None:
+            with self.lock:
+                if self._data is None:
+                    if not self.path.exists():
+                        write_json_atomic(self.path, self.default)
+                    self._data = read_json(self.path, self.default)
+        return self._data
+
+    def set(self, data: dict) -> dict:
+        with self.lock:
+            write_json_atomic(self.path, data)
+            self._data = data
+            return data
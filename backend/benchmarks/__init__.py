@@ -0,0 +1 @@
+# Benchmarks del backend (ejecutar desde backend/: python -m benchmarks.<modulo>)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark del camino de imagen al crear una reparación (fotos de 2-8MB)
+
+- legado: is_base64_image + get_image_info + compress_image sobre el string
+  (cada llamada vuelve a decodificar el base64 y abrir la imagen)
+- pipeline: open_image una vez y el mismo buffer para validar, medir y comprimir
+
+Uso (desde backend/):
+    python -m benchmarks.bench_create_repair_images --repeat 3
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.images import encode, make_photo, to_data_uri
+from services.image_service_pillow import ImageServicePillow
+
+# (megapíxeles aproximados, calidad JPEG) para obtener fotos de ~2, ~4 y ~8MB
+PHOTO_PROFILES = {
+    '2MB': ((3264, 2448), 90),
+    '4MB': ((4032, 3024), 93),
+    '8MB': ((4624, 3468), 98),
+}
+
+
+def legacy_path(service, data_uri: str) -> str:
+    if service.is_base64_image(data_uri):
+        info = service.get_image_info(data_uri)
+        if info.get('is_large', False):
+            return service.compress_image(data_uri)
+    return data_uri
+
+
+def pipeline_path(service, data_uri: str) -> str:
+    image = service.open_image(data_uri)
+    if image.is_valid and image.is_large:
+        return service.compress_image(image)
+    return data_uri
+
+
+def measure(fn, service, data_uri: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(service, data_uri)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = ImageServicePillow()
+    print(f"{'perfil':>7} {'data URI MB':>12} {'legado ms':>10} {'pipeline ms':>12} {'ahorro':>8}")
+    for name, (size, quality) in PHOTO_PROFILES.items():
+        data_uri = to_data_uri(encode(make_photo(size), quality=quality))
+        legacy = measure(legacy_path, service, data_uri, args.repeat)
+        pipeline = measure(pipeline_path, service, data_uri, args.repeat)
+        print(f"{name:>7} {len(data_uri) / 1024 / 1024:>12.1f} {legacy * 1000:>10.1f} "
+              f"{pipeline * 1000:>12.1f} {(1 - pipeline / legacy) * 100:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
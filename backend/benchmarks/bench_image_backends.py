@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark de compresión: ImageService (ffmpeg por pipes) vs ImageServicePillow
+
+Uso (desde backend/):
+    python -m benchmarks.bench_image_backends --repeat 5
+"""
+import argparse
+import shutil
+import statistics
+import time
+
+from benchmarks.images import SIZE_CLASSES, photo_data_uri
+from services.image_service import ImageService
+from services.image_service_pillow import ImageServicePillow
+
+
+def measure(service, data_uri: str, repeat: int) -> tuple:
+    times = []
+    output = data_uri
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = service.compress_image(data_uri)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--classes", nargs="+", default=list(SIZE_CLASSES))
+    args = parser.parse_args()
+
+    backends = {"pillow": ImageServicePillow()}
+    if shutil.which("ffmpeg"):
+        backends["ffmpeg"] = ImageService()
+    else:
+        print("⚠️  ffmpeg no está instalado: solo se mide Pillow")
+
+    print(f"{'clase':>8} {'entrada KB':>11} " + " ".join(f"{name + ' ms':>10} {name + ' KB':>10}" for name in backends))
+    for size_class in args.classes:
+        data_uri = photo_data_uri(size_class)
+        row = f"{size_class:>8} {len(data_uri) / 1024:>11.0f} "
+        for service in backends.values():
+            median, output_size = measure(service, data_uri, args.repeat)
+            row += f"{median * 1000:>10.1f} {output_size / 1024:>10.0f} "
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
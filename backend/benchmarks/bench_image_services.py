@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks de los servicios de imágenes
+
+Mide ImageServicePillow e ImageService (ffmpeg, si está instalado) en cada
+operación pública sobre una matriz de entradas: clases de tamaño, formatos
+(JPEG, PNG con alfa, PNG con paleta) y orientaciones EXIF.
+
+Por cada (backend, operación, entrada) se reporta la mediana de tiempo y el
+pico de memoria de Python (tracemalloc, en una corrida aparte para no
+distorsionar el tiempo; los buffers internos de Pillow no se cuentan).
+El placeholder se mide en frío (caché vaciada en cada repetición).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_image_services --repeat 5
+    python -m benchmarks.bench_image_services --classes small medium large --json benchmarks/results/images.json
+"""
+import argparse
+import json
+import shutil
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from PIL import Image
+
+from benchmarks.images import SIZE_CLASSES, encode, make_photo, to_data_uri
+from services.image_service import ImageService
+from services.image_service_pillow import ImageServicePillow
+from services.placeholders import render_placeholder
+
+EXIF_ORIENTATION_TAG = 0x0112
+# Sin rotación, 90° horario y 90° antihorario (las de las fotos de celular)
+ORIENTATIONS = (1, 6, 8)
+FORMATS = ('jpeg', 'png-rgba', 'png-p')
+
+OPERATIONS = {
+    'is_base64_image': lambda service, data_uri: service.is_base64_image(data_uri),
+    'get_image_info': lambda service, data_uri: service.get_image_info(data_uri),
+    'compress_image': lambda service, data_uri: service.compress_image(data_uri),
+    'create_thumbnail': lambda service, data_uri: service.create_thumbnail(data_uri),
+    'create_placeholder_image': lambda service, data_uri: service.create_placeholder_image("Equipo #1"),
+}
+# Operaciones que no dependen de la entrada: se miden una sola vez por backend
+INPUT_INDEPENDENT = {'create_placeholder_image'}
+
+
+def make_inputs(classes, formats) -> dict:
+    """{nombre: data URI} para la matriz pedida"""
+    inputs = {}
+    for size_class in classes:
+        photo = make_photo(SIZE_CLASSES[size_class], seed=1)
+        if 'jpeg' in formats:
+            for orientation in ORIENTATIONS:
+                exif = Image.Exif()
+                exif[EXIF_ORIENTATION_TAG] = orientation
+                inputs[f"{size_class}/jpeg/o{orientation}"] = to_data_uri(encode(photo, 'JPEG', exif=exif))
+        if 'png-rgba' in formats:
+            rgba = photo.convert('RGBA')
+            rgba.putalpha(Image.linear_gradient('L').resize(photo.size))
+            inputs[f"{size_class}/png-rgba"] = to_data_uri(encode(rgba, 'PNG'), 'image/png')
+        if 'png-p' in formats:
+            palette = photo.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+            inputs[f"{size_class}/png-p"] = to_data_uri(encode(palette, 'PNG'), 'image/png')
+    return inputs
+
+
+def measure(operation, service, data_uri: str, repeat: int, cold_cache: bool) -> dict:
+    times = []
+    for _ in range(repeat):
+        if cold_cache:
+            render_placeholder.cache_clear()
+        start = time.perf_counter()
+        operation(service, data_uri)
+        times.append(time.perf_counter() - start)
+
+    if cold_cache:
+        render_placeholder.cache_clear()
+    tracemalloc.start()
+    try:
+        operation(service, data_uri)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--classes", nargs="+", default=['small', 'medium'], choices=list(SIZE_CLASSES))
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--operations", nargs="+", default=list(OPERATIONS), choices=list(OPERATIONS))
+    parser.add_argument("--json", type=Path, default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    backends = {"pillow": ImageServicePillow()}
+    if shutil.which("ffmpeg"):
+        backends["ffmpeg"] = ImageService()
+    else:
+        print("⚠️  ffmpeg no está instalado: solo se mide Pillow")
+
+    inputs = make_inputs(args.classes, args.formats)
+    results = []
+    print(f"{'backend':<8} {'operación':<26} {'entrada':<20} {'KB':>7} {'mediana ms':>11} {'pico KB':>9}")
+    for backend, service in backends.items():
+        for name in args.operations:
+            operation = OPERATIONS[name]
+            if not hasattr(service, name):
+                continue
+            cases = {'-': ''} if name in INPUT_INDEPENDENT else inputs
+            for input_name, data_uri in cases.items():
+                result = measure(operation, service, data_uri, args.repeat, cold_cache=name in INPUT_INDEPENDENT)
+                results.append({'backend': backend, 'operation': name, 'input': input_name,
+                                'input_kb': round(len(data_uri) / 1024, 1), **result})
+                print(f"{backend:<8} {name:<26} {input_name:<20} {len(data_uri) / 1024:>7.0f} "
+                      f"{result['median_ms']:>11.2f} {result['peak_kb']:>9.0f}")
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps({'repeat': args.repeat, 'results': results}, indent=2))
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
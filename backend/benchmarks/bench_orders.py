@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark de creación de pedidos de la tienda con historial grande
+
+Siembra un orders.json con --history pedidos y mide el alta de pedidos con:
+
+- original:  releer y reparsear el archivo y reescribirlo completo con indent=2
+- rewrite:   JsonCollection (en memoria, reescritura atómica del archivo)
+- journal:   JournaledCollection (diario NDJSON con group commit y snapshots)
+- journal xN: el mismo diario con N hilos en paralelo (un fsync cubre varias altas)
+
+Reporta la carga inicial y p50/p99 por alta. Las estrategias que reescriben el
+archivo son O(historial) por alta: se miden con menos operaciones (--slow-ops).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_orders --history 100000
+    python -m benchmarks.bench_orders --history 100000 --ops 2000 --threads 16 --no-fsync
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.journal import JournaledCollection
+from app.store import JsonCollection, generate_id, read_json
+
+PRODUCT_IDS = ("pc-01", "pc-02", "pc-03", "sp-01", "sp-02", "sp-03")
+
+
+def make_order(rng: random.Random, i: int) -> dict:
+    return {
+        "name": f"Cliente {i}",
+        "email": f"cliente{i}@example.com",
+        "address": f"Calle {rng.randrange(1, 200)} # {rng.randrange(1, 99)}-{rng.randrange(1, 99)}",
+        "notes": None,
+        "currency": rng.choice(("USD", "COP", "EUR", "MXN")),
+        "items": [{"product_id": rng.choice(PRODUCT_IDS), "qty": rng.randrange(1, 4)}
+                  for _ in range(rng.randrange(1, 4))],
+        "total_usd": round(rng.uniform(50, 3000), 2),
+    }
+
+
+def seed_history(path: Path, count: int, seed: int):
+    rng = random.Random(seed)
+    ids = set()
+    orders = []
+    for i in range(count):
+        order_id = generate_id(ids)
+        ids.add(order_id)
+        orders.append({"id": order_id, **make_order(rng, i)})
+    orders.reverse()  # el más nuevo primero, como lo guarda la API
+    path.write_text(json.dumps(orders, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+class OriginalOrders:
+    """Lo que hacía create_order antes: leer dos veces, insertar al inicio y reescribir"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def add(self, fields: dict) -> dict:
+        item = {"id": generate_id({o["id"] for o in read_json(self.path, [])}), **fields}
+        orders = read_json(self.path, [])
+        orders.insert(0, item)
+        self.path.write_text(json.dumps(orders, ensure_ascii=False, indent=2), encoding="utf-8")
+        return item
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[max(0, round(p / 100 * len(sorted_values)) - 1)]
+
+
+def run(name: str, make_store, path: Path, ops: int, threads: int, seed: int) -> dict:
+    started = time.perf_counter()
+    store = make_store(path)
+    if hasattr(store, "items"):
+        store.items  # carga inicial (snapshot + diario)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(seed)
+    payloads = [make_order(rng, i) for i in range(ops)]
+
+    def timed_add(fields):
+        op_started = time.perf_counter()
+        store.add(fields)
+        return time.perf_counter() - op_started
+
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(timed_add, payloads))
+    else:
+        latencies = [timed_add(fields) for fields in payloads]
+    elapsed = time.perf_counter() - started
+    if hasattr(store, "close"):
+        store.close()  # espera el snapshot en curso
+
+    latencies.sort()
+    return {
+        'strategy': name,
+        'ops': ops,
+        'threads': threads,
+        'load_ms': round(load_ms, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'ops_per_s': round(ops / elapsed, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=100000, help="Pedidos históricos sembrados")
+    parser.add_argument("--ops", type=int, default=1000, help="Altas medidas con el diario")
+    parser.add_argument("--slow-ops", type=int, default=10, help="Altas medidas con las estrategias que reescriben")
+    parser.add_argument("--threads", type=int, default=8, help="Hilos para la corrida concurrente del diario")
+    parser.add_argument("--no-fsync", action="store_true", help="Diario sin fsync (mide solo el costo de CPU)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_orders_"))
+    history = workdir / "history.json"
+    print(f"🌱 Sembrando {args.history} pedidos históricos...")
+    seed_history(history, args.history, args.seed)
+    print(f"   orders.json: {history.stat().st_size / 1024 / 1024:.1f}MB")
+
+    fsync = not args.no_fsync
+    scenarios = [
+        ("original", OriginalOrders, args.slow_ops, 1),
+        ("rewrite", JsonCollection, args.slow_ops, 1),
+        ("journal", lambda path: JournaledCollection(path, fsync=fsync), args.ops, 1),
+        (f"journal x{args.threads}", lambda path: JournaledCollection(path, fsync=fsync), args.ops, args.threads),
+    ]
+
+    results = []
+    try:
+        print(f"\n{'estrategia':<14} {'altas':>6} {'carga ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'altas/s':>9}")
+        for index, (name, make_store, ops, threads) in enumerate(scenarios):
+            # Cada estrategia parte de una copia del mismo historial
+            path = workdir / str(index) / "orders.json"
+            path.parent.mkdir()
+            shutil.copy(history, path)
+            result = run(name, make_store, path, ops, threads, args.seed)
+            results.append(result)
+            print(f"{name:<14} {ops:>6} {result['load_ms']:>9} {result['p50_ms']:>9} "
+                  f"{result['p99_ms']:>9} {result['ops_per_s']:>9}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps({'history': args.history, 'fsync': fsync, 'results': results}, indent=2))
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
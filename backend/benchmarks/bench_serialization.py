@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de GET /api/repairs
+
+Compara el camino estándar (objetos ORM -> RepairCardResponse -> encoder JSON
+de FastAPI) con la serialización rápida de tuplas de serializers.py.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serialization --sizes 500 5000 --repeat 5
+"""
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite:///./repair_cards.db")
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, RepairCard
+from schemas import RepairCardResponse
+from serializers import REPAIR_COLUMNS, serialize_repair_rows
+
+response_adapter = TypeAdapter(List[RepairCardResponse])
+
+
+def make_session(size: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    db.add_all([
+        RepairCard(
+            owner_name=f"Cliente {i}",
+            problem_type="Pantalla rota",
+            whatsapp_number=f"+57300{i:07d}",
+            due_date=now + timedelta(days=i % 10),
+            description="Equipo con golpe en la esquina superior",
+            status="ingresado",
+            priority="normal",
+            estimated_cost=Decimal("120000.00"),
+            actual_cost=Decimal("0"),
+            image_url="",
+            has_charger=bool(i % 2),
+            created_at=now,
+            updated_at=now,
+            notes=[{"content": "Nota de prueba", "author": "Sistema", "type": "user_note"}],
+        )
+        for i in range(size)
+    ])
+    db.commit()
+    return db
+
+
+def standard_path(db) -> bytes:
+    repairs = db.query(RepairCard).order_by(RepairCard.created_at.desc()).all()
+    validated = response_adapter.validate_python(repairs, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_path(db) -> bytes:
+    rows = db.query(*REPAIR_COLUMNS).order_by(RepairCard.created_at.desc()).all()
+    return serialize_repair_rows(rows)
+
+
+def timed(fn, db, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        fn(db)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tarjetas':>9} {'estándar (ms)':>14} {'rápido (ms)':>12} {'speedup':>8}")
+    for size in args.sizes:
+        db = make_session(size)
+        standard = timed(standard_path, db, args.repeat)
+        fast = timed(fast_path, db, args.repeat)
+        print(f"{size:>9} {standard * 1000:>14.1f} {fast * 1000:>12.1f} {standard / fast:>7.1f}x")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Imágenes sintéticas para benchmarks (fotos "de celular" con detalle y ruido)
+"""
+import base64
+import io
+import random
+from typing import Tuple
+
+from PIL import Image, ImageDraw, ImageFilter
+
+# Clases de tamaño representativas de lo que suben los técnicos
+SIZE_CLASSES = {
+    'small': (640, 480),
+    'medium': (1600, 1200),
+    'large': (4032, 3024),  # 12MP
+}
+
+
+def make_photo(size: Tuple[int, int], seed: int = 0, mode: str = 'RGB') -> Image.Image:
+    """Imagen con degradado, figuras y ruido para que comprima como una foto real"""
+    rng = random.Random(seed)
+    width, height = size
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 4 + 1), y0 + rng.randrange(height // 4 + 1)
+        draw.ellipse([x0, y0, x1, y1], fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    # Ruido del mismo generador: Image.effect_noise no acepta semilla
+    noise = Image.frombytes('L', size, rng.randbytes(width * height)).convert('RGB')
+    img = Image.blend(img, noise, 0.25).filter(ImageFilter.SMOOTH)
+    return img.convert(mode) if mode != 'RGB' else img
+
+
+def encode(img: Image.Image, format: str = 'JPEG', **save_kwargs) -> bytes:
+    buffer = io.BytesIO()
+    if format == 'JPEG':
+        save_kwargs.setdefault('quality', 92)
+    img.save(buffer, format=format, **save_kwargs)
+    return buffer.getvalue()
+
+
+def to_data_uri(data: bytes, mime: str = 'image/jpeg') -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def photo_data_uri(size_class: str, seed: int = 0) -> str:
+    """Data URI JPEG para una clase de tamaño"""
+    return to_data_uri(encode(make_photo(SIZE_CLASSES[size_class], seed)))
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga reproducible de la API de reparaciones
+
+Siembra una base local con un taller sintético, levanta la API con uvicorn en
+el mismo proceso y ejecuta escenarios realistas con N usuarios concurrentes:
+
+- board:  carga del tablero (lista + las primeras fotos visibles)
+- search: búsqueda mientras se escribe (una petición por tecla)
+- status: arrastrar una tarjeta a otra columna
+- upload: subir la foto de una reparación (multipart)
+- stats:  consulta periódica de estadísticas
+
+Reporta throughput y latencias p50/p95/p99 por petición en JSON, para comparar
+contra el resultado de otro commit con --baseline.
+
+Uso (desde backend/):
+    python -m benchmarks.load_test --cards 2000 --concurrency 20 --iterations 30
+    python -m benchmarks.load_test --baseline benchmarks/results/loadtest-abc1234.json
+    python -m benchmarks.load_test --database-url postgresql://.../bench --reset
+"""
+import os
+
+# La base y las opciones de la API se fijan antes de importar main
+LOADTEST_DATABASE = "loadtest.db"
+os.environ.setdefault("IMAGE_SCAN_ON_STARTUP", "false")
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Peso de cada escenario en la mezcla por defecto
+DEFAULT_MIX = {'board': 3, 'search': 4, 'status': 3, 'upload': 1, 'stats': 2}
+STATUSES = ('ingresado', 'diagnosticada', 'para-entregar', 'listos')
+SEARCH_TERMS = ('pantalla', 'bateria', 'maria', 'juan', 'teclado', 'carga')
+BOARD_VISIBLE_IMAGES = 6
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    latencies = sorted(latency for latency, ok in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Escenario desconocido: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# === SERVIDOR ===
+
+class InProcessServer:
+    """uvicorn en un hilo del mismo proceso"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("uvicorn no pudo iniciar")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+# === ESCENARIOS ===
+
+class LoadTest:
+    def __init__(self, base_url: str, repair_ids: list, upload_photo: bytes, mix: dict,
+                 concurrency: int, iterations: int, seed: int):
+        self.base_url = base_url
+        self.repair_ids = repair_ids
+        self.upload_photo = upload_photo
+        self.mix = mix
+        self.concurrency = concurrency
+        self.iterations = iterations
+        self.seed = seed
+        # nombre de la petición -> [(latencia, ok)]
+        self.samples = {}
+
+    async def request(self, client, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.samples.setdefault(name, []).append((time.perf_counter() - started, ok))
+        return response
+
+    async def board(self, client, rng):
+        response = await self.request(client, 'board.list', 'GET', '/api/repairs')
+        repairs = response.json() if response is not None and response.status_code == 200 else []
+        # Como el frontend: solo se piden las fotos de las tarjetas que tienen
+        visible = [repair['id'] for repair in repairs if repair.get('image_url')][:BOARD_VISIBLE_IMAGES]
+        await asyncio.gather(*(
+            self.request(client, 'board.image', 'GET', f'/api/images/{repair_id}',
+                         headers={'Accept': 'image/avif,image/webp,*/*'})
+            for repair_id in visible
+        ))
+
+    async def search(self, client, rng):
+        term = rng.choice(SEARCH_TERMS)
+        for length in range(2, len(term) + 1):
+            await self.request(client, 'search', 'GET', '/api/repairs/search', params={'q': term[:length]})
+
+    async def status(self, client, rng):
+        repair_id = rng.choice(self.repair_ids)
+        await self.request(client, 'status', 'PATCH', f'/api/repairs/{repair_id}/status',
+                           json={'status': rng.choice(STATUSES)})
+
+    async def upload(self, client, rng):
+        repair_id = rng.choice(self.repair_ids)
+        await self.request(client, 'upload', 'POST', f'/api/repairs/{repair_id}/image',
+                           files={'file': ('foto.jpg', self.upload_photo, 'image/jpeg')})
+
+    async def stats(self, client, rng):
+        await self.request(client, 'stats', 'GET', '/api/stats')
+
+    async def user(self, client, index: int):
+        rng = random.Random(self.seed + index)
+        names, weights = zip(*self.mix.items())
+        for _ in range(self.iterations):
+            await getattr(self, rng.choices(names, weights)[0])(client, rng)
+
+    async def run(self) -> float:
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.concurrency * 2)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(self.user(client, i) for i in range(self.concurrency)))
+            return time.perf_counter() - started
+
+
+# === REPORTE ===
+
+def print_report(report: dict, baseline: dict = None):
+    print(f"\n📊 {report['total']['requests']} peticiones en {report['elapsed_s']}s "
+          f"({report['total']['throughput_rps']} req/s, {report['total']['errors']} errores)")
+    header = f"{'petición':<14} {'n':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + ("   Δp95     Δreq/s" if baseline else ""))
+    for name, row in sorted(report['requests'].items()) + [('TOTAL', report['total'])]:
+        line = (f"{name:<14} {row['requests']:>6} {row['errors']:>4} {row['throughput_rps']:>8} "
+                f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+        previous = baseline and (baseline['total'] if name == 'TOTAL' else baseline['requests'].get(name))
+        if previous:
+            line += f" {_delta(row['p95_ms'], previous['p95_ms']):>8} {_delta(row['throughput_rps'], previous['throughput_rps']):>9}"
+        print(line)
+
+
+def _delta(current: float, previous: float) -> str:
+    return f"{(current - previous) / previous * 100:+.1f}%" if previous else "n/a"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None,
+                        help=f"Base a usar (por defecto sqlite:///./{LOADTEST_DATABASE}, recreada en cada corrida)")
+    parser.add_argument("--reset", action="store_true", help="Vaciar las tablas de --database-url antes de sembrar")
+    parser.add_argument("--cards", type=int, default=1000, help="Reparaciones a sembrar")
+    parser.add_argument("--image-size", default="small", help="Clase de tamaño de las fotos (tiny, small, medium, large)")
+    parser.add_argument("--image-ratio", type=float, default=0.8, help="Fracción de reparaciones con foto")
+    parser.add_argument("--notes", type=int, default=3, help="Notas promedio por reparación")
+    parser.add_argument("--years", type=float, default=0.2,
+                        help="Años de historia (pocos: la mayoría de tarjetas sigue activa en el tablero)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Usuarios concurrentes")
+    parser.add_argument("--iterations", type=int, default=20, help="Escenarios por usuario")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Pesos, p. ej. board=3,search=4,upload=0")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="Archivo JSON del resultado")
+    parser.add_argument("--baseline", type=Path, default=None, help="Resultado anterior para comparar")
+    args = parser.parse_args(argv)
+
+    if args.database_url is None:
+        Path(LOADTEST_DATABASE).unlink(missing_ok=True)
+        os.environ["DATABASE_URL"] = f"sqlite:///./{LOADTEST_DATABASE}"
+        args.reset = True
+    else:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from database import DATABASE_URL, engine
+
+    # database cae a SQLite local si no puede conectar: nunca tocar otra base que la pedida
+    if DATABASE_URL != os.environ["DATABASE_URL"]:
+        raise SystemExit(f"❌ La API no usa la base de la prueba de carga ({engine.url}); se cancela")
+
+    import main as api
+    from benchmarks.images import SIZE_CLASSES, encode, make_photo
+    from generate_data import PHOTO_SIZE_CLASSES, generate
+    from models import Base
+
+    if not args.reset:
+        parser.error("La base indicada se vacía antes de sembrar: confirme con --reset")
+    if args.image_size not in PHOTO_SIZE_CLASSES:
+        parser.error(f"Tamaño desconocido: {args.image_size} ({', '.join(PHOTO_SIZE_CLASSES)})")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+    print(f"🌱 Sembrando {args.cards} reparaciones ({engine.dialect.name})...")
+    repair_ids = generate(engine, args.cards, seed=args.seed, image_sizes={args.image_size: 1},
+                          image_ratio=args.image_ratio, notes=args.notes, years=args.years)
+    upload_photo = encode(make_photo(SIZE_CLASSES['medium'], args.seed))
+
+    port = free_port()
+    with InProcessServer(api.app, port):
+        print(f"🚀 {args.concurrency} usuarios x {args.iterations} escenarios contra http://127.0.0.1:{port}")
+        load_test = LoadTest(f"http://127.0.0.1:{port}", repair_ids, upload_photo, args.mix,
+                             args.concurrency, args.iterations, args.seed)
+        elapsed = asyncio.run(load_test.run())
+
+    all_samples = [sample for samples in load_test.samples.values() for sample in samples]
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'database': engine.dialect.name,
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'baseline', 'database_url', 'reset')},
+        'elapsed_s': round(elapsed, 2),
+        'total': summarize(all_samples, elapsed),
+        'requests': {name: summarize(samples, elapsed) for name, samples in load_test.samples.items()},
+    }
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(report, baseline)
+
+    output = args.output or RESULTS_DIR / f"loadtest-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Resultado guardado en {output}")
+
+
+if __name__ == "__main__":
+    main()
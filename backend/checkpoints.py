@@ -0,0 +1,28 @@
+"""
+Checkpoints en JSON para los scripts de mantenimiento por lotes
+(compress_existing_images.py, migrate_db.py).
+"""
+
+import json
+import os
+
+
+def load_checkpoint(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path: str, state: dict):
+    """Escritura atómica: un corte a mitad no deja un checkpoint corrupto"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(path: str):
+    if os.path.exists(path):
+        os.remove(path)
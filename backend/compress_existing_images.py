@@ -1,153 +1,313 @@
 #!/usr/bin/env python3
 """
 Script para comprimir todas las imágenes base64 existentes en la base de datos
+
+Procesa las imágenes por lotes (paginación por id, sin cargar toda la tabla en
+memoria), reparte la decodificación/compresión en un pool de procesos, escribe
+cada lote en una sola transacción y guarda un checkpoint con el último id
+procesado para poder reanudar si el proceso se interrumpe.
+
+Uso:
+    python compress_existing_images.py                 # comprimir (reanuda si hay checkpoint)
+    python compress_existing_images.py --dry-run       # solo proyectar el ahorro
+    python compress_existing_images.py --dry-run --limit 200   # proyección por muestreo
+    python compress_existing_images.py --restart       # ignorar el checkpoint
 """
 
+import argparse
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import and_, case, column, create_engine, inspect, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from checkpoints import clear_checkpoint, load_checkpoint, save_checkpoint
+from crud import image_metadata_crud
+from services.image_integrity import inspect_image
+from services.image_pipeline import LARGE_IMAGE_BYTES
 from services.image_service import image_service
 
 # Cargar variables de entorno
 load_dotenv()
 
-def main():
+DEFAULT_CHECKPOINT = ".compress_images_checkpoint.json"
+
+# Filas candidatas: data URIs por encima del umbral de "imagen grande"
+CANDIDATES_WHERE = """
+    image_url LIKE 'data:image%'
+    AND LENGTH(image_url) > :min_size
+"""
+
+
+# === TRABAJO EN LOS PROCESOS DEL POOL ===
+
+def compress_row(row: Tuple[int, str, Optional[int]]) -> Tuple[int, int, Optional[str], Optional[str], Optional[dict], Optional[int]]:
+    """
+    Comprimir una imagen (se ejecuta en un proceso del pool).
+    Recibe (id, data URI, versión leída o None) y devuelve (id, tamaño
+    original, imagen comprimida o None, error o None, metadatos de la imagen
+    comprimida o None, versión leída).
+    """
+    repair_id, image_url, version = row
+    original_size = len(image_url)
+    try:
+        image = image_service.open_image(image_url)
+        if not image.is_valid:
+            return repair_id, original_size, None, f"Imagen inválida: {image.error}", None, version
+        compressed = image_service.compress_image(image)
+        image.close()
+        # Solo vale la pena si realmente ocupa menos
+        if compressed == image_url or len(compressed) >= original_size:
+            return repair_id, original_size, None, None, None, version
+        return repair_id, original_size, compressed, None, inspect_image(compressed), version
+    except Exception as e:
+        return repair_id, original_size, None, str(e), None, version
+
+
+# === JOB ===
+
+class CompressionJob:
+    """Recompresión por lotes con pool de procesos y checkpoint"""
+
+    def __init__(self, engine, batch_size: int = 50, workers: Optional[int] = None,
+                 dry_run: bool = False, checkpoint_path: str = DEFAULT_CHECKPOINT,
+                 min_size: int = LARGE_IMAGE_BYTES, limit: Optional[int] = None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.checkpoint_path = checkpoint_path
+        self.min_size = min_size
+        self.limit = limit
+        inspector = inspect(engine)
+        self.has_version = 'version' in {column['name'] for column in inspector.get_columns('repair_cards')}
+        self.has_metadata = inspector.has_table('image_metadata')
+        self.stats = {
+            'last_id': 0,
+            'processed': 0,
+            'compressed': 0,
+            'errors': 0,
+            'original_bytes': 0,
+            'compressed_bytes': 0,
+        }
+
+    def resume(self):
+        """Continuar desde el último lote confirmado"""
+        state = load_checkpoint(self.checkpoint_path)
+        if state:
+            self.stats.update(state)
+            print(f"↩️  Reanudando desde el id {self.stats['last_id']} "
+                  f"({self.stats['processed']} imágenes ya procesadas)")
+
+    def count_candidates(self) -> Tuple[int, int]:
+        """(cantidad, bytes) de imágenes pendientes de comprimir"""
+        with self.engine.connect() as conn:
+            count, total = conn.execute(text(f"""
+                SELECT COUNT(*), COALESCE(SUM(LENGTH(image_url)), 0)
+                FROM repair_cards
+                WHERE id > :last_id AND {CANDIDATES_WHERE}
+            """), {'last_id': self.stats['last_id'], 'min_size': self.min_size}).one()
+        return count, total
+
+    def fetch_batch(self, last_id: int) -> List[Tuple[int, str, Optional[int]]]:
+        """Siguiente lote por keyset (id > last_id): memoria acotada al tamaño del lote"""
+        version = "version" if self.has_version else "NULL"
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"""
+                SELECT id, image_url, {version}
+                FROM repair_cards
+                WHERE id > :last_id AND {CANDIDATES_WHERE}
+                ORDER BY id
+                LIMIT :batch_size
+            """), {'last_id': last_id, 'min_size': self.min_size, 'batch_size': self.batch_size})
+            return [tuple(row) for row in rows]
+
+    def write_batch(self, updates: List[dict]) -> List[dict]:
+        """
+        Escribir el lote con un solo UPDATE en una transacción; devuelve las
+        filas que sí se actualizaron (en dry-run, todas las que se habrían
+        actualizado)
+        """
+        if not updates or self.dry_run:
+            return updates
+        cards = table('repair_cards', column('id'), column('image_url'), column('version'))
+        # Si la imagen cambió mientras se comprimía no se pisa: la versión
+        # leída debe seguir igual (sin columna version, la imagen completa)
+        if self.has_version:
+            guards = [and_(cards.c.id == update['id'], cards.c.version == update['version']) for update in updates]
+        else:
+            guards = [and_(cards.c.id == update['id'], cards.c.image_url == update['original'])
+                      for update in updates]
+        values = {'image_url': case({update['id']: update['image_url'] for update in updates}, value=cards.c.id)}
+        if self.has_version:
+            # La versión invalida ETags y cachés de derivados de /api/images
+            values['version'] = cards.c.version + 1
+        stmt = cards.update().where(or_(*guards)).values(**values)
+
+        with self.engine.begin() as conn:
+            if self.engine.dialect.update_returning:
+                applied_ids = set(conn.execute(stmt.returning(cards.c.id)).scalars())
+            else:
+                # Sin RETURNING: las filas con la imagen nueva son las que se actualizaron
+                conn.execute(stmt)
+                applied_ids = set(conn.execute(
+                    select(cards.c.id).where(or_(*[
+                        and_(cards.c.id == update['id'], cards.c.image_url == update['image_url'])
+                        for update in updates
+                    ]))
+                ).scalars())
+            applied = [update for update in updates if update['id'] in applied_ids]
+            if self.has_metadata and applied:
+                # Metadatos solo de las imágenes que se reemplazaron, en la misma transacción
+                db = Session(bind=conn)
+                image_metadata_crud.stage_many(db, [(update['id'], update['metadata']) for update in applied])
+                db.flush()
+                db.close()
+        return applied
+
+    def run(self) -> dict:
+        pending, pending_bytes = self.count_candidates()
+        print(f"🔍 Encontradas {pending} imágenes grandes por comprimir "
+              f"({pending_bytes / 1024 / 1024:.2f} MB)")
+        if pending == 0:
+            print("✅ No hay imágenes para comprimir")
+            return self.stats
+
+        started = time.perf_counter()
+        processed_now = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            batch = self.fetch_batch(self.stats['last_id'])
+            while batch:
+                if self.limit is not None:
+                    batch = batch[:self.limit - processed_now]
+
+                results = list(pool.map(compress_row, batch, chunksize=max(1, len(batch) // (self.workers * 2))))
+
+                # Sin columna version, la guarda compara la imagen completa leída
+                originals = {} if self.has_version else {row[0]: row[1] for row in batch}
+                updates = []
+                for repair_id, original_size, compressed, error, metadata, version in results:
+                    self.stats['processed'] += 1
+                    self.stats['original_bytes'] += original_size
+                    if error:
+                        self.stats['errors'] += 1
+                        self.stats['compressed_bytes'] += original_size
+                        print(f"   ❌ Error procesando imagen ID {repair_id}: {error}")
+                    elif compressed is None:
+                        self.stats['compressed_bytes'] += original_size
+                    else:
+                        updates.append({'id': repair_id, 'image_url': compressed, 'version': version,
+                                        'original': originals.get(repair_id),
+                                        'original_size': original_size, 'metadata': metadata})
+
+                applied = {update['id'] for update in self.write_batch(updates)}
+                for update in updates:
+                    if update['id'] in applied:
+                        self.stats['compressed'] += 1
+                        self.stats['compressed_bytes'] += len(update['image_url'])
+                    else:
+                        self.stats['compressed_bytes'] += update['original_size']
+                        print(f"   ⏭️  Imagen ID {update['id']} cambió durante la compresión, se omite")
+                self.stats['last_id'] = batch[-1][0]
+                if not self.dry_run:
+                    save_checkpoint(self.checkpoint_path, self.stats)
+
+                processed_now += len(batch)
+                self.report_progress(processed_now, pending, started)
+                if self.limit is not None and processed_now >= self.limit:
+                    break
+                batch = self.fetch_batch(self.stats['last_id'])
+
+        elapsed = time.perf_counter() - started
+        self.print_summary(processed_now, elapsed, pending, pending_bytes)
+        return self.stats
+
+    def report_progress(self, processed_now: int, pending: int, started: float):
+        elapsed = time.perf_counter() - started
+        saved = self.stats['original_bytes'] - self.stats['compressed_bytes']
+        print(f"📸 {processed_now}/{pending} imágenes | "
+              f"{processed_now / elapsed if elapsed else 0:.1f} img/s | "
+              f"ahorro acumulado {saved / 1024 / 1024:.2f} MB | último id {self.stats['last_id']}")
+
+    def print_summary(self, processed_now: int, elapsed: float, pending: int, pending_bytes: int):
+        original = self.stats['original_bytes']
+        compressed = self.stats['compressed_bytes']
+        ratio = compressed / original if original else 1.0
+
+        print(f"\n{'='*60}")
+        print(f"📊 RESUMEN DE COMPRESIÓN{' (DRY-RUN, sin cambios)' if self.dry_run else ''}")
+        print(f"{'='*60}")
+        print(f"Imágenes procesadas: {self.stats['processed']}")
+        print(f"Imágenes comprimidas: {self.stats['compressed']}")
+        print(f"Errores: {self.stats['errors']}")
+        print(f"Tiempo: {elapsed:.1f}s ({processed_now / elapsed if elapsed else 0:.1f} img/s, "
+              f"{self.workers} procesos)")
+        if original:
+            print(f"Tamaño original total: {original / 1024 / 1024:.2f} MB")
+            print(f"Tamaño comprimido total: {compressed / 1024 / 1024:.2f} MB")
+            print(f"Reducción total: {(1 - ratio) * 100:.1f}%")
+            print(f"Espacio ahorrado: {(original - compressed) / 1024 / 1024:.2f} MB")
+        if self.dry_run and processed_now < pending:
+            # Proyección a partir de la muestra procesada
+            projected_saving = pending_bytes * (1 - ratio)
+            projected_time = elapsed / processed_now * pending if processed_now else 0
+            print(f"📈 Proyección para {pending} imágenes: ahorro ~{projected_saving / 1024 / 1024:.2f} MB, "
+                  f"tiempo ~{projected_time:.0f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Comprimir las imágenes base64 grandes de la base de datos")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--batch-size", type=int, default=50, help="Imágenes por lote/transacción")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de compresión (por defecto: CPUs)")
+    parser.add_argument("--dry-run", action="store_true", help="No escribir: solo medir y proyectar el ahorro")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de imágenes a procesar en esta corrida")
+    parser.add_argument("--min-size", type=int, default=LARGE_IMAGE_BYTES, help="Tamaño mínimo del data URI")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Archivo de checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el checkpoint y empezar desde el inicio")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Comprimir todas las imágenes grandes en la base de datos"""
-    
-    # Conectar a la base de datos
-    database_url = os.getenv("DATABASE_URL")
-    if not database_url:
+    args = parse_args(argv)
+    if not args.database_url:
         print("❌ ERROR: DATABASE_URL no encontrada en variables de entorno")
         sys.exit(1)
-    
+
     try:
-        engine = create_engine(database_url)
+        engine = create_engine(args.database_url)
         print(f"✅ Conectado a la base de datos")
-        
-        with engine.connect() as conn:
-            # Obtener todas las reparaciones con imágenes
-            result = conn.execute(text("""
-                SELECT id, image_url 
-                FROM repair_cards 
-                WHERE image_url IS NOT NULL 
-                AND image_url != '' 
-                AND image_url LIKE 'data:image%'
-                ORDER BY id
-            """))
-            
-            repairs_with_images = result.fetchall()
-            total_repairs = len(repairs_with_images)
-            
-            print(f"🔍 Encontradas {total_repairs} reparaciones con imágenes base64")
-            
-            if total_repairs == 0:
-                print("✅ No hay imágenes para comprimir")
-                return
-            
-            # Estadísticas
-            compressed_count = 0
-            total_original_size = 0
-            total_compressed_size = 0
-            errors = []
-            
-            for i, (repair_id, image_url) in enumerate(repairs_with_images, 1):
-                print(f"\n📸 Procesando imagen {i}/{total_repairs} (ID: {repair_id})")
-                
-                try:
-                    # Verificar si es imagen base64 válida
-                    if not image_service.is_base64_image(image_url):
-                        print(f"⚠️  Imagen inválida, saltando...")
-                        continue
-                    
-                    # Obtener información de la imagen
-                    image_info = image_service.get_image_info(image_url)
-                    original_size = image_info.get('size_bytes', 0)
-                    original_size_kb = image_info.get('size_kb', 0)
-                    
-                    print(f"   📊 Tamaño original: {original_size_kb:.1f} KB")
-                    
-                    # Solo comprimir si es grande (>500KB)
-                    if not image_info.get('is_large', False):
-                        print(f"   ✅ Imagen ya es pequeña, no necesita compresión")
-                        total_original_size += original_size
-                        total_compressed_size += original_size
-                        continue
-                    
-                    # Comprimir la imagen
-                    print(f"   🔄 Comprimiendo imagen grande...")
-                    compressed_image = image_service.compress_image(image_url)
-                    
-                    # Verificar que la compresión funcionó
-                    if compressed_image == image_url:
-                        print(f"   ⚠️  Compresión falló, manteniendo original")
-                        total_original_size += original_size
-                        total_compressed_size += original_size
-                        continue
-                    
-                    # Obtener información de la imagen comprimida
-                    compressed_info = image_service.get_image_info(compressed_image)
-                    compressed_size = compressed_info.get('size_bytes', 0)
-                    compressed_size_kb = compressed_info.get('size_kb', 0)
-                    
-                    # Calcular reducción
-                    reduction_percent = ((original_size - compressed_size) / original_size) * 100 if original_size > 0 else 0
-                    
-                    print(f"   📊 Tamaño comprimido: {compressed_size_kb:.1f} KB")
-                    print(f"   📉 Reducción: {reduction_percent:.1f}%")
-                    
-                    # Actualizar en la base de datos
-                    conn.execute(text("""
-                        UPDATE repair_cards 
-                        SET image_url = :compressed_image
-                        WHERE id = :repair_id
-                    """), {
-                        'compressed_image': compressed_image,
-                        'repair_id': repair_id
-                    })
-                    
-                    # Confirmar la transacción
-                    conn.commit()
-                    
-                    print(f"   ✅ Imagen actualizada en la base de datos")
-                    
-                    # Actualizar estadísticas
-                    compressed_count += 1
-                    total_original_size += original_size
-                    total_compressed_size += compressed_size
-                    
-                except Exception as e:
-                    error_msg = f"Error procesando imagen ID {repair_id}: {str(e)}"
-                    print(f"   ❌ {error_msg}")
-                    errors.append(error_msg)
-                    continue
-            
-            # Mostrar resumen final
-            print(f"\n{'='*60}")
-            print(f"📊 RESUMEN DE COMPRESIÓN")
-            print(f"{'='*60}")
-            print(f"Total de imágenes procesadas: {total_repairs}")
-            print(f"Imágenes comprimidas exitosamente: {compressed_count}")
-            print(f"Errores: {len(errors)}")
-            
-            if total_original_size > 0:
-                total_reduction = ((total_original_size - total_compressed_size) / total_original_size) * 100
-                print(f"Tamaño original total: {total_original_size / 1024 / 1024:.2f} MB")
-                print(f"Tamaño comprimido total: {total_compressed_size / 1024 / 1024:.2f} MB")
-                print(f"Reducción total: {total_reduction:.1f}%")
-                print(f"Espacio ahorrado: {(total_original_size - total_compressed_size) / 1024 / 1024:.2f} MB")
-            
-            if errors:
-                print(f"\n❌ ERRORES:")
-                for error in errors:
-                    print(f"   - {error}")
-            
-            print(f"\n✅ Proceso completado!")
-            
     except Exception as e:
         print(f"❌ Error conectando a la base de datos: {e}")
         sys.exit(1)
 
+    job = CompressionJob(
+        engine,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        checkpoint_path=args.checkpoint,
+        min_size=args.min_size,
+        limit=args.limit,
+    )
+    if args.restart:
+        clear_checkpoint(args.checkpoint)
+    if not args.dry_run:
+        job.resume()
+
+    stats = job.run()
+    if not args.dry_run and args.limit is None:
+        # Terminó completo: la próxima corrida vuelve a empezar
+        clear_checkpoint(args.checkpoint)
+    print(f"\n✅ Proceso completado!")
+    return stats
+
+
 if __name__ == "__main__":
     print("🚀 Iniciando compresión de imágenes existentes...")
     main()
@@ -0,0 +1,137 @@
+"""
+Compresión HTTP negociada (brotli / gzip).
+
+- `CompressionMiddleware`: comprime respuestas JSON/texto por encima de un umbral
+  según el header Accept-Encoding del cliente.
+- `choose_encoding` / `compress_bytes`: utilidades compartidas con el servidor de
+  estáticos y con el script precompress_static.py.
+"""
+
+import gzip
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Extensiones de archivo que se guardan precomprimidas (.br / .gz)
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/',
+    'image/svg+xml',
+)
+
+
+def supported_encodings() -> tuple:
+    """Codificaciones disponibles en orden de preferencia"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept(header: Optional[str]) -> dict:
+    """Parsear un header tipo Accept/Accept-Encoding a {valor: q}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Iterable[str] = None) -> Optional[str]:
+    """Elegir la mejor codificación aceptada por el cliente (respeta q=0)"""
+    if not accept_encoding:
+        return None
+
+    accepted = parse_accept(accept_encoding)
+    for encoding in (available if available is not None else supported_encodings()):
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Comprimir bytes con la codificación indicada"""
+    if encoding == 'br':
+        if brotli is None:
+            raise RuntimeError('brotli no está instalado')
+        return brotli.compress(data, quality=level if level is not None else 5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level if level is not None else 6)
+    raise ValueError(f'Codificación no soportada: {encoding}')
+
+
+def is_compressible(content_type: str) -> bool:
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respuestas de un solo bloque (JSON de la API).
+    Las respuestas en streaming (archivos) se dejan pasar sin tocar: los
+    estáticos se sirven ya precomprimidos.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if start_message is None:
+                await send(message)
+                return
+
+            initial, start_message = start_message, None
+            headers = MutableHeaders(scope=initial)
+            body = message.get("body", b"")
+            should_compress = (
+                message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+                and "content-encoding" not in headers
+                and len(body) >= self.minimum_size
+                and is_compressible(headers.get("content-type", ""))
+            )
+
+            if should_compress:
+                body = compress_bytes(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": body}
+
+            await send(initial)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,10 +1,34 @@
+import logging
+
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, Float
-from typing import Optional, List
+from sqlalchemy import and_, or_, func, Float, update
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List, Iterable, Tuple
 from datetime import datetime, timedelta
 
-from models import RepairCard
+from models import RepairCard, ImageMetadata
 from schemas import RepairCardCreate, RepairCardUpdate
+from serializers import REPAIR_COLUMNS, strip_large_images
+from storage import QuotaExceededError, check_image_quota
+from services.image_integrity import content_hash, inspect_image
+from structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+# Marcador: el UPDATE no toca la imagen, sus metadatos quedan igual
+UNCHANGED = object()
+
+class VersionConflictError(Exception):
+    """La reparación fue modificada por otro usuario desde que se leyó"""
+
+    def __init__(self, repair_id: int, expected_version: Optional[int], current_version: int):
+        self.repair_id = repair_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+        super().__init__(
+            f"La reparación {repair_id} fue modificada por otro usuario "
+            f"(versión esperada: {expected_version}, actual: {current_version})"
+        )
 
 class RepairCRUD:
     """Clase para operaciones CRUD de reparaciones"""
@@ -15,10 +39,11 @@ class RepairCRUD:
         status: Optional[str] = None,
         search: Optional[str] = None,
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        as_rows: bool = False
     ) -> List[RepairCard]:
-        """Obtener reparaciones con filtros opcionales"""
-        query = db.query(RepairCard)
+        """Obtener reparaciones con filtros opcionales (as_rows: tuplas para serialización rápida)"""
+        query = self._base_query(db, as_rows)
         
         # Filtrar por estado
         if status:
@@ -40,7 +65,7 @@ class RepairCRUD:
         # Aplicar paginación
         return query.offset(skip).limit(limit).all()
 
-    def search_repairs_fast(self, db: Session, search: str, limit: int = 50) -> List[RepairCard]:
+    def search_repairs_fast(self, db: Session, search: str, limit: int = 50, as_rows: bool = False) -> List[RepairCard]:
         """Búsqueda rápida sin imágenes para mejor rendimiento"""
         if not search or not search.strip():
             return []
@@ -48,7 +73,7 @@ class RepairCRUD:
         search_term = f"%{search.strip()}%"
         
         # Consulta optimizada solo con campos esenciales
-        query = db.query(RepairCard).filter(
+        query = self._base_query(db, as_rows).filter(
             or_(
                 RepairCard.owner_name.ilike(search_term),
                 RepairCard.problem_type.ilike(search_term),
@@ -59,6 +84,8 @@ class RepairCRUD:
         
         # Obtener resultados y limpiar imágenes para velocidad
         results = query.all()
+        if as_rows:
+            return strip_large_images(results)
         for repair in results:
             if len(repair.image_url or '') > 1000:  # Solo limpiar imágenes grandes
                 repair.image_url = f"[IMAGE_{len(repair.image_url)}]"  # Placeholder
@@ -69,14 +96,14 @@ class RepairCRUD:
         """Obtener reparación por ID"""
         return db.query(RepairCard).filter(RepairCard.id == repair_id).first()
 
-    def get_repairs_by_status(self, db: Session, status: str) -> List[RepairCard]:
+    def get_repairs_by_status(self, db: Session, status: str, as_rows: bool = False) -> List[RepairCard]:
         """Obtener reparaciones por estado"""
-        return db.query(RepairCard).filter(
+        return self._base_query(db, as_rows).filter(
             RepairCard.status == status
         ).order_by(RepairCard.created_at.desc()).all()
 
-    def create_repair(self, db: Session, repair: RepairCardCreate) -> RepairCard:
-        """Crear nueva reparación"""
+    def create_repair(self, db: Session, repair: RepairCardCreate, image_metadata=UNCHANGED) -> RepairCard:
+        """Crear nueva reparación (`image_metadata`: metadatos ya calculados de la imagen)"""
         db_repair = RepairCard(
             owner_name=repair.owner_name,
             problem_type=repair.problem_type,
@@ -92,36 +119,55 @@ class RepairCRUD:
         )
         
         db.add(db_repair)
+        db.flush()
+        # Metadatos de la imagen en la misma transacción
+        if image_metadata is UNCHANGED:
+            image_metadata = image_metadata_for(db_repair.image_url)
+        image_metadata_crud.stage(db, db_repair.id, image_metadata)
+        recheck_image_quota(db, db_repair.id, db_repair.image_url)
         db.commit()
         db.refresh(db_repair)
         
-        print(f"➕ Nueva reparación creada: {db_repair.owner_name} (ID: {db_repair.id})")
+        log_event(logger, "repair.created", "Reparación creada", repair_id=db_repair.id)
         return db_repair
 
     def update_repair(
         self, 
         db: Session, 
         repair_id: int, 
-        repair_update: RepairCardUpdate
+        repair_update: RepairCardUpdate,
+        expected_version: Optional[int] = None,
+        image_metadata=UNCHANGED
     ) -> Optional[RepairCard]:
-        """Actualizar reparación"""
-        db_repair = self.get_repair_by_id(db, repair_id)
-        if not db_repair:
-            return None
-
+        """
+        Actualizar reparación (UPDATE condicional por versión, sin bloqueos).
+        `image_metadata`: metadatos ya calculados de la nueva imagen, si los hay.
+        """
         # Actualizar solo los campos proporcionados
         update_data = repair_update.dict(exclude_unset=True)
+        body_version = update_data.pop('version', None)
+        if expected_version is None:
+            expected_version = body_version
+
+        values = {}
         for field, value in update_data.items():
             # Convertir camelCase a snake_case para la BD
             db_field = self._camel_to_snake(field)
-            if hasattr(db_repair, db_field):
-                setattr(db_repair, db_field, value)
+            if hasattr(RepairCard, db_field):
+                values[db_field] = value
+        values['updated_at'] = datetime.utcnow()
 
-        db_repair.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_repair)
-        
-        print(f"✏️ Reparación actualizada: {db_repair.owner_name} (ID: {db_repair.id})")
+        # Si cambia la imagen, sus metadatos se calculan antes y se guardan en la misma transacción
+        if 'image_url' not in values:
+            image_metadata = UNCHANGED
+        elif image_metadata is UNCHANGED:
+            image_metadata = image_metadata_for(values['image_url'])
+        if not self._conditional_update(db, repair_id, expected_version, values, image_metadata):
+            return None
+
+        db_repair = self.get_repair_by_id(db, repair_id)
+        log_event(logger, "repair.updated", "Reparación actualizada", repair_id=db_repair.id,
+                  version=db_repair.version, fields=sorted(values))
         return db_repair
 
     def update_repair_status(
@@ -129,36 +175,30 @@ class RepairCRUD:
         db: Session, 
         repair_id: int, 
         new_status: str,
-        note: Optional[str] = None
+        note: Optional[str] = None,
+        expected_version: Optional[int] = None
     ) -> Optional[RepairCard]:
         """Actualizar estado de reparación"""
-        db_repair = self.get_repair_by_id(db, repair_id)
+        def build_values(db_repair: RepairCard) -> dict:
+            values = {"status": new_status, "updated_at": datetime.utcnow()}
+            # Agregar nota si se proporciona
+            if note:
+                new_note = {
+                    "content": note,
+                    "author": "Sistema",
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "type": "status_change",
+                    "old_status": db_repair.status,
+                    "new_status": new_status
+                }
+                values["notes"] = (db_repair.notes or []) + [new_note]
+            return values
+
+        db_repair = self._read_modify_write(db, repair_id, build_values, expected_version)
         if not db_repair:
             return None
 
-        old_status = db_repair.status
-        db_repair.status = new_status
-        db_repair.updated_at = datetime.utcnow()
-
-        # Agregar nota si se proporciona
-        if note:
-            if not db_repair.notes:
-                db_repair.notes = []
-            
-            new_note = {
-                "content": note,
-                "author": "Sistema",
-                "timestamp": datetime.utcnow().isoformat(),
-                "type": "status_change",
-                "old_status": old_status,
-                "new_status": new_status
-            }
-            db_repair.notes = db_repair.notes + [new_note]
-
-        db.commit()
-        db.refresh(db_repair)
-        
-        print(f"🔄 Estado cambiado: {db_repair.owner_name} -> {new_status}")
+        log_event(logger, "repair.status_changed", "Estado cambiado", repair_id=db_repair.id, status=new_status)
         return db_repair
 
     def delete_repair(self, db: Session, repair_id: int) -> bool:
@@ -167,10 +207,12 @@ class RepairCRUD:
         if not db_repair:
             return False
 
+        # SQLite no aplica ON DELETE CASCADE sin PRAGMA foreign_keys
+        db.query(ImageMetadata).filter(ImageMetadata.repair_id == repair_id).delete(synchronize_session=False)
         db.delete(db_repair)
         db.commit()
         
-        print(f"🗑️ Reparación eliminada: ID {repair_id}")
+        log_event(logger, "repair.deleted", "Reparación eliminada", repair_id=repair_id)
         return True
 
     def add_note_to_repair(
@@ -178,30 +220,27 @@ class RepairCRUD:
         db: Session, 
         repair_id: int, 
         content: str, 
-        author: str = "Usuario"
+        author: str = "Usuario",
+        expected_version: Optional[int] = None
     ) -> Optional[RepairCard]:
         """Agregar nota a reparación"""
-        db_repair = self.get_repair_by_id(db, repair_id)
+        def build_values(db_repair: RepairCard) -> dict:
+            new_note = {
+                "content": content,
+                "author": author,
+                "timestamp": datetime.utcnow().isoformat(),
+                "type": "user_note"
+            }
+            return {
+                "notes": (db_repair.notes or []) + [new_note],
+                "updated_at": datetime.utcnow()
+            }
+
+        db_repair = self._read_modify_write(db, repair_id, build_values, expected_version)
         if not db_repair:
             return None
 
-        if not db_repair.notes:
-            db_repair.notes = []
-
-        new_note = {
-            "content": content,
-            "author": author,
-            "timestamp": datetime.utcnow().isoformat(),
-            "type": "user_note"
-        }
-        
-        db_repair.notes = db_repair.notes + [new_note]
-        db_repair.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(db_repair)
-        
-        print(f"📝 Nota agregada a: {db_repair.owner_name} (ID: {db_repair.id})")
+        log_event(logger, "repair.note_added", "Nota agregada", repair_id=db_repair.id)
         return db_repair
 
     def get_statistics(self, db: Session) -> dict:
@@ -249,22 +288,22 @@ class RepairCRUD:
             "totalRevenue": float(total_revenue)
         }
 
-    def get_overdue_repairs(self, db: Session) -> List[RepairCard]:
+    def get_overdue_repairs(self, db: Session, as_rows: bool = False) -> List[RepairCard]:
         """Obtener reparaciones vencidas"""
         now = datetime.utcnow()
-        return db.query(RepairCard).filter(
+        return self._base_query(db, as_rows).filter(
             and_(
                 RepairCard.due_date < now,
                 RepairCard.status != 'listos'
             )
         ).order_by(RepairCard.due_date.asc()).all()
 
-    def get_due_soon_repairs(self, db: Session) -> List[RepairCard]:
+    def get_due_soon_repairs(self, db: Session, as_rows: bool = False) -> List[RepairCard]:
         """Obtener reparaciones que vencen pronto"""
         now = datetime.utcnow()
         two_days_from_now = now + timedelta(days=2)
         
-        return db.query(RepairCard).filter(
+        return self._base_query(db, as_rows).filter(
             and_(
                 RepairCard.due_date <= two_days_from_now,
                 RepairCard.due_date >= now,
@@ -276,11 +315,170 @@ class RepairCRUD:
         """Buscar reparaciones por término"""
         return self.get_repairs(db=db, search=search_term)
 
+    def _base_query(self, db: Session, as_rows: bool = False):
+        """Consulta base: objetos ORM o tuplas con las columnas de la respuesta"""
+        if as_rows:
+            return db.query(*REPAIR_COLUMNS)
+        return db.query(RepairCard)
+
+    def _conditional_update(
+        self,
+        db: Session,
+        repair_id: int,
+        expected_version: Optional[int],
+        values: dict,
+        image_metadata=UNCHANGED
+    ) -> bool:
+        """
+        Ejecutar un único UPDATE ... WHERE id = :id [AND version = :expected]
+        que incrementa la versión. Retorna False si la reparación no existe y
+        lanza VersionConflictError si la versión no coincide. `image_metadata`
+        (dict o None para borrarlos) se guarda en la misma transacción.
+        """
+        stmt = update(RepairCard).where(RepairCard.id == repair_id)
+        if expected_version is not None:
+            stmt = stmt.where(RepairCard.version == expected_version)
+        stmt = stmt.values(version=RepairCard.version + 1, **values)
+
+        result = db.execute(stmt.execution_options(synchronize_session=False))
+        if result.rowcount == 1:
+            if image_metadata is not UNCHANGED:
+                image_metadata_crud.stage(db, repair_id, image_metadata)
+            if 'image_url' in values:
+                recheck_image_quota(db, repair_id, values['image_url'])
+            db.commit()
+            return True
+
+        db.rollback()
+        current_version = db.query(RepairCard.version).filter(RepairCard.id == repair_id).scalar()
+        if current_version is None:
+            return False
+        raise VersionConflictError(repair_id, expected_version, current_version)
+
+    def _read_modify_write(
+        self,
+        db: Session,
+        repair_id: int,
+        build_values,
+        expected_version: Optional[int],
+        max_retries: int = 3
+    ) -> Optional[RepairCard]:
+        """
+        Leer la reparación, calcular los nuevos valores (p. ej. agregar una nota
+        a `notes`) y escribirlos condicionados a la versión leída. Si el cliente
+        no indicó versión, se reintenta ante escrituras concurrentes para no
+        perder notas; si la indicó, el conflicto se propaga.
+        """
+        for attempt in range(max_retries):
+            db_repair = self.get_repair_by_id(db, repair_id)
+            if not db_repair:
+                return None
+            if expected_version is not None and db_repair.version != expected_version:
+                raise VersionConflictError(repair_id, expected_version, db_repair.version)
+
+            values = build_values(db_repair)
+            try:
+                if not self._conditional_update(db, repair_id, db_repair.version, values):
+                    return None
+            except VersionConflictError:
+                if expected_version is not None or attempt == max_retries - 1:
+                    raise
+                continue
+
+            return self.get_repair_by_id(db, repair_id)
+
     def _camel_to_snake(self, name: str) -> str:
         """Convertir camelCase a snake_case"""
         import re
         s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
         return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
 
-# Instancia global de CRUD
+def recheck_image_quota(db: Session, repair_id: int, image_url: Optional[str]):
+    """
+    Repetir la verificación de cuota dentro de la transacción que guarda la
+    imagen, antes del commit: otra escritura pudo entrar después de la
+    verificación previa. Si se supera, se deshace la transacción.
+    """
+    if not image_url or not image_url.startswith('data:'):
+        return
+    try:
+        check_image_quota(db, len(image_url), repair_id=repair_id, lock=True)
+    except QuotaExceededError:
+        db.rollback()
+        raise
+
+def image_metadata_for(image_url: Optional[str]) -> Optional[dict]:
+    """Metadatos de una imagen base64 al escribirla (None si no hay imagen base64)"""
+    if not image_url or not image_url.startswith('data:image/'):
+        return None
+    return inspect_image(image_url)
+
+class ImageMetadataCRUD:
+    """Resultados de validación de imágenes (tabla image_metadata)"""
+
+    def get(self, db: Session, repair_id: int) -> Optional[ImageMetadata]:
+        return db.get(ImageMetadata, repair_id)
+
+    def get_current(self, db: Session, repair_id: int, image_url: str) -> Optional[ImageMetadata]:
+        """Registro de la imagen solo si corresponde a la imagen actual (mismo hash)"""
+        record = self.get(db, repair_id)
+        if record is not None and record.content_hash == content_hash(image_url):
+            return record
+        return None
+
+    def ensure(self, db: Session, repair_id: int, image_url: str) -> ImageMetadata:
+        """Registro vigente de la imagen; la valida (decodificación completa) solo si cambió"""
+        record = self.get_current(db, repair_id, image_url)
+        if record is not None:
+            return record
+
+        self.save_many(db, [(repair_id, inspect_image(image_url))])
+        return self.get(db, repair_id)
+
+    def stage(self, db: Session, repair_id: int, values: Optional[dict]):
+        """Agregar/actualizar (o borrar si `values` es None) el registro sin hacer commit"""
+        if values is None:
+            db.query(ImageMetadata).filter(ImageMetadata.repair_id == repair_id).delete(synchronize_session=False)
+            return
+        record = self.get(db, repair_id)
+        if record is None:
+            db.add(ImageMetadata(repair_id=repair_id, **values))
+        else:
+            for field, value in values.items():
+                setattr(record, field, value)
+            record.checked_at = func.now()
+
+    def stage_many(self, db: Session, results: Iterable[Tuple[int, Optional[dict]]]):
+        """`stage` para un lote, cargando los registros existentes en una sola consulta"""
+        results = list(results)
+        if not results:
+            return
+        db.query(ImageMetadata).filter(
+            ImageMetadata.repair_id.in_([repair_id for repair_id, _ in results])
+        ).all()
+        for repair_id, values in results:
+            self.stage(db, repair_id, values)
+
+    def save_many(self, db: Session, results: Iterable[Tuple[int, dict]]):
+        """Guardar resultados de validación (un commit por lote)"""
+        results = list(results)
+        if not results:
+            return
+        self.stage_many(db, results)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otra petición validó la misma imagen al mismo tiempo
+            db.rollback()
+
+    def touch(self, db: Session, repair_ids: List[int]):
+        """Marcar como revisadas imágenes que no cambiaron (sin decodificar)"""
+        if repair_ids:
+            db.query(ImageMetadata).filter(ImageMetadata.repair_id.in_(repair_ids)).update(
+                {ImageMetadata.checked_at: func.now()}, synchronize_session=False
+            )
+            db.commit()
+
+# Instancias globales de CRUD
 repair_crud = RepairCRUD()
+image_metadata_crud = ImageMetadataCRUD()
@@ -17,15 +17,17 @@ def debug_images():
     engine = create_engine(database_url)
     
     with engine.connect() as conn:
-        # Obtener muestras de imágenes
+        # Muestras de imágenes con sus metadatos (no se leen las imágenes)
         result = conn.execute(text("""
-            SELECT id, 
-                   SUBSTRING(image_url, 1, 50) as sample,
-                   LENGTH(image_url) as length
-            FROM repair_cards 
-            WHERE image_url IS NOT NULL 
-            AND image_url != '' 
-            LIMIT 5
+            SELECT r.id,
+                   LENGTH(r.image_url) as length,
+                   m.format, m.width, m.height, m.is_valid, m.is_truncated, m.error
+            FROM repair_cards r
+            LEFT JOIN image_metadata m ON m.repair_id = r.id
+            WHERE r.image_url IS NOT NULL 
+            AND r.image_url != '' 
+            ORDER BY m.is_valid, r.id DESC
+            LIMIT 20
         """))
         
         images = result.fetchall()
@@ -33,18 +35,16 @@ def debug_images():
         print("🔍 Muestras de imágenes en la base de datos:")
         print("=" * 60)
         
-        for image_id, sample, length in images:
+        for image_id, length, image_format, width, height, is_valid, is_truncated, error in images:
             print(f"ID: {image_id}")
-            print(f"Muestra (50 chars): '{sample}'")
             print(f"Longitud total: {length} caracteres")
             
-            # Verificar si empieza con data:
-            if sample and not sample.startswith('data:'):
-                print("❌ No empieza con 'data:'")
-            elif 'data:image' in sample:
-                print("✅ Parece ser base64 válido")
+            if is_valid is None:
+                print("⚠️  Sin revisar (ejecuta scan_images.py)")
+            elif is_valid:
+                print(f"✅ {image_format} {width}x{height}")
             else:
-                print("⚠️  Formato desconocido")
+                print(f"❌ {'Truncada' if is_truncated else 'Inválida'}: {error}")
             
             print("-" * 40)
 
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos para pruebas a gran escala
+
+Inserta cientos de miles de reparaciones realistas: nombres y problemas en
+español, teléfonos colombianos, fechas repartidas en varios años, estados
+según la antigüedad (las viejas casi todas entregadas), notas JSON y fotos
+JPEG reales de distintos tamaños.
+
+- Las fotos se generan una sola vez (unas pocas por tamaño) y las filas las
+  referencian: generar 500.000 filas no genera 500.000 imágenes.
+- Inserción por lotes: COPY en PostgreSQL (psycopg2), executemany en el resto.
+- Determinista: misma semilla y misma --end-date, mismos datos.
+
+Lo usan las pruebas de migración (test_migrate_db.py) y la prueba de carga
+(benchmarks/load_test.py), y sirve para poblar bases de staging o de
+benchmarks a gran escala.
+
+Uso:
+    python generate_data.py --database-url sqlite:///./grande.db --cards 200000
+    python generate_data.py --database-url "$BENCH_DATABASE_URL" --cards 500000 --reset \\
+        --image-sizes small=6,medium=3,large=1 --image-ratio 0.7 --years 3
+"""
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List
+
+from sqlalchemy import create_engine, func, insert, select
+
+from benchmarks.images import SIZE_CLASSES, encode, make_photo, to_data_uri
+from models import Base, RepairCard
+
+FIRST_NAMES = (
+    "Juan", "María", "Carlos", "Ana", "Luis", "Laura", "Andrés", "Camila", "Santiago", "Valentina",
+    "Jorge", "Daniela", "Felipe", "Sofía", "Diego", "Paula", "Sebastián", "Natalia", "Julián", "Carolina",
+)
+LAST_NAMES = (
+    "Pérez", "Gómez", "Rodríguez", "Martínez", "Hernández", "García", "López", "Torres", "Ramírez", "Díaz",
+    "Moreno", "Jiménez", "Castro", "Vargas", "Rojas", "Muñoz", "Ortiz", "Suárez", "Quintero", "Peña",
+)
+PROBLEM_TYPES = (
+    "Pantalla rota", "No enciende", "Batería", "Teclado", "Virus", "Disco duro",
+    "Sobrecalentamiento", "Puerto de carga", "Sistema operativo", "Bisagra", "Mantenimiento", "Wifi",
+)
+DEVICES = ("Portátil Lenovo", "Portátil HP", "MacBook Air", "Portátil Asus", "Dell Inspiron", "Acer Aspire")
+NOTE_TEXTS = (
+    "Cliente llamó preguntando por el equipo", "Se pidió el repuesto", "Equipo revisado",
+    "Falta el cargador", "Cliente autorizó la reparación", "Se hizo copia de seguridad",
+)
+PRIORITY_WEIGHTS = {'low': 2, 'normal': 6, 'high': 2, 'urgent': 1}
+# Estado -> peso para reparaciones recientes (las de más de ACTIVE_DAYS casi siempre están listas)
+ACTIVE_STATUS_WEIGHTS = {'ingresado': 5, 'diagnosticada': 3, 'para-entregar': 2, 'listos': 2}
+ACTIVE_DAYS = 30
+
+# Fotos distintas por clase de tamaño (las filas las reutilizan)
+DISTINCT_PHOTOS = 4
+PHOTO_SIZE_CLASSES = {'tiny': (160, 120), **SIZE_CLASSES}
+
+COLUMNS = (
+    'owner_name', 'problem_type', 'whatsapp_number', 'due_date', 'description', 'status', 'priority',
+    'estimated_cost', 'actual_cost', 'image_url', 'has_charger', 'created_at', 'updated_at', 'notes', 'version',
+)
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """'small=6,medium=3' -> {'small': 6.0, 'medium': 3.0}"""
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in PHOTO_SIZE_CLASSES:
+            raise argparse.ArgumentTypeError(
+                f"Tamaño desconocido: {name} ({', '.join(PHOTO_SIZE_CLASSES)})"
+            )
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class SyntheticShop:
+    """Filas de reparaciones deterministas para una semilla"""
+
+    def __init__(self, seed: int = 42, image_sizes: Dict[str, float] = None, image_ratio: float = 0.8,
+                 notes: int = 3, years: float = 2, end_date: datetime = None):
+        self.rng = random.Random(seed)
+        self.image_ratio = image_ratio
+        self.notes = notes
+        self.end_date = end_date or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.span_minutes = int(years * 365 * 24 * 60)
+
+        image_sizes = image_sizes or {'small': 1}
+        # Generadas una sola vez; cada fila guarda una referencia al mismo str
+        self.photos = {
+            size_class: [
+                to_data_uri(encode(make_photo(PHOTO_SIZE_CLASSES[size_class], seed + i)))
+                for i in range(DISTINCT_PHOTOS)
+            ]
+            for size_class, weight in image_sizes.items() if weight > 0 and image_ratio > 0
+        }
+        self.photo_weights = [image_sizes[size_class] for size_class in self.photos]
+
+    def photo(self) -> str:
+        if not self.photos or self.rng.random() >= self.image_ratio:
+            return ''
+        size_class = self.rng.choices(list(self.photos), self.photo_weights)[0]
+        return self.rng.choice(self.photos[size_class])
+
+    def status(self, age: timedelta) -> str:
+        if age.days > ACTIVE_DAYS and self.rng.random() < 0.97:
+            return 'listos'
+        statuses, weights = zip(*ACTIVE_STATUS_WEIGHTS.items())
+        return self.rng.choices(statuses, weights)[0]
+
+    def make_notes(self, created_at: datetime, status: str) -> list:
+        notes = []
+        for i in range(self.rng.randint(0, self.notes * 2)):
+            notes.append({
+                "content": self.rng.choice(NOTE_TEXTS),
+                "author": self.rng.choice(("Técnico", "Recepción")),
+                "timestamp": (created_at + timedelta(hours=4 * (i + 1))).isoformat(),
+                "type": "user_note",
+            })
+        if status != 'ingresado':
+            notes.append({
+                "content": f"Estado cambiado a {status}",
+                "author": "Sistema",
+                "timestamp": (created_at + timedelta(days=1)).isoformat(),
+                "type": "status_change",
+                "old_status": "ingresado",
+                "new_status": status,
+            })
+        return notes
+
+    def row(self) -> dict:
+        rng = self.rng
+        created_at = self.end_date - timedelta(minutes=rng.randrange(self.span_minutes))
+        status = self.status(self.end_date - created_at)
+        estimated = rng.randrange(40, 900) * 1000
+        problem = rng.choice(PROBLEM_TYPES)
+        return {
+            'owner_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'problem_type': problem,
+            'whatsapp_number': f"+57 3{rng.randrange(10, 25)}{rng.randrange(10 ** 7):07d}",
+            'due_date': created_at + timedelta(days=rng.randrange(1, 15)),
+            'description': f"{rng.choice(DEVICES)}: {problem.lower()}",
+            'status': status,
+            'priority': rng.choices(list(PRIORITY_WEIGHTS), list(PRIORITY_WEIGHTS.values()))[0],
+            'estimated_cost': Decimal(estimated),
+            'actual_cost': Decimal(estimated if status == 'listos' else 0),
+            'image_url': self.photo(),
+            'has_charger': rng.random() < 0.6,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'notes': self.make_notes(created_at, status),
+            'version': 1,
+        }
+
+    def rows(self, count: int) -> Iterator[dict]:
+        for _ in range(count):
+            yield self.row()
+
+
+# === INSERCIÓN ===
+
+def copy_batch(conn, rows: List[dict]):
+    """COPY ... FROM STDIN (PostgreSQL con psycopg2)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([json.dumps(row[column]) if column == 'notes' else row[column] for column in COLUMNS])
+    buffer.seek(0)
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {RepairCard.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def can_copy(engine) -> bool:
+    return engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+
+
+def generate(engine, cards: int, batch_size: int = 5000, verbose: bool = False, **shop_options) -> List[int]:
+    """Insertar `cards` reparaciones sintéticas y devolver sus IDs"""
+    shop = SyntheticShop(**shop_options)
+    use_copy = can_copy(engine)
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        last_id = conn.execute(select(func.max(RepairCard.id))).scalar() or 0
+
+    inserted = 0
+    rows = shop.rows(cards)
+    while inserted < cards:
+        batch = [next(rows) for _ in range(min(batch_size, cards - inserted))]
+        with engine.begin() as conn:
+            if use_copy:
+                copy_batch(conn, batch)
+            else:
+                conn.execute(insert(RepairCard.__table__), batch)
+        inserted += len(batch)
+        if verbose:
+            rate = inserted / (time.perf_counter() - started)
+            print(f"   📦 {inserted}/{cards} reparaciones ({rate:.0f} filas/s)")
+
+    # IDs asignados por la base (respeta la secuencia en PostgreSQL)
+    with engine.connect() as conn:
+        return list(conn.execute(
+            select(RepairCard.id).where(RepairCard.id > last_id).order_by(RepairCard.id)
+        ).scalars())
+
+
+def reset_tables(engine):
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generar reparaciones sintéticas")
+    parser.add_argument("--database-url", required=True, help="Base destino (nunca se toma de DATABASE_URL)")
+    parser.add_argument("--cards", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--image-sizes", type=parse_weights, default={'small': 1},
+                        help=f"Pesos por tamaño de foto ({', '.join(PHOTO_SIZE_CLASSES)}), p. ej. small=6,medium=3")
+    parser.add_argument("--image-ratio", type=float, default=0.8, help="Fracción de reparaciones con foto")
+    parser.add_argument("--notes", type=int, default=2, help="Notas promedio por reparación")
+    parser.add_argument("--years", type=float, default=2, help="Años de historia")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=None,
+                        help="Fecha más reciente (por defecto hoy); fíjela para datos idénticos entre días")
+    parser.add_argument("--reset", action="store_true", help="Vaciar las tablas antes de generar")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    if args.reset:
+        reset_tables(engine)
+
+    print(f"🌱 Generando {args.cards} reparaciones en {engine.dialect.name} "
+          f"({'COPY' if can_copy(engine) else 'inserts por lotes'})...")
+    started = time.perf_counter()
+    ids = generate(
+        engine, args.cards, batch_size=args.batch_size, verbose=True, seed=args.seed,
+        image_sizes=args.image_sizes, image_ratio=args.image_ratio, notes=args.notes,
+        years=args.years, end_date=args.end_date,
+    )
+    print(f"✅ {len(ids)} reparaciones en {time.perf_counter() - started:.1f}s")
+    return ids
+
+
+if __name__ == "__main__":
+    main()
@@ -24,19 +24,42 @@ query_status_counts = """
 """
 
 query_samples = """
-    SELECT id, status, image_url
-    FROM repair_cards
-    ORDER BY id DESC
+    SELECT r.id, r.status, m.format, m.width, m.height, m.stored_size, m.is_valid
+    FROM repair_cards r
+    LEFT JOIN image_metadata m ON m.repair_id = r.id
+    ORDER BY r.id DESC
     LIMIT 5
 """
 
+# Uso de almacenamiento de imágenes (metadatos, sin leer las imágenes)
+query_image_storage = """
+    SELECT COUNT(*),
+           COALESCE(SUM(stored_size), 0),
+           COALESCE(AVG(stored_size), 0),
+           COALESCE(MAX(stored_size), 0),
+           SUM(CASE WHEN is_valid THEN 0 ELSE 1 END)
+    FROM image_metadata
+"""
+
+query_formats = """
+    SELECT format, COUNT(*), COALESCE(SUM(stored_size), 0)
+    FROM image_metadata
+    GROUP BY format
+    ORDER BY COUNT(*) DESC
+"""
+
 with engine.connect() as conn:
     total = conn.execute(text(query_total)).scalar()
     with_images = conn.execute(text(query_with_images)).scalar()
     status_counts = conn.execute(text(query_status_counts)).fetchall()
     samples = conn.execute(text(query_samples)).fetchall()
+    images, stored, average, largest, invalid = conn.execute(text(query_image_storage)).one()
+    formats = conn.execute(text(query_formats)).fetchall()
 
 print('Total registros:', total)
 print('Con imagen:', with_images)
 print('Por estado:', status_counts)
 print('Muestras recientes:', samples)
+print(f'Imágenes registradas: {images} ({stored / 1024 / 1024:.2f} MB, '
+      f'promedio {float(average) / 1024:.1f} KB, máxima {largest / 1024:.1f} KB, inválidas: {invalid or 0})')
+print('Por formato:', formats)
@@ -1,16 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response, FileResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uvicorn
+import asyncio
+import logging
 import os
-import base64
 from datetime import datetime
 from pathlib import Path
 
-from database import get_db, engine
+from database import get_db, engine, add_missing_columns, SessionLocal
 from models import RepairCard, Base
 from schemas import (
     RepairCardCreate, 
@@ -19,11 +20,28 @@ from schemas import (
     RepairCardStatusUpdate,
     StatsResponse
 )
-from crud import repair_crud
+from crud import UNCHANGED, repair_crud, image_metadata_crud, VersionConflictError
+from serializers import repair_list_response
+from compression import CompressionMiddleware
+from metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, install_query_hooks, registry, timed
+from query_audit import QUERY_AUDIT, QueryAuditMiddleware, QueryAuditor
+from profiling import PROFILE_SECRET, ProfilingMiddleware, is_authorized, profile_path
+from static_files import FrontendCache
+from structured_logging import RequestIdMiddleware, log_event, setup_logging, shutdown_logging
 from services.image_service import image_service
+from services.image_cache import image_derivative_cache
+from services.image_integrity import inspect_image
+from services.placeholders import load_font, placeholder_image
+from services.image_pipeline import LARGE_IMAGE_BYTES, OUTPUT_FORMATS, ImagePipeline, negotiate_format
+from uploads import ImageUpload, UploadError, read_image_upload
+from scan_images import ImageScanner
+from storage import QuotaExceededError, check_image_quota, storage_report
+
+logger = logging.getLogger(__name__)
 
 # Crear las tablas
 Base.metadata.create_all(bind=engine)
+add_missing_columns(RepairCard.__table__)
 
 app = FastAPI(
     title="Gestor de Reparaciones IT - FastAPI",
@@ -50,6 +68,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respuestas JSON grandes (brotli/gzip según Accept-Encoding)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+)
+
+# Detector de N+1 y consultas lentas (solo desarrollo/staging, QUERY_AUDIT=true)
+if QUERY_AUDIT:
+    app.add_middleware(QueryAuditMiddleware, auditor=QueryAuditor(engine).install())
+
+# Latencia, SQL, imágenes y tamaño por ruta (/metrics y Server-Timing); externo a la compresión
+app.add_middleware(MetricsMiddleware)
+install_query_hooks(engine)
+
+# Perfilado de una petición con X-Profile: <secreto> (sin PROFILE_SECRET no se instala)
+if PROFILE_SECRET:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request ID para correlacionar los logs (X-Request-ID); el más externo de todos
+app.add_middleware(RequestIdMiddleware)
+
 @app.get("/")
 async def root():
     """Endpoint raíz con información de la API"""
@@ -79,6 +118,105 @@ async def test_connection():
         "timestamp": datetime.now().isoformat()
     }
 
+# === CONTROL DE CONCURRENCIA ===
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Extraer la versión de un header If-Match ("3", W/"3" o 3)"""
+    if not if_match or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Header If-Match inválido")
+
+def version_conflict(error: VersionConflictError) -> HTTPException:
+    """Convertir un conflicto de versión en una respuesta 409"""
+    return HTTPException(
+        status_code=409,
+        detail=str(error),
+        headers={"ETag": f'"{error.current_version}"'}
+    )
+
+# === IMÁGENES ===
+
+# Las imágenes cambian con la versión de la reparación: revalidar con ETag
+IMAGE_CACHE_CONTROL = "private, max-age=60, must-revalidate"
+
+# Revisar en segundo plano las imágenes nuevas o modificadas al iniciar
+IMAGE_SCAN_ON_STARTUP = os.getenv("IMAGE_SCAN_ON_STARTUP", "true").lower() == "true"
+image_scanner = ImageScanner(SessionLocal)
+
+@app.on_event("startup")
+async def start_logging():
+    """Logging estructurado (JSON por defecto, escrito desde un hilo aparte)"""
+    setup_logging()
+
+@app.on_event("startup")
+async def start_image_scan():
+    """Validar imágenes pendientes sin bloquear el arranque"""
+    load_font()  # La fuente de los placeholders se busca una sola vez
+    if IMAGE_SCAN_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, image_scanner.run)
+
+@app.on_event("shutdown")
+async def stop_image_scan():
+    image_scanner.stop()
+    shutdown_logging()
+
+def stored_image(image: ImagePipeline, label: str = "imagen grande") -> Tuple[str, Optional[dict]]:
+    """
+    Data URI a guardar (comprimido si es grande) y sus metadatos.
+    Corre en el threadpool: la imagen ya abierta se comprime y se valida en la
+    misma llamada, sin volver a decodificar el data URI en el event loop.
+    """
+    with image:
+        if image_service and image.is_large and image.is_valid:
+            with timed('image'):
+                compressed = ImagePipeline.from_bytes(image_service.compress_image_bytes(image), 'image/jpeg')
+            log_event(logger, "image.compressed", f"Comprimida {label}",
+                      original_kb=round(image.size_bytes / 1024, 2),
+                      compressed_kb=round(compressed.size_bytes / 1024, 2))
+            image = compressed
+        # Único paso por base64: el formato en que se guarda en la base de datos
+        image_url = image.data_uri
+        with image:
+            return image_url, inspect_image(image_url, image)
+
+def stored_upload(upload: ImageUpload) -> Tuple[str, Optional[dict]]:
+    """`stored_image` para una subida binaria: lee el buffer temporal y valida la imagen"""
+    try:
+        image = ImagePipeline.from_bytes(upload.read(), upload.mime_type)
+    finally:
+        upload.close()
+    if not image.is_valid:
+        raise UploadError(f"Imagen inválida: {image.error}")
+    return stored_image(image, "imagen subida")
+
+def prepare_image_url(image_url: Optional[str], label: str = "imagen grande") -> Tuple[Optional[str], Optional[dict]]:
+    """`stored_image` para una imagen base64 recibida en JSON (sin imagen base64: sin metadatos)"""
+    if not image_url or not image_url.startswith('data:image/'):
+        return image_url, None
+    return stored_image(ImagePipeline(image_url), label)
+
+def quota_exceeded(error: QuotaExceededError) -> HTTPException:
+    """Convertir una cuota superada en una respuesta 413/507"""
+    return HTTPException(status_code=error.status_code, detail=str(error))
+
+def enforce_image_quota(db: Session, image_url: Optional[str], repair_id: Optional[int] = None):
+    """
+    Rechazar la imagen (ya comprimida) si supera la cuota por imagen o la total.
+    Verificación temprana: crud la repite dentro de la transacción que la guarda.
+    """
+    if not image_url or not image_url.startswith('data:'):
+        return
+    try:
+        check_image_quota(db, len(image_url), repair_id=repair_id)
+    except QuotaExceededError as e:
+        raise quota_exceeded(e)
+
 # === ENDPOINTS DE REPARACIONES ===
 
 @app.get("/api/repairs", response_model=List[RepairCardResponse])
@@ -91,14 +229,15 @@ async def get_repairs(
 ):
     """Obtener todas las reparaciones con filtros opcionales"""
     try:
-        repairs = repair_crud.get_repairs(
+        rows = repair_crud.get_repairs(
             db=db, 
             status=status, 
             search=search, 
             skip=skip, 
-            limit=limit
+            limit=limit,
+            as_rows=True
         )
-        return repairs
+        return repair_list_response(rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo reparaciones: {str(e)}")
 
@@ -109,16 +248,16 @@ async def create_repair(
 ):
     """Crear una nueva reparación"""
     try:
-        # Comprimir imagen si es base64 y es muy grande
-        if repair.image_url and image_service.is_base64_image(repair.image_url):
-            image_info = image_service.get_image_info(repair.image_url)
-            if image_info.get('is_large', False):
-                print(f"🔄 Comprimiendo imagen grande: {image_info.get('size_kb', 0)}KB")
-                repair.image_url = image_service.compress_image(repair.image_url)
-                print(f"✅ Imagen comprimida exitosamente")
+        # Comprimir imagen si es base64 y es muy grande (y validarla en la misma pasada)
+        repair.image_url, image_metadata = await run_in_threadpool(prepare_image_url, repair.image_url)
+        enforce_image_quota(db, repair.image_url)
         
-        new_repair = repair_crud.create_repair(db=db, repair=repair)
+        new_repair = repair_crud.create_repair(db=db, repair=repair, image_metadata=image_metadata)
         return new_repair
+    except QuotaExceededError as e:
+        raise quota_exceeded(e)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error creando reparación: {str(e)}")
 
@@ -130,65 +269,127 @@ async def search_repairs_fast(
 ):
     """Búsqueda rápida de reparaciones (sin imágenes para mejor rendimiento)"""
     try:
-        repairs = repair_crud.search_repairs_fast(db=db, search=q, limit=limit)
-        return repairs
+        rows = repair_crud.search_repairs_fast(db=db, search=q, limit=limit, as_rows=True)
+        return repair_list_response(rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en búsqueda rápida: {str(e)}")
 
 @app.get("/api/repairs/{repair_id}", response_model=RepairCardResponse)
-async def get_repair(repair_id: int, db: Session = Depends(get_db)):
+async def get_repair(repair_id: int, response: Response, db: Session = Depends(get_db)):
     """Obtener una reparación por ID"""
     repair = repair_crud.get_repair_by_id(db=db, repair_id=repair_id)
     if not repair:
         raise HTTPException(status_code=404, detail="Reparación no encontrada")
+    response.headers["ETag"] = f'"{repair.version}"'
     return repair
 
 @app.put("/api/repairs/{repair_id}", response_model=RepairCardResponse)
 async def update_repair(
     repair_id: int,
     repair_update: RepairCardUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Actualizar una reparación"""
+    """Actualizar una reparación (If-Match o `version` para evitar sobrescrituras)"""
+    expected_version = parse_if_match(if_match)
     try:
-        # Comprimir imagen si es base64 y es muy grande
-        if repair_update.image_url and image_service.is_base64_image(repair_update.image_url):
-            image_info = image_service.get_image_info(repair_update.image_url)
-            if image_info.get('is_large', False):
-                print(f"🔄 Comprimiendo imagen actualizada: {image_info.get('size_kb', 0)}KB")
-                repair_update.image_url = image_service.compress_image(repair_update.image_url)
-                print(f"✅ Imagen comprimida exitosamente")
+        # Comprimir imagen si es base64 y es muy grande (y validarla en la misma pasada)
+        image_metadata = UNCHANGED
+        if repair_update.image_url:
+            repair_update.image_url, image_metadata = await run_in_threadpool(
+                prepare_image_url, repair_update.image_url, "imagen actualizada"
+            )
+            enforce_image_quota(db, repair_update.image_url, repair_id)
         
         updated_repair = repair_crud.update_repair(
             db=db, 
             repair_id=repair_id, 
-            repair_update=repair_update
+            repair_update=repair_update,
+            expected_version=expected_version,
+            image_metadata=image_metadata
         )
         if not updated_repair:
             raise HTTPException(status_code=404, detail="Reparación no encontrada")
+        response.headers["ETag"] = f'"{updated_repair.version}"'
         return updated_repair
+    except VersionConflictError as e:
+        raise version_conflict(e)
+    except QuotaExceededError as e:
+        raise quota_exceeded(e)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error actualizando reparación: {str(e)}")
 
+@app.post("/api/repairs/{repair_id}/image", response_model=RepairCardResponse)
+async def upload_repair_image(
+    repair_id: int,
+    request: Request,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Subir la foto de una reparación en binario (multipart campo `file` o cuerpo image/*).
+    Evita el base64 en JSON: el archivo se lee en streaming con límite de tamaño.
+    """
+    expected_version = parse_if_match(if_match)
+    try:
+        upload = await read_image_upload(request)
+        # Leer el buffer (puede estar en disco), validar y comprimir fuera del event loop
+        image_url, image_metadata = await run_in_threadpool(stored_upload, upload)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    try:
+        enforce_image_quota(db, image_url, repair_id)
+        updated_repair = repair_crud.update_repair(
+            db=db,
+            repair_id=repair_id,
+            repair_update=RepairCardUpdate(image_url=image_url),
+            expected_version=expected_version,
+            image_metadata=image_metadata
+        )
+        if not updated_repair:
+            raise HTTPException(status_code=404, detail="Reparación no encontrada")
+        response.headers["ETag"] = f'"{updated_repair.version}"'
+        return updated_repair
+    except VersionConflictError as e:
+        raise version_conflict(e)
+    except QuotaExceededError as e:
+        raise quota_exceeded(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error guardando imagen: {str(e)}")
+
 @app.patch("/api/repairs/{repair_id}/status", response_model=RepairCardResponse)
 async def update_repair_status(
     repair_id: int,
     status_update: RepairCardStatusUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Cambiar el estado de una reparación"""
+    expected_version = parse_if_match(if_match)
+    if expected_version is None:
+        expected_version = status_update.version
     try:
         updated_repair = repair_crud.update_repair_status(
             db=db,
             repair_id=repair_id,
             new_status=status_update.status,
-            note=status_update.note
+            note=status_update.note,
+            expected_version=expected_version
         )
         if not updated_repair:
             raise HTTPException(status_code=404, detail="Reparación no encontrada")
+        response.headers["ETag"] = f'"{updated_repair.version}"'
         return updated_repair
+    except VersionConflictError as e:
+        raise version_conflict(e)
     except HTTPException:
         raise
     except Exception as e:
@@ -211,11 +412,36 @@ async def get_statistics(db: Session = Depends(get_db)):
         stats = repair_crud.get_statistics(db=db)
         return stats
     except Exception as e:
-        print(f"ERROR en get_statistics: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error en get_statistics", extra={'event': "stats.failed"})
         raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métricas por ruta en formato Prometheus"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/api/debug/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(
+    profile_id: str,
+    x_profile: Optional[str] = Header(None)
+):
+    """Descargar un perfil speedscope (header X-Profile con el mismo secreto que al generarlo)"""
+    path = profile_path(profile_id) if is_authorized(x_profile) else None
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
+@app.get("/api/stats/storage")
+async def get_storage_report(
+    top: int = Query(10, ge=1, le=100, description="Cantidad de reparaciones más pesadas"),
+    db: Session = Depends(get_db)
+):
+    """Uso de almacenamiento de las fotos (agregados SQL, sin cargar las imágenes)"""
+    try:
+        return await run_in_threadpool(storage_report, db, top)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo uso de almacenamiento: {str(e)}")
+
 # === ENDPOINTS ADICIONALES ===
 
 @app.get("/api/repairs/status/{status}", response_model=List[RepairCardResponse])
@@ -228,20 +454,20 @@ async def get_repairs_by_status(status: str, db: Session = Depends(get_db)):
             detail=f"Estado inválido. Debe ser uno de: {', '.join(valid_statuses)}"
         )
     
-    repairs = repair_crud.get_repairs_by_status(db=db, status=status)
-    return repairs
+    rows = repair_crud.get_repairs_by_status(db=db, status=status, as_rows=True)
+    return repair_list_response(rows)
 
 @app.get("/api/repairs/overdue", response_model=List[RepairCardResponse])
 async def get_overdue_repairs(db: Session = Depends(get_db)):
     """Obtener reparaciones vencidas"""
-    repairs = repair_crud.get_overdue_repairs(db=db)
-    return repairs
+    rows = repair_crud.get_overdue_repairs(db=db, as_rows=True)
+    return repair_list_response(rows)
 
 @app.get("/api/repairs/due-soon", response_model=List[RepairCardResponse])
 async def get_due_soon_repairs(db: Session = Depends(get_db)):
     """Obtener reparaciones que vencen pronto (próximos 2 días)"""
-    repairs = repair_crud.get_due_soon_repairs(db=db)
-    return repairs
+    rows = repair_crud.get_due_soon_repairs(db=db, as_rows=True)
+    return repair_list_response(rows)
 
 # === MANEJO DE ERRORES ===
 
@@ -253,11 +479,17 @@ async def http_exception_handler(request, exc):
             "success": False,
             "error": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
+    # La respuesta no expone el detalle, pero el error queda en el log
+    logger.error(
+        f"Error no controlado en {request.method} {request.url.path}: {exc!r}",
+        exc_info=exc, extra={'event': "request.unhandled_error", 'method': request.method, 'path': request.url.path}
+    )
     return JSONResponse(
         status_code=500,
         content={
@@ -268,55 +500,80 @@ async def general_exception_handler(request, exc):
     )
 
 @app.get("/api/images/{repair_id}")
-async def get_repair_image(repair_id: int, db: Session = Depends(get_db)):
-    """Servir imagen de una reparación (con compresión automática)"""
+async def get_repair_image(repair_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Servir imagen de una reparación (con compresión automática).
+
+    El formato se negocia con el header Accept: AVIF/WebP si el cliente los
+    acepta y el backend puede generarlos, JPEG en otro caso. Los derivados se
+    cachean por (reparación, versión, formato) y se validan con ETag.
+    """
     try:
-        repair = repair_crud.get_repair_by_id(db=db, repair_id=repair_id)
-        if not repair or not repair.image_url:
+        version = db.query(RepairCard.version).filter(RepairCard.id == repair_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+        available = image_service.output_formats if image_service else ('JPEG',)
+        image_format = negotiate_format(request.headers.get("accept"), available)
+        cache_key = (repair_id, version, image_format)
+        headers = {
+            "ETag": f'"{repair_id}-{version}-{image_format.lower()}"',
+            "Cache-Control": IMAGE_CACHE_CONTROL,
+            "Vary": "Accept",
+        }
+
+        # El cliente ya tiene esta versión en este formato
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+
+        cached = image_derivative_cache.get(cache_key)
+        if cached is not None:
+            content, media_type = cached
+            return Response(content=content, media_type=media_type, headers=headers)
+
+        # Solo la columna de la imagen, no la fila completa
+        image_url = db.query(RepairCard.image_url).filter(RepairCard.id == repair_id).scalar()
+        if not image_url:
             raise HTTPException(status_code=404, detail="Imagen no encontrada")
         
         # Si es base64, verificar si es válida
-        if repair.image_url.startswith('data:image/'):
-            # Verificar si la imagen base64 es válida
-            if image_service and image_service.is_base64_image(repair.image_url):
-                # Imagen válida - comprimir si es muy grande
-                image_url = repair.image_url
-                image_info = image_service.get_image_info(image_url)
-                if image_info.get('is_large', False):
-                    image_url = image_service.compress_image(image_url)
-                
-                # Extraer tipo y datos
-                header, image_data = image_url.split(',', 1)
-                image_type = header.split(';')[0].split(':')[1]
+        if image_url.startswith('data:image/'):
+            # Validación registrada en image_metadata: solo se decodifica completa si la imagen cambió
+            metadata = await run_in_threadpool(image_metadata_crud.ensure, db, repair_id, image_url)
+            image = image_service.open_image(image_url) if image_service and metadata.is_valid else None
+            if image is not None:
+                content, media_type = image.data, image.mime_type
+                # Si el cliente no pidió AVIF/WebP, una imagen pequeña se sirve tal cual
+                # (en su formato original); las grandes y los formatos pedidos se transcodifican
+                if metadata.stored_size > LARGE_IMAGE_BYTES or image_format != 'JPEG':
+                    try:
+                        with timed('image'):
+                            content = await run_in_threadpool(
+                                image_service.compress_image_bytes, image, format=image_format
+                            )
+                        media_type = OUTPUT_FORMATS[image_format]
+                    except Exception as e:
+                        log_event(logger, "image.transcode_failed", f"No se pudo generar {image_format}: {e}",
+                                  level=logging.WARNING, repair_id=repair_id, format=image_format)
+                        content, media_type = image.data, image.mime_type
                 
-                # Decodificar y servir
-                image_bytes = base64.b64decode(image_data)
-                return Response(content=image_bytes, media_type=image_type)
+                image_derivative_cache.put(cache_key, content, media_type)
+                return Response(content=content, media_type=media_type, headers=headers)
             else:
-                # Imagen inválida o truncada - generar placeholder
-                print(f"⚠️  Imagen inválida para reparación {repair_id}, generando placeholder")
-                
-                # Crear imagen placeholder usando Pillow
-                if image_service:
-                    placeholder_image = image_service.create_placeholder_image(
-                        text=f"Equipo #{repair_id}",
-                        size=(400, 300)
-                    )
-                    
-                    # Extraer datos del placeholder
-                    header, image_data = placeholder_image.split(',', 1)
-                    image_bytes = base64.b64decode(image_data)
-                    return Response(content=image_bytes, media_type="image/jpeg")
-                else:
-                    raise HTTPException(status_code=404, detail="Imagen no disponible")
+                # Imagen inválida o truncada - placeholder ya renderizado (caché por texto y tamaño)
+                log_event(logger, "image.invalid", "Imagen inválida, usando placeholder",
+                          level=logging.WARNING, repair_id=repair_id)
+                content, media_type = placeholder_image(f"Equipo #{repair_id}", (400, 300))
+                image_derivative_cache.put(cache_key, content, media_type)
+                return Response(content=content, media_type=media_type, headers=headers)
         
         # Si es URL externa, redirigir
-        return JSONResponse({"url": repair.image_url})
+        return JSONResponse({"url": image_url})
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error sirviendo imagen {repair_id}: {e}")
+        logger.exception("Error sirviendo imagen", extra={'event': "image.failed", 'repair_id': repair_id})
         raise HTTPException(status_code=500, detail=f"Error sirviendo imagen: {str(e)}")
 
 @app.post("/api/images/compress")
@@ -327,14 +584,15 @@ async def compress_image_endpoint(data: dict):
         if not image_data:
             raise HTTPException(status_code=400, detail="Imagen requerida")
         
-        if not image_service.is_base64_image(image_data):
+        image = image_service.open_image(image_data)
+        if not image.is_valid:
             raise HTTPException(status_code=400, detail="Formato de imagen inválido")
         
         # Obtener información de la imagen
-        image_info = image_service.get_image_info(image_data)
+        image_info = image.info()
         
         # Comprimir
-        compressed_image = image_service.compress_image(image_data)
+        compressed_image = image_service.compress_image(image)
         compressed_info = image_service.get_image_info(compressed_image)
         
         return {
@@ -365,28 +623,37 @@ async def cleanup_temp_files():
 frontend_dist_path = Path(__file__).parent.parent / "frontend" / "dist"
 
 if frontend_dist_path.exists():
-    # Servir archivos estáticos del frontend
-    app.mount("/assets", StaticFiles(directory=str(frontend_dist_path / "assets")), name="assets")
+    # Caché en memoria del build (contenido, ETag y variantes .br/.gz)
+    frontend_cache = FrontendCache(
+        frontend_dist_path,
+        max_bytes=int(os.getenv("FRONTEND_CACHE_MAX_MB", 32)) * 1024 * 1024
+    )
+
+    @app.on_event("startup")
+    async def warm_frontend_cache():
+        """Precargar el frontend en memoria al iniciar"""
+        loaded = await run_in_threadpool(frontend_cache.warm)
+        print(f"📦 Frontend en caché: {loaded} archivos")
     
     @app.get("/", response_class=FileResponse)
-    async def serve_frontend():
+    async def serve_frontend(request: Request):
         """Servir el frontend en la raíz"""
-        return FileResponse(str(frontend_dist_path / "index.html"))
+        return await frontend_cache.response_async("index.html", request.headers)
     
     @app.get("/{path:path}", response_class=FileResponse)
-    async def serve_frontend_routes(path: str):
+    async def serve_frontend_routes(path: str, request: Request):
         """Servir rutas del frontend (SPA routing)"""
         # Si es una ruta de API, no interceptar
         if path.startswith("api/") or path.startswith("docs") or path.startswith("openapi.json"):
             raise HTTPException(status_code=404, detail="Not found")
         
-        # Verificar si el archivo existe
-        file_path = frontend_dist_path / path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(str(file_path))
-        
-        # Para rutas SPA, servir index.html
-        return FileResponse(str(frontend_dist_path / "index.html"))
+        # Los assets inexistentes son 404; el resto de rutas SPA sirven index.html
+        response = await frontend_cache.response_async(
+            path, request.headers, fallback_to_index=not path.startswith("assets/")
+        )
+        if response is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return response
 
 if __name__ == "__main__":
     uvicorn.run(
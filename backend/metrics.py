@@ -0,0 +1,257 @@
+"""
+Métricas de la API (formato Prometheus) y header Server-Timing.
+
+- `MetricsMiddleware`: mide cada petición (latencia, estado, tamaño de la
+  respuesta) y agrega `Server-Timing` con el tiempo de base de datos, de
+  imágenes y total.
+- `install_query_hooks`: eventos de SQLAlchemy que cuentan las sentencias SQL
+  y su duración dentro de la petición en curso.
+- `timed`: context manager para medir otros tramos (p. ej. `timed('image')`).
+- `registry.render()`: texto para el endpoint `/metrics`.
+
+Las rutas se etiquetan con su plantilla (`/api/repairs/{repair_id}`), nunca con
+la URL real, para que la cantidad de series no crezca con los IDs.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+
+# Ruta para las peticiones que no coinciden con ningún endpoint
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestTimings:
+    """Tiempos acumulados de una petición (compartido con el threadpool)"""
+
+    __slots__ = ('started', 'queries', 'durations')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.durations: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing (milisegundos)"""
+        parts = []
+        if self.queries:
+            parts.append(f'db;dur={self.durations.get("db", 0.0) * 1000:.1f};desc="{self.queries} queries"')
+        for name, seconds in self.durations.items():
+            if name != 'db':
+                parts.append(f'{name};dur={seconds * 1000:.1f}')
+        parts.append(f'total;dur={self.elapsed * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Sumar la duración del bloque a la petición en curso (si la hay)"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+# === REGISTRO ===
+
+class Histogram:
+    """Histograma acumulativo por etiquetas (buckets fijos)"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        # [conteos por bucket..., +Inf, suma]
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            base = _format_labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_number(bound)
+                lines.append(f'{self.name}_bucket{{{base},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {_format_number(series[-1])}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Contador por etiquetas"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.series: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, value: float = 1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_format_labels(label_names, labels)}}} {_format_number(value)}')
+        return lines
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    return ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Métricas por ruta (método + plantilla de la ruta)"""
+
+    ROUTE_LABELS = ('method', 'route')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter('http_requests_total', 'Peticiones por ruta y código de estado')
+        self.errors = Counter('http_request_exceptions_total', 'Excepciones no controladas por ruta y tipo')
+        self.latency = Histogram('http_request_duration_seconds', 'Latencia de la petición', LATENCY_BUCKETS)
+        self.queries = Histogram('http_request_db_queries', 'Sentencias SQL por petición', QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram('http_request_db_seconds', 'Tiempo en la base de datos por petición', LATENCY_BUCKETS)
+        self.image_time = Histogram('http_request_image_seconds', 'Tiempo procesando imágenes por petición',
+                                    LATENCY_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', 'Tamaño de la respuesta enviada', SIZE_BUCKETS)
+
+    def record(self, method: str, route: str, status: int, timings: RequestTimings, response_bytes: int):
+        labels = (method, route)
+        with self._lock:
+            self.requests.inc(labels + (status,))
+            self.latency.observe(labels, timings.elapsed)
+            self.queries.observe(labels, timings.queries)
+            self.db_time.observe(labels, timings.durations.get('db', 0.0))
+            if 'image' in timings.durations:
+                self.image_time.observe(labels, timings.durations['image'])
+            self.response_size.observe(labels, response_bytes)
+
+    def record_exception(self, method: str, route: str, error: BaseException):
+        with self._lock:
+            self.errors.inc((method, route, type(error).__name__))
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            lines += self.requests.render(self.ROUTE_LABELS + ('status',))
+            lines += self.errors.render(self.ROUTE_LABELS + ('exception',))
+            for histogram in (self.latency, self.queries, self.db_time, self.image_time, self.response_size):
+                lines += histogram.render(self.ROUTE_LABELS)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+# === SQLALCHEMY ===
+
+def install_query_hooks(engine):
+    """Contar sentencias SQL y su duración en la petición en curso"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_timings.get() is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timings = _current_timings.get()
+        started = getattr(context, '_metrics_started', None)
+        if timings is not None and started is not None:
+            timings.queries += 1
+            timings.add('db', time.perf_counter() - started)
+
+
+# === MIDDLEWARE ===
+
+def route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra las métricas de cada petición y agrega el
+    header Server-Timing. Debe ser el más externo para medir también la
+    compresión y el tamaño real enviado.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status = 500
+        response_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as error:
+            self.registry.record_exception(scope["method"], route_template(scope), error)
+            raise
+        finally:
+            _current_timings.reset(token)
+            self.registry.record(scope["method"], route_template(scope), status, timings, response_bytes)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Migración genérica de una tabla entre dos bases de datos (p. ej. Neon -> Railway)
+
+- Lee el origen en streaming con un cursor del lado del servidor (no carga
+  toda la tabla en memoria).
+- Escribe en el destino por lotes con un upsert multi-fila
+  (INSERT ... ON CONFLICT DO UPDATE en PostgreSQL y SQLite).
+- Varios lotes se escriben en paralelo (`--concurrency`).
+- Cada lote se verifica con un checksum: una sola lectura por lote en el
+  destino, dentro de la misma transacción, en lugar de un SELECT por fila.
+- Guarda en un checkpoint el último id migrado sin huecos para reanudar.
+
+Uso:
+    python migrate_db.py --source postgresql://neon... --target postgresql://railway...
+    python migrate_db.py --source sqlite:///origen.db --target sqlite:///destino.db --table repair_cards
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import MetaData, Table, create_engine, func, select, text
+
+from checkpoints import clear_checkpoint, load_checkpoint, save_checkpoint
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+class ChecksumMismatch(Exception):
+    """Los datos escritos en el destino no coinciden con el origen"""
+
+
+# === CHECKSUMS ===
+
+def normalize_value(value) -> str:
+    """Representación estable de un valor para comparar entre motores distintos"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, float)):
+        return format(Decimal(str(value)).normalize(), 'f')
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def batch_checksum(rows: Sequence[Sequence]) -> str:
+    """SHA-256 de las filas de un lote (ordenadas por clave)"""
+    digest = hashlib.sha256()
+    for row in rows:
+        for value in row:
+            digest.update(normalize_value(value).encode('utf-8'))
+            digest.update(b'\x1f')
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+# === MIGRACIÓN ===
+
+class TableMigration:
+    """Copia una tabla del origen al destino por lotes concurrentes"""
+
+    def __init__(self, source_engine, target_engine, table_name: str = 'repair_cards',
+                 key: str = 'id', batch_size: int = 200, concurrency: int = 4,
+                 checkpoint_path: Optional[str] = None, verify: bool = True):
+        self.source_engine = source_engine
+        self.target_engine = target_engine
+        self.key = key
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.checkpoint_path = checkpoint_path or f".migrate_{table_name}_checkpoint.json"
+        self.verify = verify
+
+        self.source_table = Table(table_name, MetaData(), autoload_with=source_engine)
+        self.target_table = Table(table_name, MetaData(), autoload_with=target_engine)
+        # Solo las columnas que existen en ambos lados (el destino puede estar más nuevo)
+        self.columns = [
+            column.name for column in self.source_table.columns
+            if column.name in self.target_table.columns
+        ]
+        if key not in self.columns:
+            raise ValueError(f"La clave {key} no existe en ambas tablas")
+        self.key_index = self.columns.index(key)
+
+        self.stats = {'last_id': None, 'rows': 0, 'batches': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+        self._pending: List[int] = []       # números de lote en vuelo, en orden
+        self._finished = {}                 # lote terminado -> último id del lote
+
+    # --- Checkpoint ---
+
+    def resume(self):
+        state = load_checkpoint(self.checkpoint_path)
+        if state:
+            self.stats.update(state)
+            print(f"↩️  Reanudando desde {self.key} > {self.stats['last_id']} "
+                  f"({self.stats['rows']} filas ya migradas)")
+
+    def _batch_done(self, number: int, last_id):
+        """
+        Avanzar el checkpoint solo hasta el último lote sin huecos: con lotes en
+        paralelo uno posterior puede terminar antes que uno anterior.
+        """
+        with self._lock:
+            self._finished[number] = last_id
+            while self._pending and self._pending[0] in self._finished:
+                self.stats['last_id'] = self._finished.pop(self._pending.pop(0))
+            save_checkpoint(self.checkpoint_path, self.stats)
+
+    # --- Origen ---
+
+    def stream_batches(self):
+        """Lotes del origen en orden de clave usando un cursor del lado del servidor"""
+        key_column = self.source_table.c[self.key]
+        query = select(*[self.source_table.c[name] for name in self.columns]).order_by(key_column)
+        if self.stats['last_id'] is not None:
+            query = query.where(key_column > self.stats['last_id'])
+
+        with self.source_engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=self.batch_size).execute(query)
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+
+    def count_source(self) -> int:
+        query = select(func.count()).select_from(self.source_table)
+        if self.stats['last_id'] is not None:
+            query = query.where(self.source_table.c[self.key] > self.stats['last_id'])
+        with self.source_engine.connect() as conn:
+            return conn.execute(query).scalar()
+
+    # --- Destino ---
+
+    def _upsert(self, conn, records: List[dict]):
+        """INSERT multi-fila con ON CONFLICT DO UPDATE (idempotente al reanudar)"""
+        dialect = self.target_engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(self.target_table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[self.target_table.c[self.key]],
+                set_={name: statement.excluded[name] for name in self.columns if name != self.key},
+            )
+            conn.execute(statement, records)
+            return
+
+        # Otros motores: borrar e insertar el lote en la misma transacción
+        ids = [record[self.key] for record in records]
+        conn.execute(self.target_table.delete().where(self.target_table.c[self.key].in_(ids)))
+        conn.execute(self.target_table.insert(), records)
+
+    def _verify(self, conn, rows: List[tuple]):
+        """Comparar el checksum del lote releído del destino con el del origen"""
+        key_column = self.target_table.c[self.key]
+        written = conn.execute(
+            select(*[self.target_table.c[name] for name in self.columns])
+            .where(key_column.in_([row[self.key_index] for row in rows]))
+            .order_by(key_column)
+        ).fetchall()
+        if batch_checksum(written) != batch_checksum(rows):
+            raise ChecksumMismatch(
+                f"Checksum distinto en el lote {self.key} {rows[0][self.key_index]}..{rows[-1][self.key_index]}"
+            )
+
+    def write_batch(self, number: int, rows: List[tuple]) -> int:
+        records = [dict(zip(self.columns, row)) for row in rows]
+        with self.target_engine.begin() as conn:
+            self._upsert(conn, records)
+            if self.verify:
+                self._verify(conn, rows)
+
+        size = sum(len(normalize_value(value)) for row in rows for value in row)
+        with self._lock:
+            self.stats['rows'] += len(rows)
+            self.stats['batches'] += 1
+            self.stats['bytes'] += size
+        self._batch_done(number, rows[-1][self.key_index])
+        return len(rows)
+
+    def sync_sequence(self):
+        """En PostgreSQL, mover la secuencia del id después de insertar ids explícitos"""
+        if self.target_engine.dialect.name != 'postgresql':
+            return
+        table_name = self.target_table.name
+        with self.target_engine.begin() as conn:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :key), "
+                f"COALESCE((SELECT MAX({self.key}) FROM {table_name}), 1))"
+            ), {'table': table_name, 'key': self.key})
+
+    # --- Ejecución ---
+
+    def run(self) -> dict:
+        total = self.count_source()
+        print(f"📦 {total} filas por migrar en {self.source_table.name} "
+              f"({len(self.columns)} columnas, lotes de {self.batch_size}, {self.concurrency} en paralelo)")
+
+        started = time.perf_counter()
+        migrated = 0
+        number = 0
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            try:
+                for rows in self.stream_batches():
+                    # No leer más del origen de lo que el destino alcanza a escribir
+                    while len(in_flight) >= self.concurrency:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        migrated += self._collect(done, migrated, total, started)
+
+                    with self._lock:
+                        self._pending.append(number)
+                    in_flight.add(pool.submit(self.write_batch, number, rows))
+                    number += 1
+
+                done, in_flight = wait(in_flight)
+                migrated += self._collect(done, migrated, total, started)
+            except Exception:
+                # Dejar terminar lo que está en vuelo: el checkpoint queda consistente
+                wait(in_flight)
+                raise
+
+        self.sync_sequence()
+        elapsed = time.perf_counter() - started
+        print(f"\n{'='*60}")
+        print(f"📊 RESUMEN DE MIGRACIÓN")
+        print(f"{'='*60}")
+        print(f"Filas migradas: {migrated} ({self.stats['rows']} en total)")
+        print(f"Lotes verificados: {self.stats['batches']}" if self.verify else "Verificación desactivada")
+        print(f"Tiempo: {elapsed:.1f}s ({migrated / elapsed if elapsed else 0:.0f} filas/s, "
+              f"{self.stats['bytes'] / 1024 / 1024:.2f} MB en total)")
+        return self.stats
+
+    def _collect(self, done, migrated: int, total: int, started: float) -> int:
+        rows = sum(future.result() for future in done)
+        if rows:
+            elapsed = time.perf_counter() - started
+            print(f"   ✅ {migrated + rows}/{total} filas | {(migrated + rows) / elapsed if elapsed else 0:.0f} filas/s "
+                  f"| checkpoint {self.key}={self.stats['last_id']}")
+        return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Migrar una tabla entre dos bases de datos")
+    parser.add_argument("--source", default=os.getenv("SOURCE_DATABASE_URL"), help="URL de la base de origen")
+    parser.add_argument("--target", default=os.getenv("DATABASE_URL"), help="URL de la base de destino")
+    parser.add_argument("--table", default="repair_cards")
+    parser.add_argument("--key", default="id", help="Columna clave (entera y única)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Filas por lote/transacción")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lotes escritos en paralelo")
+    parser.add_argument("--checkpoint", default=None, help="Archivo de checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el checkpoint y empezar desde el inicio")
+    parser.add_argument("--no-verify", action="store_true", help="No verificar los lotes con checksum")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.source or not args.target:
+        print("❌ ERROR: se necesitan --source y --target (o SOURCE_DATABASE_URL y DATABASE_URL)")
+        sys.exit(1)
+
+    try:
+        source_engine = create_engine(args.source)
+        # Un pool por lote concurrente en el destino
+        target_engine = create_engine(args.target, pool_size=args.concurrency) \
+            if not args.target.startswith('sqlite') else create_engine(args.target)
+        migration = TableMigration(
+            source_engine,
+            target_engine,
+            table_name=args.table,
+            key=args.key,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            checkpoint_path=args.checkpoint,
+            verify=not args.no_verify,
+        )
+    except Exception as e:
+        print(f"❌ Error conectando a las bases de datos: {e}")
+        sys.exit(1)
+
+    if args.restart:
+        clear_checkpoint(migration.checkpoint_path)
+    migration.resume()
+
+    try:
+        stats = migration.run()
+    except Exception as e:
+        print(f"❌ Migración interrumpida: {e}")
+        print(f"   Vuelve a ejecutar el comando para continuar desde {args.key} > {migration.stats['last_id']}")
+        sys.exit(1)
+
+    clear_checkpoint(migration.checkpoint_path)
+    print(f"\n✅ Migración completada!")
+    return stats
+
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migración...")
+    main()
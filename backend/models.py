@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, TIMESTAMP, JSON
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, TIMESTAMP, JSON, ForeignKey
 from sqlalchemy.sql import func
 from database import Base
 
@@ -21,6 +21,7 @@ class RepairCard(Base):
     created_at = Column(TIMESTAMP, server_default=func.now(), index=True)  # Índice para ordenamiento
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     notes = Column(JSON, default=list)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Control de concurrencia optimista
 
     def __repr__(self):
         return f"<RepairCard(id={self.id}, owner='{self.owner_name}', status='{self.status}')>"
@@ -42,7 +43,8 @@ class RepairCard(Base):
             'hasCharger': self.has_charger,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
-            'notes': self.notes or []
+            'notes': self.notes or [],
+            'version': self.version
         }
 
     @classmethod
@@ -54,3 +56,24 @@ class RepairCard(Base):
     def get_valid_priorities(cls):
         """Obtener prioridades válidas"""
         return ['low', 'normal', 'high', 'urgent']
+
+
+class ImageMetadata(Base):
+    """Resultado de validar la imagen de una reparación (se recalcula solo si la imagen cambia)"""
+    __tablename__ = "image_metadata"
+
+    repair_id = Column(Integer, ForeignKey("repair_cards.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 del data URI guardado
+    stored_size = Column(Integer, nullable=False, index=True)  # Largo del data URI (lo que ocupa en la BD)
+    byte_size = Column(Integer, default=0)  # Bytes de la imagen decodificada
+    is_valid = Column(Boolean, nullable=False, default=False, index=True)
+    is_truncated = Column(Boolean, nullable=False, default=False, index=True)
+    error = Column(String(255))
+    format = Column(String(10), index=True)
+    mime_type = Column(String(30))
+    width = Column(Integer)
+    height = Column(Integer)
+    checked_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ImageMetadata(repair_id={self.repair_id}, valid={self.is_valid}, {self.width}x{self.height})>"
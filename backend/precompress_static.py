@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script para generar variantes precomprimidas (.br / .gz) del frontend compilado
+
+Se ejecuta después de `npm run build`; el backend sirve estos archivos
+directamente cuando el cliente acepta la codificación.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from compression import PRECOMPRESSED_SUFFIXES, compress_bytes, supported_encodings
+
+DEFAULT_DIST = Path(__file__).parent.parent / "frontend" / "dist"
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.map', '.webmanifest'}
+
+
+def precompress(dist_path: Path, minimum_size: int = 1024) -> dict:
+    """Comprimir cada archivo compresible con máxima calidad"""
+    stats = {'files': 0, 'original_bytes': 0, 'compressed_bytes': {}}
+
+    for file_path in sorted(dist_path.rglob("*")):
+        if not file_path.is_file() or file_path.suffix not in COMPRESSIBLE_EXTENSIONS:
+            continue
+
+        data = file_path.read_bytes()
+        if len(data) < minimum_size:
+            continue
+
+        stats['files'] += 1
+        stats['original_bytes'] += len(data)
+        for encoding in supported_encodings():
+            level = 11 if encoding == 'br' else 9
+            compressed = compress_bytes(data, encoding, level=level)
+            target = file_path.with_name(file_path.name + PRECOMPRESSED_SUFFIXES[encoding])
+            if len(compressed) >= len(data):
+                target.unlink(missing_ok=True)
+                continue
+            target.write_bytes(compressed)
+            stats['compressed_bytes'][encoding] = stats['compressed_bytes'].get(encoding, 0) + len(compressed)
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomprimir el frontend compilado")
+    parser.add_argument("dist", nargs="?", default=str(DEFAULT_DIST), help="Directorio dist del frontend")
+    parser.add_argument("--min-size", type=int, default=1024, help="Tamaño mínimo en bytes para comprimir")
+    args = parser.parse_args()
+
+    dist_path = Path(args.dist)
+    if not dist_path.exists():
+        print(f"❌ No existe el directorio {dist_path}")
+        sys.exit(1)
+
+    stats = precompress(dist_path, args.min_size)
+    print(f"✅ {stats['files']} archivos precomprimidos ({stats['original_bytes'] / 1024:.1f} KB originales)")
+    for encoding, size in stats['compressed_bytes'].items():
+        print(f"   {encoding}: {size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
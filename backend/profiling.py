@@ -0,0 +1,197 @@
+"""
+Perfilado bajo demanda de una petición (producción, protegido por secreto).
+
+Con PROFILE_SECRET definido, una petición que envía el header
+`X-Profile: <secreto>` se ejecuta bajo un profiler
+por muestreo: un hilo toma la pila del hilo del event loop y de los hilos del
+threadpool cada PROFILE_INTERVAL_MS. Así quedan cubiertos el ruteo de FastAPI,
+RepairCRUD, la serialización y los servicios de imágenes.
+
+El perfil se guarda en formato speedscope (https://www.speedscope.app) en
+PROFILE_DIR y la respuesta incluye `X-Profile-Id` para descargarlo desde
+`GET /api/debug/profiles/{id}` (con el mismo secreto). El secreto solo se
+acepta en el header: en la URL quedaría en los logs de acceso, del proxy y en
+el historial del navegador.
+
+Sin PROFILE_SECRET el middleware no se instala: costo cero. Las peticiones
+simultáneas que usen el threadpool pueden aparecer en el perfil.
+"""
+
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from structured_logging import log_event
+
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(tempfile.gettempdir()) / "repair_profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 1))
+PROFILE_HEADER = "x-profile"
+
+# Hilos del threadpool de Starlette/AnyIO
+WORKER_THREAD_NAME = "AnyIO worker thread"
+# Código de la aplicación: los hilos del threadpool sin estos frames están ociosos
+APP_ROOT = str(Path(__file__).resolve().parent)
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+# Descarga de perfiles (no se perfila a sí misma)
+PROFILES_PATH = "/api/debug/profiles/"
+
+logger = logging.getLogger(__name__)
+
+
+def is_authorized(secret: Optional[str], expected: str = None) -> bool:
+    """Comparar el secreto en tiempo constante (nunca autorizado si está deshabilitado)"""
+    expected = PROFILE_SECRET if expected is None else expected
+    return bool(expected) and secret is not None and hmac.compare_digest(secret.encode(), expected.encode())
+
+
+def requested_secret(scope: Scope) -> Optional[str]:
+    return Headers(scope=scope).get(PROFILE_HEADER)
+
+
+def profile_path(profile_id: str, directory: Path = None) -> Optional[Path]:
+    """Ruta del perfil guardado (None si el id no es válido)"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    return (directory or PROFILE_DIR) / f"{profile_id}.speedscope.json"
+
+
+def is_app_code(frame) -> bool:
+    filename = frame.f_code.co_filename
+    return filename.startswith(APP_ROOT) and 'site-packages' not in filename
+
+
+class SamplingProfiler:
+    """Toma muestras de las pilas de los hilos indicados desde un hilo aparte"""
+
+    def __init__(self, loop_thread_id: int, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.frames: List[dict] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        # nombre del hilo -> ([pilas], [pesos])
+        self.samples: Dict[str, Tuple[list, list]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.duration = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _threads(self) -> Dict[int, str]:
+        threads = {self.loop_thread_id: "event loop"}
+        for thread in threading.enumerate():
+            if thread.name == WORKER_THREAD_NAME:
+                threads[thread.ident] = f"threadpool {thread.ident}"
+        return threads
+
+    def _sample(self, weight: float):
+        threads = self._threads()
+        for thread_id, frame in sys._current_frames().items():
+            name = threads.get(thread_id)
+            if name is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            if thread_id != self.loop_thread_id and not any(is_app_code(frame) for frame in stack):
+                continue  # hilo del threadpool ocioso
+            stacks, weights = self.samples.setdefault(name, ([], []))
+            stacks.append([self._frame_id(frame) for frame in reversed(stack)])
+            weights.append(weight)
+
+    def _frame_id(self, frame) -> int:
+        code = frame.f_code
+        key = (getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+        return index
+
+    def to_speedscope(self, name: str) -> dict:
+        profiles = []
+        for thread_name, (stacks, weights) in self.samples.items():
+            profiles.append({
+                'type': 'sampled',
+                'name': f"{name} ({thread_name})",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': stacks,
+                'weights': weights,
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'reparaciones-backend',
+            'shared': {'frames': self.frames},
+            'profiles': profiles,
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila solo las peticiones que envían el secreto.
+    Debe ser el más externo para cubrir también los demás middlewares.
+    """
+
+    def __init__(self, app: ASGIApp, secret: str = None, directory: Path = None) -> None:
+        self.app = app
+        self.secret = PROFILE_SECRET if secret is None else secret
+        self.directory = directory or PROFILE_DIR
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["path"].startswith(PROFILES_PATH)
+                or not is_authorized(requested_secret(scope), self.secret)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            self.save(profile_id, profiler, f"{scope['method']} {scope['path']}")
+
+    def save(self, profile_id: str, profiler: SamplingProfiler, name: str):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = profile_path(profile_id, self.directory)
+        path.write_text(json.dumps(profiler.to_speedscope(name)))
+        log_event(logger, "profile.saved", f"Perfil de {name} guardado en {path}",
+                  profile_id=profile_id, duration_ms=round(profiler.duration * 1000, 1))
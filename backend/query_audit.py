@@ -0,0 +1,272 @@
+"""
+Detector de N+1 y consultas lentas (solo desarrollo / staging).
+
+Con QUERY_AUDIT=true se registran todas las sentencias SQL de cada petición
+(eventos before/after_cursor_execute del engine) y al terminar se marca la
+petición si:
+
+- ejecuta más de QUERY_AUDIT_MAX_STATEMENTS sentencias,
+- repite la misma sentencia normalizada QUERY_AUDIT_REPEAT veces o más (N+1),
+- alguna sentencia tarda más de QUERY_AUDIT_SLOW_MS,
+- alguna sentencia trae más de QUERY_AUDIT_LARGE_FETCH_KB (p. ej. image_url).
+
+Para cada sentencia marcada se muestra el SQL normalizado, la forma de los
+parámetros, filas y bytes leídos, y el plan (EXPLAIN en PostgreSQL, EXPLAIN
+QUERY PLAN en SQLite) de los SELECT.
+
+Fuera de una petición (scripts) se puede usar `auditor.audit("etiqueta")`.
+"""
+
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from metrics import route_template
+
+QUERY_AUDIT = os.getenv("QUERY_AUDIT", "false").lower() == "true"
+QUERY_AUDIT_MAX_STATEMENTS = int(os.getenv("QUERY_AUDIT_MAX_STATEMENTS", 15))
+QUERY_AUDIT_REPEAT = int(os.getenv("QUERY_AUDIT_REPEAT", 3))
+QUERY_AUDIT_SLOW_MS = float(os.getenv("QUERY_AUDIT_SLOW_MS", 100))
+QUERY_AUDIT_LARGE_FETCH_KB = int(os.getenv("QUERY_AUDIT_LARGE_FETCH_KB", 1024))
+
+SQL_PREVIEW_CHARS = 300
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL sin literales ni listas IN expandidas, para agrupar sentencias iguales"""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    return _PLACEHOLDER_LIST.sub('(?...)', statement)
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return 'None'
+    if isinstance(value, (str, bytes, bytearray)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Tipos (y largo de textos) de los parámetros, sin sus valores"""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {parameter_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {_value_shape(value)}' for name, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(_value_shape(value) for value in parameters) + ')'
+    return _value_shape(parameters)
+
+
+def _row_bytes(row) -> int:
+    return sum(len(value) if isinstance(value, (str, bytes, bytearray, memoryview)) else 8
+               for value in row if value is not None)
+
+
+class CountingCursor:
+    """Cursor DBAPI que cuenta las filas y bytes que se leen de él"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.rows = 0
+        self.bytes = 0
+
+    def _count(self, rows):
+        self.rows += len(rows)
+        self.bytes += sum(_row_bytes(row) for row in rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count((row,))
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count((row,))
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class StatementRecord:
+    __slots__ = ('statement', 'normalized', 'parameters', 'shape', 'duration', 'cursor', 'rowcount')
+
+    def __init__(self, statement, parameters, executemany, duration, cursor, rowcount):
+        self.statement = statement
+        self.normalized = normalize_sql(statement)
+        self.parameters = None if executemany else parameters
+        self.shape = parameter_shape(parameters, executemany)
+        self.duration = duration
+        self.cursor = cursor
+        self.rowcount = rowcount
+
+    @property
+    def rows(self) -> int:
+        return self.cursor.rows if self.cursor is not None else max(self.rowcount, 0)
+
+    @property
+    def bytes(self) -> int:
+        return self.cursor.bytes if self.cursor is not None else 0
+
+    @property
+    def is_select(self) -> bool:
+        return self.normalized.split(' ', 1)[0].upper() in ('SELECT', 'WITH')
+
+
+class RequestAudit:
+    """Sentencias ejecutadas dentro de una petición (o bloque auditado)"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.statements: List[StatementRecord] = []
+
+
+_current_audit: ContextVar[Optional[RequestAudit]] = ContextVar('query_audit', default=None)
+
+
+class QueryAuditor:
+    def __init__(self, engine, max_statements: int = QUERY_AUDIT_MAX_STATEMENTS,
+                 repeat_threshold: int = QUERY_AUDIT_REPEAT, slow_ms: float = QUERY_AUDIT_SLOW_MS,
+                 large_fetch_kb: int = QUERY_AUDIT_LARGE_FETCH_KB, explain: bool = True):
+        self.engine = engine
+        self.max_statements = max_statements
+        self.repeat_threshold = repeat_threshold
+        self.slow_ms = slow_ms
+        self.large_fetch_bytes = large_fetch_kb * 1024
+        self.explain_plans = explain
+
+    def install(self) -> "QueryAuditor":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current_audit.get() is not None:
+            context._audit_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        audit = _current_audit.get()
+        started = getattr(context, '_audit_started', None)
+        if audit is None or started is None:
+            return
+        counting = None
+        # El resultado (también el buffered de yield_per/stream_results) se arma
+        # después de este evento leyendo context.cursor: envolverlo cuenta lo que
+        # realmente se trae. Si otro ya lo reemplazó no se toca (filas = rowcount).
+        if cursor.description is not None and context is not None and getattr(context, 'cursor', None) is cursor:
+            counting = context.cursor = CountingCursor(cursor)
+        audit.statements.append(StatementRecord(
+            statement, parameters, executemany, time.perf_counter() - started, counting, cursor.rowcount
+        ))
+
+    @contextmanager
+    def audit(self, label: str):
+        """Auditar las sentencias del bloque y reportar al salir"""
+        audit = RequestAudit(label)
+        token = _current_audit.set(audit)
+        try:
+            yield audit
+        finally:
+            _current_audit.reset(token)
+            self.report(audit)
+
+    # === ANÁLISIS ===
+
+    def findings(self, audit: RequestAudit) -> list:
+        """[(motivo, sentencia)] de lo que hay que revisar en la petición"""
+        statements = audit.statements
+        found = []
+        if len(statements) > self.max_statements:
+            found.append((f"{len(statements)} sentencias (máximo {self.max_statements})", None))
+
+        repeated = Counter(record.normalized for record in statements)
+        for normalized, count in repeated.items():
+            if count >= self.repeat_threshold:
+                first = next(record for record in statements if record.normalized == normalized)
+                found.append((f"repetida {count} veces (posible N+1)", first))
+
+        for record in statements:
+            if record.duration * 1000 > self.slow_ms:
+                found.append((f"lenta {record.duration * 1000:.1f}ms", record))
+            if record.bytes > self.large_fetch_bytes:
+                found.append((f"trae {record.bytes / 1024 / 1024:.2f}MB", record))
+        return found
+
+    def explain(self, record: StatementRecord) -> List[str]:
+        """Plan de ejecución de un SELECT (sin ejecutarlo)"""
+        if not record.is_select or record.parameters is None:
+            return []
+        prefix = "EXPLAIN QUERY PLAN " if self.engine.dialect.name == 'sqlite' else "EXPLAIN "
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + record.statement, record.parameters).fetchall()
+        except Exception as error:
+            return [f"(EXPLAIN no disponible: {error})"]
+        # SQLite: (id, parent, notused, detail); PostgreSQL: (QUERY PLAN,)
+        return [str(row[-1]) for row in rows]
+
+    def report(self, audit: RequestAudit):
+        found = self.findings(audit)
+        if not found:
+            return
+
+        db_ms = sum(record.duration for record in audit.statements) * 1000
+        print(f"🐢 Consultas a revisar en {audit.label}: {len(audit.statements)} sentencias, {db_ms:.1f}ms en BD")
+        explained = set()
+        for reason, record in found:
+            if record is None:
+                print(f"   - {reason}")
+                continue
+            print(f"   - {reason}: {record.normalized[:SQL_PREVIEW_CHARS]}")
+            print(f"     parámetros {record.shape} | filas={record.rows} | bytes={record.bytes}")
+            if self.explain_plans and record.normalized not in explained:
+                explained.add(record.normalized)
+                for line in self.explain(record):
+                    print(f"     📋 {line}")
+
+
+class QueryAuditMiddleware:
+    """Middleware ASGI que audita las sentencias SQL de cada petición"""
+
+    def __init__(self, app: ASGIApp, auditor: QueryAuditor) -> None:
+        self.app = app
+        self.auditor = auditor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        audit = RequestAudit(f"{scope['method']} {scope['path']}")
+        token = _current_audit.set(audit)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_audit.reset(token)
+            audit.label = f"{scope['method']} {route_template(scope)} ({scope['path']})"
+            # EXPLAIN consulta la base: fuera del event loop
+            await run_in_threadpool(self.auditor.report, audit)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Escáner de integridad de imágenes
+
+Valida una sola vez cada imagen base64 guardada (decodificación completa, detecta
+archivos truncados) y guarda el resultado en la tabla image_metadata: válida,
+truncada, dimensiones, formato, tamaño y hash. El endpoint /api/images confía en
+ese registro mientras el hash de la imagen no cambie.
+
+Solo se revisan las imágenes sin registro o que pudieron cambiar (otro tamaño o
+reparación modificada después de la última revisión); si el hash coincide no se
+vuelve a decodificar.
+
+Uso:
+    python scan_images.py                # revisar imágenes nuevas o modificadas
+    python scan_images.py --full         # revisar todas (igual solo decodifica si cambió el hash)
+    python scan_images.py --workers 4    # decodificar en paralelo
+    python scan_images.py --report       # solo mostrar el resumen de la tabla
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import case, func, or_
+
+from crud import image_metadata_crud
+from database import SessionLocal, engine
+from models import Base, ImageMetadata, RepairCard
+from services.image_integrity import content_hash, inspect_row
+
+
+class ImageScanner:
+    """Valida por lotes las imágenes pendientes y guarda el resultado"""
+
+    def __init__(self, session_factory, batch_size: int = 50, workers: int = 1, full: bool = False):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.workers = workers
+        self.full = full
+        self.stats = {'checked': 0, 'unchanged': 0, 'valid': 0, 'invalid': 0, 'truncated': 0}
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Detener después del lote en curso (al apagar el servidor)"""
+        self._stop.set()
+
+    def _pending_batch(self, db, last_id: int):
+        query = (
+            db.query(RepairCard.id, RepairCard.image_url, ImageMetadata.content_hash)
+            .outerjoin(ImageMetadata, ImageMetadata.repair_id == RepairCard.id)
+            .filter(RepairCard.id > last_id, RepairCard.image_url.like('data:image%'))
+        )
+        if not self.full:
+            query = query.filter(or_(
+                ImageMetadata.repair_id.is_(None),
+                ImageMetadata.stored_size != func.length(RepairCard.image_url),
+                ImageMetadata.checked_at <= RepairCard.updated_at,
+            ))
+        return query.order_by(RepairCard.id).limit(self.batch_size).all()
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        db = self.session_factory()
+        try:
+            last_id = 0
+            while not self._stop.is_set():
+                batch = self._pending_batch(db, last_id)
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+
+                # Mismo hash: la imagen no cambió, no hace falta decodificarla
+                unchanged = [repair_id for repair_id, image_url, digest in batch
+                             if digest is not None and digest == content_hash(image_url)]
+                to_check = [(repair_id, image_url) for repair_id, image_url, digest in batch
+                            if repair_id not in unchanged]
+
+                results = list(pool.map(inspect_row, to_check) if pool else map(inspect_row, to_check))
+                image_metadata_crud.touch(db, unchanged)
+                image_metadata_crud.save_many(db, results)
+                self._count(results, len(unchanged))
+        finally:
+            db.close()
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        if self.stats['checked']:
+            print(f"🔍 Imágenes revisadas: {self.stats['checked']} en {elapsed:.1f}s "
+                  f"({self.stats['valid']} válidas, {self.stats['invalid']} inválidas, "
+                  f"{self.stats['truncated']} truncadas, {self.stats['unchanged']} sin cambios)")
+        return self.stats
+
+    def _count(self, results, unchanged: int):
+        self.stats['unchanged'] += unchanged
+        self.stats['checked'] += len(results) + unchanged
+        for _, values in results:
+            if values['is_valid']:
+                self.stats['valid'] += 1
+            else:
+                self.stats['invalid'] += 1
+                self.stats['truncated'] += int(values['is_truncated'])
+                print(f"   ⚠️  Imagen inválida: {values['error']}")
+
+
+def print_report(db):
+    """Resumen de la tabla image_metadata (sin tocar las imágenes)"""
+    total, valid, truncated, stored = db.query(
+        func.count(ImageMetadata.repair_id),
+        func.coalesce(func.sum(case((ImageMetadata.is_valid, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((ImageMetadata.is_truncated, 1), else_=0)), 0),
+        func.coalesce(func.sum(ImageMetadata.stored_size), 0),
+    ).one()
+    print(f"📊 Imágenes registradas: {total} ({stored / 1024 / 1024:.2f} MB)")
+    print(f"   ✅ Válidas: {valid}")
+    print(f"   ❌ Inválidas: {total - valid} (truncadas: {truncated})")
+
+    broken = (
+        db.query(ImageMetadata.repair_id, ImageMetadata.error)
+        .filter(ImageMetadata.is_valid.is_(False))
+        .order_by(ImageMetadata.repair_id)
+        .limit(20)
+        .all()
+    )
+    for repair_id, error in broken:
+        print(f"   - ID {repair_id}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validar las imágenes guardadas y registrar el resultado")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para decodificar")
+    parser.add_argument("--full", action="store_true", help="Revisar todas las imágenes")
+    parser.add_argument("--report", action="store_true", help="Solo mostrar el resumen")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    if not args.report:
+        ImageScanner(SessionLocal, batch_size=args.batch_size, workers=args.workers, full=args.full).run()
+
+    db = SessionLocal()
+    try:
+        print_report(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🚀 Iniciando revisión de imágenes...")
+    main()
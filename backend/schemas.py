@@ -47,6 +47,7 @@ class RepairCardUpdate(BaseModel):
     actual_cost: Optional[Decimal] = Field(None, ge=0)
     image_url: Optional[str] = None
     has_charger: Optional[bool] = None
+    version: Optional[int] = Field(None, ge=1, description="Versión conocida por el cliente")
 
     @validator('status')
     def validate_status(cls, v):
@@ -68,6 +69,7 @@ class RepairCardStatusUpdate(BaseModel):
     """Esquema para actualizar solo el estado"""
     status: str = Field(..., description="Nuevo estado")
     note: Optional[str] = Field(None, max_length=500, description="Nota opcional sobre el cambio")
+    version: Optional[int] = Field(None, ge=1, description="Versión conocida por el cliente")
 
     @validator('status')
     def validate_status(cls, v):
@@ -93,6 +95,7 @@ class RepairCardResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     notes: List[Any]
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -0,0 +1,107 @@
+"""
+Serialización rápida de listas de reparaciones.
+
+Los endpoints de listado consultan solo las columnas necesarias como tuplas y
+las convierten directamente a bytes JSON, sin construir un RepairCardResponse
+por fila. La salida es equivalente a la del modelo de respuesta.
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Sequence
+
+from fastapi.responses import Response
+
+from models import RepairCard
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback si orjson no está instalado
+    orjson = None
+
+# Columnas en el mismo orden que los campos de RepairCardResponse
+REPAIR_FIELDS = (
+    'id',
+    'owner_name',
+    'problem_type',
+    'whatsapp_number',
+    'due_date',
+    'description',
+    'status',
+    'priority',
+    'estimated_cost',
+    'actual_cost',
+    'image_url',
+    'has_charger',
+    'created_at',
+    'updated_at',
+    'notes',
+    'version',
+)
+
+REPAIR_COLUMNS = tuple(getattr(RepairCard, field) for field in REPAIR_FIELDS)
+
+_IMAGE_INDEX = REPAIR_FIELDS.index('image_url')
+
+
+def _row_to_dict(row: Sequence) -> dict:
+    """Convertir una fila (tupla en el orden de REPAIR_FIELDS) a diccionario"""
+    (repair_id, owner_name, problem_type, whatsapp_number, due_date, description,
+     status, priority, estimated_cost, actual_cost, image_url, has_charger,
+     created_at, updated_at, notes, version) = row
+    return {
+        'id': repair_id,
+        'owner_name': owner_name,
+        'problem_type': problem_type,
+        'whatsapp_number': whatsapp_number,
+        'due_date': due_date,
+        'description': description or '',
+        'status': status,
+        'priority': priority,
+        'estimated_cost': float(estimated_cost) if estimated_cost is not None else 0.0,
+        'actual_cost': float(actual_cost) if actual_cost is not None else 0.0,
+        'image_url': image_url or '',
+        'has_charger': bool(has_charger),
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'notes': notes or [],
+        'version': version or 1,
+    }
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(data) -> bytes:
+    """Codificar a JSON compacto (orjson si está disponible)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def serialize_repair_rows(rows: Iterable[Sequence]) -> bytes:
+    """Serializar filas de reparaciones a bytes JSON"""
+    return dumps([_row_to_dict(row) for row in rows])
+
+
+def strip_large_images(rows: Iterable[Sequence], max_length: int = 1000) -> list:
+    """Reemplazar imágenes grandes por un marcador (búsqueda rápida)"""
+    result = []
+    for row in rows:
+        image_url = row[_IMAGE_INDEX] or ''
+        if len(image_url) > max_length:
+            row = tuple(row)
+            row = row[:_IMAGE_INDEX] + (f"[IMAGE_{len(image_url)}]",) + row[_IMAGE_INDEX + 1:]
+        result.append(row)
+    return result
+
+
+def repair_list_response(rows: Iterable[Sequence]) -> Response:
+    """Respuesta JSON ya serializada para endpoints de listado"""
+    return Response(content=serialize_repair_rows(rows), media_type="application/json")
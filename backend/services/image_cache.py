@@ -0,0 +1,60 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+# Memoria máxima para derivados de imágenes (WebP/AVIF/JPEG reducidos)
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", 64))
+
+
+class BytesLRUCache:
+    """
+    Caché LRU de bytes acotada por tamaño total.
+
+    Las claves deben identificar la versión del contenido, p. ej.
+    (repair_id, version, formato): al cambiar la imagen cambia la versión y las
+    entradas viejas simplemente dejan de usarse hasta ser expulsadas.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, str]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        """(contenido, media_type) o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, content: bytes, media_type: str):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous[0])
+            self._entries[key] = (content, media_type)
+            self._total_bytes += len(content)
+            while self._total_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Caché global de derivados servidos por /api/images
+image_derivative_cache = BytesLRUCache()
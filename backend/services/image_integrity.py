@@ -0,0 +1,54 @@
+import hashlib
+from typing import Optional
+
+from .image_pipeline import ImagePipeline
+
+
+def content_hash(image_url: str) -> str:
+    """Hash del data URI tal como está guardado (no hace falta decodificar)"""
+    return hashlib.sha256(image_url.encode('utf-8')).hexdigest()
+
+
+def inspect_image(image_url: str, image: Optional[ImagePipeline] = None) -> dict:
+    """
+    Validar una imagen decodificándola completa (detecta archivos truncados,
+    que pasan la lectura de cabecera) y devolver los campos de ImageMetadata.
+    """
+    image = image or ImagePipeline(image_url)
+    result = {
+        'content_hash': content_hash(image_url),
+        'stored_size': len(image_url),
+        'byte_size': len(image.data),
+        'mime_type': image.mime_type,
+        'is_valid': False,
+        'is_truncated': False,
+        'error': None,
+        'format': None,
+        'width': None,
+        'height': None,
+    }
+
+    if not image.is_valid:
+        result['error'] = (image.error or 'Imagen inválida')[:255]
+        return result
+
+    header = image.header_image
+    result['format'] = header.format
+    result['width'], result['height'] = image.oriented_size
+
+    try:
+        image.load()
+    except Exception as e:
+        result['is_truncated'] = 'truncated' in str(e).lower()
+        result['error'] = f"Error decodificando imagen: {e}"[:255]
+        return result
+
+    result['is_valid'] = True
+    return result
+
+
+def inspect_row(row) -> tuple:
+    """(id, data URI) -> (id, resultado); usable desde un pool de procesos"""
+    repair_id, image_url = row
+    with ImagePipeline(image_url) as image:
+        return repair_id, inspect_image(image_url, image)
@@ -0,0 +1,255 @@
+import base64
+import binascii
+import io
+import logging
+import math
+from typing import Iterable, Optional, Tuple
+
+from PIL import Image
+
+from compression import parse_accept
+
+logger = logging.getLogger(__name__)
+
+# Umbral a partir del cual una imagen se considera grande (tamaño del data URI)
+LARGE_IMAGE_BYTES = 500000
+
+# Formatos de salida en orden de preferencia (menos bytes primero)
+OUTPUT_FORMATS = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+
+def negotiate_format(accept: Optional[str], available: Iterable[str]) -> str:
+    """
+    Elegir el formato de salida según el header Accept del cliente.
+    JPEG es el último recurso: todos los navegadores lo soportan.
+    """
+    accepted = parse_accept(accept)
+    for format_name in OUTPUT_FORMATS:
+        if format_name not in available or format_name == 'JPEG':
+            continue
+        mime = OUTPUT_FORMATS[format_name]
+        # Solo si se pide explícitamente (image/* no garantiza soporte de AVIF/WebP)
+        if accepted.get(mime, 0.0) > 0:
+            return format_name
+    return 'JPEG'
+
+
+# Firmas (magic bytes) de los formatos aceptados en subidas binarias
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Detectar el tipo de imagen por los primeros bytes (no por el nombre ni el Content-Type)"""
+    for signature, mime in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis'):
+        return 'image/avif'
+    return None
+
+
+class ImagePipeline:
+    """
+    Imagen de un data URI decodificada una sola vez.
+
+    El base64 se decodifica al construir el objeto y el buffer se comparte entre
+    validación, información, compresión y miniaturas. `Image.open` solo lee la
+    cabecera (dimensiones/formato); los píxeles se decodifican en `load()` y
+    únicamente si alguien los necesita.
+    """
+
+    MIN_BASE64_LENGTH = 100  # Muy corto para ser una imagen real
+    MIN_DECODED_BYTES = 50
+
+    def __init__(self, data_uri: Optional[str] = None):
+        self._data_uri = data_uri
+        self.mime_type: Optional[str] = None
+        self.data: bytes = b''
+        self.error: Optional[str] = None
+        self._header_image: Optional[Image.Image] = None
+        self._header_read = False
+        self._loaded: Optional[Image.Image] = None
+        self._loaded_full = False
+        if data_uri is not None:
+            self._parse()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, mime_type: Optional[str] = None) -> 'ImagePipeline':
+        """Pipeline sobre bytes binarios (subidas) sin pasar por base64"""
+        pipeline = cls()
+        pipeline.data = data
+        pipeline.mime_type = mime_type or sniff_image_type(data[:16])
+        if pipeline.mime_type is None:
+            pipeline.error = 'Tipo de imagen no reconocido'
+        elif len(data) < cls.MIN_DECODED_BYTES:
+            pipeline.error = f"Datos de imagen muy pequeños: {len(data)} bytes"
+        return pipeline
+
+    @property
+    def data_uri(self) -> str:
+        """Data URI de la imagen (se construye solo si alguien lo pide)"""
+        if self._data_uri is None:
+            self._data_uri = f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+        return self._data_uri
+
+    # --- Parseo ---
+
+    def _parse(self):
+        if not self._data_uri or not self._data_uri.startswith('data:image/'):
+            self.error = 'No es un data URI de imagen'
+            return
+
+        header, _, payload = self._data_uri.partition(',')
+        self.mime_type = header.split(';')[0].split(':')[1]
+
+        if len(payload) < self.MIN_BASE64_LENGTH:
+            self.error = f"Imagen base64 muy corta: {len(payload)} caracteres"
+            return
+
+        try:
+            self.data = base64.b64decode(payload, validate=True)
+        except (binascii.Error, ValueError) as e:
+            self.error = f"Base64 inválido: {e}"
+            return
+
+        if len(self.data) < self.MIN_DECODED_BYTES:
+            self.error = f"Datos de imagen muy pequeños: {len(self.data)} bytes"
+
+    @property
+    def buffer(self) -> memoryview:
+        """Vista sin copia de los bytes decodificados"""
+        return memoryview(self.data)
+
+    @property
+    def header_image(self) -> Optional[Image.Image]:
+        """Imagen abierta de forma perezosa (solo cabecera, sin decodificar píxeles)"""
+        if not self._header_read:
+            self._header_read = True
+            if self.error is None:
+                try:
+                    self._header_image = Image.open(io.BytesIO(self.data))
+                except Exception as e:
+                    self.error = f"Error abriendo imagen: {e}"
+        return self._header_image
+
+    # --- Información ---
+
+    @property
+    def is_valid(self) -> bool:
+        img = self.header_image
+        if img is None:
+            return False
+        width, height = img.size
+        if width < 1 or height < 1:
+            self.error = f"Dimensiones inválidas: {width}x{height}"
+            return False
+        return True
+
+    @property
+    def size_bytes(self) -> int:
+        """Tamaño del data URI completo (criterio histórico de 'imagen grande')"""
+        if self._data_uri is not None:
+            return len(self._data_uri)
+        # Calculado sin codificar: prefijo + 4 caracteres por cada 3 bytes
+        return len(f"data:{self.mime_type};base64,") + 4 * math.ceil(len(self.data) / 3)
+
+    @property
+    def is_large(self) -> bool:
+        return self.size_bytes > LARGE_IMAGE_BYTES
+
+    def info(self) -> dict:
+        """Información de la imagen (mismo formato que get_image_info)"""
+        if not self.is_valid:
+            return {}
+
+        img = self.header_image
+        width, height = img.size
+        size_bytes = self.size_bytes
+        return {
+            'type': self.mime_type,
+            'format': img.format,
+            'mode': img.mode,
+            'width': width,
+            'height': height,
+            'size_bytes': size_bytes,
+            'size_kb': round(size_bytes / 1024, 2),
+            'size_mb': round(size_bytes / 1024 / 1024, 2),
+            'is_large': size_bytes > LARGE_IMAGE_BYTES,
+            'dimensions': f"{width}x{height}"
+        }
+
+    # --- Decodificación ---
+
+    @property
+    def orientation(self) -> int:
+        """Orientación EXIF (1 si no hay)"""
+        img = self.header_image
+        if img is None:
+            return 1
+        try:
+            return img.getexif().get(0x0112, 1)
+        except Exception:
+            return 1
+
+    @property
+    def oriented_size(self) -> Optional[Tuple[int, int]]:
+        """Dimensiones tal como se ven (aplicando la rotación EXIF)"""
+        img = self.header_image
+        if img is None:
+            return None
+        width, height = img.size
+        return (height, width) if self.orientation in (5, 6, 7, 8) else (width, height)
+
+    def load(self, min_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        Decodificar los píxeles; las llamadas siguientes reutilizan el resultado.
+
+        Con `min_size` (en píxeles almacenados, sin rotar) los JPEG se decodifican
+        en modo draft: libjpeg escala la DCT a 1/2, 1/4 u 1/8 y entrega la menor
+        imagen que sigue cubriendo `min_size`, ahorrando CPU y memoria.
+        """
+        if self._loaded is not None:
+            if min_size is None and self._loaded_full:
+                return self._loaded
+            if min_size is not None and (self._loaded.width >= min_size[0] and self._loaded.height >= min_size[1]):
+                return self._loaded
+
+        if not self.is_valid:
+            raise ValueError(self.error or 'Formato de imagen inválido')
+
+        # Abrir de nuevo sobre el mismo buffer: la imagen de cabecera conserva
+        # las dimensiones originales (draft cambia el tamaño reportado)
+        img = Image.open(io.BytesIO(self.data))
+        if min_size is not None and img.format == 'JPEG':
+            mode = 'RGB' if img.mode not in ('L', 'CMYK') else img.mode
+            img.draft(mode, min_size)
+        img.load()
+
+        self._loaded = img
+        self._loaded_full = min_size is None or img.size == self.header_image.size
+        return img
+
+    def close(self):
+        for img in (self._header_image, self._loaded):
+            if img is not None:
+                img.close()
+        self._header_image = None
+        self._loaded = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,138 +2,169 @@ import os
 import base64
 import subprocess
 import tempfile
-import hashlib
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple, Union
 import logging
 
+from .image_pipeline import ImagePipeline
+from .placeholders import placeholder_data_uri
+
+try:
+    import resource
+except ImportError:  # Windows: sin límites de recursos por proceso
+    resource = None
+# prlimit aplica los límites a otro proceso (solo Linux)
+prlimit = getattr(resource, 'prlimit', None)
+
 logger = logging.getLogger(__name__)
 
+# Límites del pipeline de ffmpeg
+FFMPEG_MAX_WORKERS = int(os.getenv("FFMPEG_MAX_WORKERS", 2))
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", 30))
+FFMPEG_MEMORY_LIMIT_MB = int(os.getenv("FFMPEG_MEMORY_LIMIT_MB", 512))
+
 class ImageService:
-    def __init__(self):
-        # Directorio temporal para las imágenes
+    # ffmpeg solo se usa para generar JPEG
+    output_formats = ('JPEG',)
+
+    def __init__(self, max_workers: int = FFMPEG_MAX_WORKERS, timeout: float = FFMPEG_TIMEOUT,
+                 memory_limit_mb: int = FFMPEG_MEMORY_LIMIT_MB):
+        # Directorio temporal heredado (solo para limpiar archivos de versiones anteriores)
         self.temp_dir = Path(tempfile.gettempdir()) / "repair_images"
         self.temp_dir.mkdir(exist_ok=True)
+        # Máximo de procesos ffmpeg simultáneos
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
         
-    def compress_image(self, base64_image: str, max_width: int = 800, quality: int = 2) -> str:
+    def _limit_resources(self, pid: int):
+        """
+        Límites de memoria y CPU para el proceso ffmpeg ya lanzado. No se usa
+        preexec_fn: con hilos (threadpool) el hijo puede quedar bloqueado. Se
+        aplican antes de escribir la imagen, así ffmpeg aún no decodificó nada.
+        """
+        memory_bytes = self.memory_limit_mb * 1024 * 1024
+        cpu_seconds = int(self.timeout) + 1
+        try:
+            prlimit(pid, resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+            prlimit(pid, resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        except ProcessLookupError:
+            pass  # ffmpeg ya terminó (argumentos inválidos): el error sale de su stderr
+
+    def run_ffmpeg(self, image_bytes: bytes, max_width: int = 800, quality: int = 2) -> bytes:
+        """
+        Redimensiona y recomprime una imagen con ffmpeg usando stdin/stdout
+        (sin archivos temporales). Devuelve los bytes JPEG resultantes.
+        """
+        cmd = [
+            'ffmpeg',
+            '-hide_banner', '-loglevel', 'error',
+            '-threads', '1',
+            '-f', 'image2pipe', '-i', 'pipe:0',
+            '-vf', f'scale={max_width}:-1',
+            '-frames:v', '1',
+            '-q:v', str(quality),
+            '-f', 'image2pipe', '-c:v', 'mjpeg',
+            'pipe:1'
+        ]
+
+        if not self._workers.acquire(timeout=self.timeout):
+            raise TimeoutError('Todos los procesos de ffmpeg están ocupados')
+        try:
+            with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE) as process:
+                try:
+                    if prlimit is not None:
+                        self._limit_resources(process.pid)
+                    stdout, stderr = process.communicate(image_bytes, timeout=self.timeout)
+                except BaseException:
+                    process.kill()
+                    process.communicate()
+                    raise
+        finally:
+            self._workers.release()
+
+        if process.returncode != 0 or not stdout:
+            stderr = stderr.decode(errors='replace')
+            logger.error(f"Error en ffmpeg: {stderr}")
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr)
+        return stdout
+
+    def open_image(self, image: Union[str, ImagePipeline]) -> ImagePipeline:
+        """
+        Obtiene el pipeline de una imagen (decodifica el base64 una sola vez).
+        Acepta un data URI o un pipeline ya creado.
+        """
+        return image if isinstance(image, ImagePipeline) else ImagePipeline(image)
+
+    def compress_image_bytes(self, image: Union[str, ImagePipeline], max_width: int = 800,
+                             quality: Optional[int] = None, format: str = 'JPEG') -> bytes:
+        """Comprime una imagen y devuelve los bytes JPEG (sin pasar por base64)"""
+        if format not in self.output_formats:
+            raise ValueError(f'Formato de salida no soportado: {format}')
+        quality = quality if quality is not None else 2
+        pipeline = self.open_image(image)
+        if not pipeline.data:
+            raise ValueError(pipeline.error or 'Formato de imagen inválido')
+        return self.run_ffmpeg(pipeline.data, max_width, quality)
+
+    def compress_image(self, base64_image: Union[str, ImagePipeline], max_width: int = 800, quality: int = 2) -> str:
         """
         Comprime una imagen en base64 usando ffmpeg
         
         Args:
-            base64_image: Imagen en formato base64
+            base64_image: Imagen en formato base64 (o pipeline ya decodificado)
             max_width: Ancho máximo de la imagen comprimida
             quality: Calidad de compresión (1-31, menor es mejor calidad)
         
         Returns:
             Imagen comprimida en formato base64
         """
+        pipeline = self.open_image(base64_image)
         try:
-            # Extraer el tipo de imagen y los datos en base64
-            if not base64_image.startswith('data:'):
-                raise ValueError('Formato de imagen inválido')
+            # Comprimir la imagen con ffmpeg (entrada y salida por pipes)
+            compressed_data = self.compress_image_bytes(pipeline, max_width, quality)
+            compressed_base64 = f"data:image/jpeg;base64,{base64.b64encode(compressed_data).decode()}"
             
-            # Separar header y datos
-            header, image_data = base64_image.split(',', 1)
+            # Log de compresión
+            original_size = pipeline.size_bytes
+            compressed_size = len(compressed_base64)
+            compression_ratio = (1 - compressed_size / original_size) * 100
             
-            # Extraer tipo de imagen
-            image_type = header.split(';')[0].split(':')[1]
+            logger.info(f"Imagen comprimida: Original={original_size} bytes, "
+                       f"Comprimida={compressed_size} bytes, "
+                       f"Reducción={compression_ratio:.1f}%")
             
-            # Generar nombres de archivo únicos
-            unique_id = hashlib.md5(image_data.encode()).hexdigest()[:16]
-            input_path = self.temp_dir / f"{unique_id}_input.jpg"
-            output_path = self.temp_dir / f"{unique_id}_output.jpg"
-            
-            try:
-                # Guardar imagen original
-                with open(input_path, 'wb') as f:
-                    f.write(base64.b64decode(image_data))
-                
-                # Comprimir la imagen con ffmpeg
-                cmd = [
-                    'ffmpeg',
-                    '-i', str(input_path),
-                    '-vf', f'scale={max_width}:-1',
-                    '-q:v', str(quality),
-                    '-y',  # Sobrescribir archivo de salida
-                    str(output_path)
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode != 0:
-                    logger.error(f"Error en ffmpeg: {result.stderr}")
-                    raise subprocess.CalledProcessError(result.returncode, cmd, result.stderr)
-                
-                # Leer imagen comprimida
-                with open(output_path, 'rb') as f:
-                    compressed_data = f.read()
-                
-                compressed_base64 = f"data:{image_type};base64,{base64.b64encode(compressed_data).decode()}"
-                
-                # Log de compresión
-                original_size = len(base64_image)
-                compressed_size = len(compressed_base64)
-                compression_ratio = (1 - compressed_size / original_size) * 100
-                
-                logger.info(f"Imagen comprimida: Original={original_size} bytes, "
-                           f"Comprimida={compressed_size} bytes, "
-                           f"Reducción={compression_ratio:.1f}%")
-                
-                return compressed_base64
-                
-            finally:
-                # Limpiar archivos temporales
-                for file_path in [input_path, output_path]:
-                    if file_path.exists():
-                        file_path.unlink()
+            return compressed_base64
                         
         except Exception as error:
             logger.error(f"Error al comprimir la imagen: {error}")
             # Si falla la compresión, devolver la imagen original
-            return base64_image
+            return pipeline.data_uri
     
-    def is_base64_image(self, data: str) -> bool:
+    def is_base64_image(self, data: Union[str, ImagePipeline]) -> bool:
         """
         Verifica si una cadena es una imagen base64 válida
         """
-        try:
-            if not data.startswith('data:image/'):
-                return False
-            
-            header, image_data = data.split(',', 1)
-            
-            # Intentar decodificar
-            base64.b64decode(image_data, validate=True)
-            return True
-            
-        except Exception:
-            return False
+        return self.open_image(data).is_valid
     
-    def get_image_info(self, base64_image: str) -> dict:
+    def get_image_info(self, base64_image: Union[str, ImagePipeline]) -> dict:
         """
         Obtiene información básica de una imagen base64
         """
         try:
-            if not self.is_base64_image(base64_image):
-                return {}
-            
-            header, image_data = base64_image.split(',', 1)
-            image_type = header.split(';')[0].split(':')[1]
-            
-            # Calcular tamaño aproximado en bytes
-            size_bytes = len(base64_image)
-            
-            return {
-                'type': image_type,
-                'size_bytes': size_bytes,
-                'size_kb': round(size_bytes / 1024, 2),
-                'is_large': size_bytes > 500000  # Mayor a 500KB
-            }
-            
+            return self.open_image(base64_image).info()
         except Exception as error:
             logger.error(f"Error obteniendo info de imagen: {error}")
             return {}
     
+    def create_placeholder_image(self, text: str = "Sin Imagen", size: Tuple[int, int] = (400, 300)) -> str:
+        """
+        Crea una imagen placeholder con texto (dibujada con Pillow una sola vez por texto y tamaño)
+        """
+        return placeholder_data_uri(text, size)
+    
     def cleanup_temp_files(self):
         """
         Limpia archivos temporales antiguos
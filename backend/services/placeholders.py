@@ -0,0 +1,75 @@
+import base64
+import io
+import logging
+from functools import lru_cache
+from typing import Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Fuentes comunes del sistema (se prueban una sola vez)
+FONT_PATHS = (
+    "arial.ttf",
+    "Arial.ttf",
+    "/System/Library/Fonts/Arial.ttf",  # macOS
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
+    "C:/Windows/Fonts/arial.ttf",  # Windows
+)
+FONT_SIZE = 24
+
+# Placeholders distintos que se guardan ya codificados (uno por reparación rota)
+PLACEHOLDER_CACHE_SIZE = 512
+
+# Placeholder mínimo si Pillow no puede dibujar
+FALLBACK_SVG = base64.b64decode(
+    "PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iMTAwJSIgaGVpZ2h0PSIxMDAlIiBmaWxsPSIjZjBmMGYwIi8+PHRleHQgeD0iNTAlIiB5PSI1MCUiIGZvbnQtZmFtaWx5PSJBcmlhbCIgZm9udC1zaXplPSIyMCIgZmlsbD0iIzgwODA4MCIgdGV4dC1hbmNob3I9Im1pZGRsZSIgZHk9Ii4zZW0iPkVxdWlwbyBzaW4gaW1hZ2VuPC90ZXh0Pjwvc3ZnPg=="
+)
+
+
+@lru_cache(maxsize=None)
+def load_font(size: int = FONT_SIZE):
+    """Fuente del sistema (o la de Pillow por defecto), cargada una sola vez"""
+    for font_path in FONT_PATHS:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=PLACEHOLDER_CACHE_SIZE)
+def render_placeholder(text: str = "Sin Imagen", size: Tuple[int, int] = (400, 300),
+                       bg_color: Tuple[int, int, int] = (240, 240, 240),
+                       text_color: Tuple[int, int, int] = (128, 128, 128)) -> bytes:
+    """JPEG con el texto centrado; se dibuja una sola vez por (texto, tamaño, colores)"""
+    img = Image.new('RGB', size, bg_color)
+    draw = ImageDraw.Draw(img)
+    font = load_font()
+
+    # Calcular posición del texto (centrado)
+    bbox = draw.textbbox((0, 0), text, font=font)
+    x = (size[0] - (bbox[2] - bbox[0])) // 2
+    y = (size[1] - (bbox[3] - bbox[1])) // 2
+    draw.text((x, y), text, fill=text_color, font=font)
+
+    # Agregar un borde sutil
+    draw.rectangle([0, 0, size[0] - 1, size[1] - 1], outline=(200, 200, 200), width=2)
+
+    output_buffer = io.BytesIO()
+    img.save(output_buffer, format='JPEG', quality=90)
+    return output_buffer.getvalue()
+
+
+def placeholder_image(text: str = "Sin Imagen", size: Tuple[int, int] = (400, 300), **colors) -> Tuple[bytes, str]:
+    """(contenido, media_type) del placeholder; SVG fijo si no se pudo dibujar"""
+    try:
+        return render_placeholder(text, tuple(size), **colors), 'image/jpeg'
+    except Exception as error:
+        logger.error(f"Error creando imagen placeholder: {error}")
+        return FALLBACK_SVG, 'image/svg+xml'
+
+
+def placeholder_data_uri(text: str = "Sin Imagen", size: Tuple[int, int] = (400, 300), **colors) -> str:
+    content, media_type = placeholder_image(text, size, **colors)
+    return f"data:{media_type};base64,{base64.b64encode(content).decode()}"
@@ -0,0 +1,285 @@
+"""
+Servir el frontend compilado (frontend/dist) con variantes precomprimidas
+(.br / .gz generadas por precompress_static.py) y headers de caché.
+
+`FrontendCache` mantiene en memoria (LRU acotada por bytes) el contenido, el
+ETag y las variantes precomprimidas de cada archivo, de modo que las rutas
+SPA y los assets se responden sin tocar el disco y los 304 salen de memoria.
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from compression import PRECOMPRESSED_SUFFIXES, choose_encoding
+
+# Los archivos de /assets llevan hash en el nombre: se pueden cachear para siempre
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# index.html y demás archivos sin hash: caché corta para recoger nuevos despliegues
+SHORT_CACHE = "public, max-age=60, must-revalidate"
+
+
+def cache_control_for(relative_path: str) -> str:
+    return IMMUTABLE_CACHE if relative_path.startswith("assets/") else SHORT_CACHE
+
+
+def precompressed_file_response(
+    full_path,
+    stat_result: os.stat_result,
+    request_headers: Headers,
+    cache_control: str,
+    status_code: int = 200,
+) -> Response:
+    """FileResponse que usa el hermano .br/.gz si existe y el cliente lo acepta"""
+    full_path = str(full_path)
+    media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+    headers = {"Cache-Control": cache_control}
+
+    available = [
+        encoding for encoding, suffix in PRECOMPRESSED_SUFFIXES.items()
+        if os.path.isfile(full_path + suffix)
+    ]
+    if available:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = choose_encoding(request_headers.get("accept-encoding"), available)
+        if encoding:
+            full_path += PRECOMPRESSED_SUFFIXES[encoding]
+            stat_result = os.stat(full_path)
+            headers["Content-Encoding"] = encoding
+
+    response = FileResponse(
+        full_path,
+        status_code=status_code,
+        stat_result=stat_result,
+        media_type=media_type,
+        headers=headers,
+    )
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and if_none_match == response.headers.get("etag"):
+        return NotModifiedResponse(response.headers)
+    return response
+
+
+@dataclass
+class CachedFile:
+    """Archivo del frontend en memoria con sus variantes por codificación"""
+    media_type: str
+    cache_control: str
+    etag: str
+    variants: Dict[Optional[str], bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return sum(len(content) for content in self.variants.values())
+
+    def response(self, request_headers: Headers) -> Response:
+        encodings = [encoding for encoding in self.variants if encoding is not None]
+        encoding = choose_encoding(request_headers.get("accept-encoding"), encodings) if encodings else None
+
+        etag = self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        if request_headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class FrontendCache:
+    """
+    Caché LRU del frontend compilado.
+
+    - Los archivos se cargan en el primer acceso (o con `warm()` al iniciar);
+      `response_async` hace esa carga en el threadpool, fuera del event loop.
+    - Las rutas inexistentes se recuerdan aparte, en un conjunto acotado
+      (`max_misses`): pedir URLs al azar no expulsa los archivos reales.
+    - Si cambia el mtime de index.html (nuevo build) la caché se vacía; el
+      chequeo se hace como máximo cada `check_interval` segundos.
+    - Archivos mayores a `max_file_bytes` se sirven desde disco.
+    - Se acota por bytes (`max_bytes`) y por número de rutas (`max_entries`).
+    """
+
+    def __init__(
+        self,
+        dist_path: Path,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_file_bytes: int = 4 * 1024 * 1024,
+        check_interval: float = 2.0,
+        max_entries: int = 4096,
+        max_misses: int = 1024,
+    ):
+        self.dist_path = Path(dist_path).resolve()
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+        self.max_misses = max_misses
+        self._entries: "OrderedDict[str, Union[CachedFile, Path]]" = OrderedDict()
+        self._misses: "OrderedDict[str, None]" = OrderedDict()
+        # Los accesos llegan del event loop y del threadpool
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._build_mtime = self._index_mtime()
+        self._last_check = time.monotonic()
+
+    # --- API pública ---
+
+    def warm(self) -> int:
+        """Precargar index.html y los assets hasta llenar el presupuesto"""
+        loaded = 0
+        for file_path in sorted(self.dist_path.rglob("*")):
+            if not file_path.is_file() or file_path.suffix in ('.br', '.gz'):
+                continue
+            if self._total_bytes >= self.max_bytes:
+                break
+            if isinstance(self.lookup(file_path.relative_to(self.dist_path).as_posix()), CachedFile):
+                loaded += 1
+        return loaded
+
+    def lookup(self, relative_path: str) -> Union[CachedFile, Path, None]:
+        """
+        CachedFile si está en memoria, Path si existe pero es demasiado grande
+        para la caché y None si no existe. El resultado queda memorizado.
+        """
+        self._check_for_new_build()
+        found, entry = self._cached(relative_path)
+        if found:
+            return entry
+
+        entry = self._load(relative_path)
+        self._store(relative_path, entry)
+        return entry
+
+    def in_memory(self, relative_path: str, fallback_to_index: bool = True) -> bool:
+        """Si `response` puede responder sin tocar el disco"""
+        self._check_for_new_build()
+        if isinstance(self._entries.get(relative_path), CachedFile):
+            return True
+        if relative_path not in self._misses:
+            return False
+        return not fallback_to_index or isinstance(self._entries.get("index.html"), CachedFile)
+
+    def response(self, relative_path: str, request_headers: Headers, fallback_to_index: bool = True) -> Optional[Response]:
+        """Respuesta para una ruta del frontend; None si no hay nada que servir"""
+        entry = self.lookup(relative_path)
+        if entry is None and fallback_to_index:
+            entry = self.lookup("index.html")
+
+        if isinstance(entry, CachedFile):
+            return entry.response(request_headers)
+        if isinstance(entry, Path):
+            return precompressed_file_response(
+                entry, entry.stat(), request_headers, cache_control_for(relative_path)
+            )
+        return None
+
+    async def response_async(self, relative_path: str, request_headers: Headers,
+                             fallback_to_index: bool = True) -> Optional[Response]:
+        """Como `response`, pero lo que haya que leer de disco se lee en el threadpool"""
+        if self.in_memory(relative_path, fallback_to_index):
+            return self.response(relative_path, request_headers, fallback_to_index)
+        return await run_in_threadpool(self.response, relative_path, request_headers, fallback_to_index)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._misses.clear()
+            self._total_bytes = 0
+
+    # --- Internos ---
+
+    def _index_mtime(self) -> Optional[float]:
+        try:
+            return (self.dist_path / "index.html").stat().st_mtime
+        except OSError:
+            return None
+
+    def _check_for_new_build(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        mtime = self._index_mtime()
+        if mtime != self._build_mtime:
+            self._build_mtime = mtime
+            self.clear()
+
+    def _resolve(self, relative_path: str) -> Optional[Path]:
+        """Ruta absoluta dentro de dist (evita path traversal)"""
+        try:
+            file_path = (self.dist_path / relative_path).resolve()
+        except (OSError, ValueError):
+            return None
+        if self.dist_path not in file_path.parents or not file_path.is_file():
+            return None
+        return file_path
+
+    def _load(self, relative_path: str) -> Union[CachedFile, Path, None]:
+        file_path = self._resolve(relative_path)
+        if file_path is None or file_path.stat().st_size > self.max_file_bytes:
+            return file_path
+
+        content = file_path.read_bytes()
+        variants = {None: content}
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            compressed_path = file_path.with_name(file_path.name + suffix)
+            if compressed_path.is_file():
+                variants[encoding] = compressed_path.read_bytes()
+
+        return CachedFile(
+            media_type=mimetypes.guess_type(str(file_path))[0] or "text/plain",
+            cache_control=cache_control_for(relative_path),
+            etag=f'"{hashlib.md5(content).hexdigest()[:16]}"',
+            variants=variants,
+        )
+
+    def _cached(self, relative_path: str):
+        with self._lock:
+            if relative_path in self._entries:
+                self._entries.move_to_end(relative_path)
+                return True, self._entries[relative_path]
+            if relative_path in self._misses:
+                self._misses.move_to_end(relative_path)
+                return True, None
+        return False, None
+
+    def _store(self, relative_path: str, entry: Union[CachedFile, Path, None]):
+        with self._lock:
+            if entry is None:
+                self._misses[relative_path] = None
+                while len(self._misses) > self.max_misses:
+                    self._misses.popitem(last=False)
+                return
+            if relative_path in self._entries:
+                return  # Otro hilo lo cargó mientras tanto
+            self._entries[relative_path] = entry
+            if isinstance(entry, CachedFile):
+                self._total_bytes += entry.size
+            self._evict()
+
+    def _evict(self):
+        # Expulsar lo menos usado (index.html siempre se conserva)
+        while self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            evicted_path, evicted = next(
+                ((path, cached) for path, cached in self._entries.items() if path != "index.html"),
+                (None, None),
+            )
+            if evicted_path is None:
+                break
+            del self._entries[evicted_path]
+            if isinstance(evicted, CachedFile):
+                self._total_bytes -= evicted.size
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Uso de almacenamiento de las fotos y cuotas
+
+- `storage_report`: total, promedio y p95 de bytes de imagen, reparaciones más
+  pesadas, crecimiento por mes y ahorro posible recomprimiendo. Todo con
+  agregados SQL sobre LENGTH(image_url): las imágenes nunca se cargan en Python.
+- `check_image_quota`: cuota por imagen y total, verificada al guardar una
+  imagen. El total suma solo image_metadata.stored_size (sin tocar la tabla
+  de reparaciones); se repite dentro de la transacción que guarda la imagen
+  para que dos escrituras simultáneas no pasen ambas la cuota. Cada escritura
+  de imagen guarda sus metadatos; las imágenes anteriores a la tabla se
+  registran una vez con `python scan_images.py` (también lo hace el escaneo
+  al iniciar la API).
+
+Uso:
+    python storage.py            # reporte en consola
+    python storage.py --json     # reporte en JSON
+"""
+
+import argparse
+import json
+import os
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import ImageMetadata, RepairCard
+from services.image_pipeline import LARGE_IMAGE_BYTES
+
+# Cuotas (0 = sin límite), sobre el tamaño guardado (data URI)
+MAX_IMAGE_STORED_KB = int(os.getenv("MAX_IMAGE_STORED_KB", 0))
+MAX_TOTAL_IMAGES_MB = int(os.getenv("MAX_TOTAL_IMAGES_MB", 0))
+
+# Clave del advisory lock de PostgreSQL que serializa las escrituras que cuentan la cuota total
+QUOTA_LOCK_KEY = 0x51554f5441  # "QUOTA"
+
+# Tamaño típico de una foto ya comprimida (800px, JPEG q85) si aún no hay datos
+TYPICAL_COMPRESSED_BYTES = 100 * 1024
+
+
+class QuotaExceededError(Exception):
+    """La imagen supera la cuota por imagen o la cuota total"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# === CUOTAS ===
+
+def used_image_bytes(db: Session, exclude_repair_id: Optional[int] = None) -> int:
+    """Bytes ocupados por las imágenes guardadas, según image_metadata"""
+    query = db.query(func.coalesce(func.sum(ImageMetadata.stored_size), 0))
+    if exclude_repair_id is not None:
+        query = query.filter(ImageMetadata.repair_id != exclude_repair_id)
+    return int(query.scalar())
+
+
+def lock_image_quota(db: Session):
+    """Serializar hasta el commit las transacciones que guardan imágenes (en SQLite ya lo están)"""
+    if db.get_bind().dialect.name == 'postgresql':
+        db.execute(select(func.pg_advisory_xact_lock(QUOTA_LOCK_KEY)))
+
+
+def check_image_quota(db: Session, stored_size: int, repair_id: Optional[int] = None,
+                      max_image_kb: Optional[int] = None, max_total_mb: Optional[int] = None,
+                      lock: bool = False):
+    """
+    Verificar las cuotas antes de guardar una imagen de `stored_size` bytes.
+    Si la imagen reemplaza la de `repair_id`, la anterior no cuenta para el total.
+    Con `lock=True` (dentro de la transacción que guarda la imagen) el total se
+    cuenta con el lock de cuota tomado.
+    """
+    max_image_kb = MAX_IMAGE_STORED_KB if max_image_kb is None else max_image_kb
+    max_total_mb = MAX_TOTAL_IMAGES_MB if max_total_mb is None else max_total_mb
+
+    if max_image_kb and stored_size > max_image_kb * 1024:
+        raise QuotaExceededError(
+            f"La imagen ocupa {stored_size / 1024:.0f}KB y el máximo es {max_image_kb}KB", status_code=413
+        )
+
+    if max_total_mb:
+        if lock:
+            lock_image_quota(db)
+        used = used_image_bytes(db, exclude_repair_id=repair_id)
+        if used + stored_size > max_total_mb * 1024 * 1024:
+            raise QuotaExceededError(
+                f"Espacio para imágenes agotado: {used / 1024 / 1024:.1f}MB usados de {max_total_mb}MB",
+                status_code=507
+            )
+
+
+# === REPORTE ===
+
+def _month_bucket(db: Session, column):
+    """Expresión 'YYYY-MM' según el motor"""
+    if db.get_bind().dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def _percentile(db: Session, size_column, filters, count: int, fraction: float) -> int:
+    """Percentil por posición (ORDER BY ... OFFSET), válido en cualquier motor"""
+    if not count:
+        return 0
+    offset = min(count - 1, int(count * fraction))
+    return db.query(size_column).filter(*filters).order_by(size_column).offset(offset).limit(1).scalar() or 0
+
+
+def storage_report(db: Session, top: int = 10) -> dict:
+    """Reporte de almacenamiento de imágenes (solo agregados SQL)"""
+    size = func.length(RepairCard.image_url)
+    has_image = [RepairCard.image_url.isnot(None), RepairCard.image_url != '']
+
+    count, total, average, largest = db.query(
+        func.count(RepairCard.id),
+        func.coalesce(func.sum(size), 0),
+        func.coalesce(func.avg(size), 0),
+        func.coalesce(func.max(size), 0),
+    ).filter(*has_image).one()
+
+    largest_cards = [
+        {'id': repair_id, 'owner_name': owner_name, 'bytes': image_bytes}
+        for repair_id, owner_name, image_bytes in db.query(RepairCard.id, RepairCard.owner_name, size)
+        .filter(*has_image).order_by(size.desc()).limit(top)
+    ]
+
+    month = _month_bucket(db, RepairCard.created_at)
+    growth = [
+        {'month': bucket, 'images': images, 'bytes': int(image_bytes or 0)}
+        for bucket, images, image_bytes in db.query(month, func.count(RepairCard.id), func.sum(size))
+        .filter(*has_image).group_by(month).order_by(month)
+    ]
+
+    # Ahorro posible: las imágenes grandes quedarían del tamaño típico ya comprimido
+    typical = db.query(func.avg(ImageMetadata.stored_size)).filter(
+        ImageMetadata.is_valid.is_(True),
+        ImageMetadata.width <= 800,
+        ImageMetadata.stored_size <= LARGE_IMAGE_BYTES,
+    ).scalar()
+    typical = int(typical or TYPICAL_COMPRESSED_BYTES)
+    candidates, candidate_bytes = db.query(
+        func.count(RepairCard.id), func.coalesce(func.sum(size), 0)
+    ).filter(*has_image, size > LARGE_IMAGE_BYTES).one()
+    potential_savings = max(0, int(candidate_bytes) - candidates * typical)
+
+    report = {
+        'images': count,
+        'total_bytes': int(total),
+        'average_bytes': int(average),
+        'p95_bytes': int(_percentile(db, size, has_image, count, 0.95)),
+        'max_bytes': int(largest),
+        'largest_cards': largest_cards,
+        'growth_by_month': growth,
+        'recompression': {
+            'candidates': candidates,
+            'candidate_bytes': int(candidate_bytes),
+            'typical_compressed_bytes': typical,
+            'potential_savings_bytes': potential_savings,
+        },
+        'quotas': {
+            'max_image_kb': MAX_IMAGE_STORED_KB or None,
+            'max_total_mb': MAX_TOTAL_IMAGES_MB or None,
+        },
+    }
+
+    # En PostgreSQL: qué parte de la base son fotos
+    if db.get_bind().dialect.name == 'postgresql':
+        table_bytes, database_bytes = db.query(
+            func.pg_total_relation_size('repair_cards'),
+            func.pg_database_size(func.current_database()),
+        ).one()
+        report['table_bytes'] = table_bytes
+        report['database_bytes'] = database_bytes
+
+    return report
+
+
+def print_report(report: dict):
+    mb = lambda value: f"{value / 1024 / 1024:.2f} MB"
+    print(f"📊 Imágenes: {report['images']} ({mb(report['total_bytes'])})")
+    print(f"   Promedio: {report['average_bytes'] / 1024:.1f} KB | p95: {report['p95_bytes'] / 1024:.1f} KB "
+          f"| Máxima: {report['max_bytes'] / 1024:.1f} KB")
+    if 'database_bytes' in report:
+        share = report['total_bytes'] / report['database_bytes'] * 100 if report['database_bytes'] else 0
+        print(f"   Base de datos: {mb(report['database_bytes'])} (fotos ~{share:.0f}%)")
+
+    print("\n🏋️ Reparaciones más pesadas:")
+    for card in report['largest_cards']:
+        print(f"   - ID {card['id']} ({card['owner_name']}): {card['bytes'] / 1024:.1f} KB")
+
+    print("\n📈 Crecimiento por mes:")
+    for month in report['growth_by_month']:
+        print(f"   {month['month']}: {month['images']} imágenes, {mb(month['bytes'])}")
+
+    recompression = report['recompression']
+    print(f"\n🗜️ Recompresión: {recompression['candidates']} imágenes grandes "
+          f"({mb(recompression['candidate_bytes'])}), ahorro posible ~{mb(recompression['potential_savings_bytes'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reporte de almacenamiento de imágenes")
+    parser.add_argument("--top", type=int, default=10, help="Cantidad de reparaciones más pesadas")
+    parser.add_argument("--json", action="store_true", help="Imprimir el reporte en JSON")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        report = storage_report(db, top=args.top)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
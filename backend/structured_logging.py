@@ -0,0 +1,233 @@
+"""
+Logging estructurado y no bloqueante.
+
+- Una línea JSON por evento (LOG_FORMAT=json) o texto legible (LOG_FORMAT=text).
+- El handler solo encola: el formateo y la escritura a stdout ocurren en un
+  hilo aparte (QueueListener). Si la cola se llena, los registros se descartan
+  y se cuentan en vez de bloquear la petición.
+- Cada registro lleva el `request_id` de la petición (header X-Request-ID o
+  uno generado), que también se devuelve en la respuesta.
+- Muestreo por evento para los de alto volumen: LOG_SAMPLE_RATES="repair.status_changed=0.1".
+- Nivel global (LOG_LEVEL) y por módulo: LOG_LEVELS="crud=WARNING,query_audit=DEBUG".
+
+Uso:
+    logger = logging.getLogger(__name__)
+    log_event(logger, "repair.created", "Reparación creada", repair_id=12)
+"""
+
+import copy
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback si orjson no está instalado
+    orjson = None
+    import json
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+REQUEST_ID_HEADER = "x-request-id"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Atributos propios de LogRecord: todo lo demás son campos del evento (extra=...)
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+_request_id: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def parse_mapping(value: str) -> Dict[str, str]:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}"""
+    pairs = (part.split('=', 1) for part in value.split(',') if '=' in part)
+    return {name.strip(): setting.strip() for name, setting in pairs}
+
+
+def log_event(logger: logging.Logger, event: str, message: str, level: int = logging.INFO, **fields):
+    """Registrar un evento con nombre y campos estructurados"""
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'event': event, **fields})
+
+
+# === FILTROS ===
+
+class RequestIdFilter(logging.Filter):
+    """Agregar el request_id de la petición en curso (se evalúa en el hilo que registra)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Dejar pasar solo una fracción de los eventos configurados"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None or rate >= 1:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+# === HANDLER Y FORMATOS ===
+
+class DroppingQueueHandler(QueueHandler):
+    """Encola sin bloquear; si la cola está llena descarta y cuenta"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver el mensaje y la traza aquí: args y exc_info no cruzan al otro hilo
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            payload['request_id'] = record.request_id
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                payload[name] = value
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(payload, default=str).decode()
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo (campos del evento al final)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {name: value for name, value in vars(record).items() if name not in RECORD_ATTRIBUTES}
+        if getattr(record, 'request_id', None):
+            fields['request_id'] = record.request_id
+        if fields:
+            line += ' ' + ' '.join(f'{name}={value}' for name, value in fields.items())
+        return line
+
+
+# === CONFIGURACIÓN ===
+
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging(level: str = None, levels: str = None, log_format: str = None,
+                  sample_rates: str = None, queue_size: int = None,
+                  stream: TextIO = None) -> DroppingQueueHandler:
+    """Configurar el logger raíz (idempotente); devuelve el handler de la cola"""
+    global _listener, queue_handler
+    if queue_handler is not None:
+        return queue_handler
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(TextFormatter() if (log_format or LOG_FORMAT) == 'text' else JsonFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(queue_size or LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestIdFilter())
+    rates = {event: float(rate) for event, rate in parse_mapping(sample_rates or LOG_SAMPLE_RATES).items()}
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel((level or LOG_LEVEL).upper())
+    for module, module_level in parse_mapping(levels if levels is not None else LOG_LEVELS).items():
+        logging.getLogger(module).setLevel(module_level.upper())
+
+    _listener = QueueListener(queue_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+    return queue_handler
+
+
+def shutdown_logging():
+    """Vaciar la cola y detener el hilo de escritura"""
+    global _listener, queue_handler
+    if _listener is not None:
+        if queue_handler.dropped:
+            logging.getLogger(__name__).warning(f"Registros descartados por cola llena: {queue_handler.dropped}")
+        _listener.stop()
+        logging.getLogger().removeHandler(queue_handler)
+    _listener = None
+    queue_handler = None
+
+
+# === MIDDLEWARE ===
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI que asigna un request_id a cada petición (respeta el
+    X-Request-ID entrante si es válido) y lo devuelve en la respuesta.
+    Debe ser el más externo para que todo lo que se registre lo lleve.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
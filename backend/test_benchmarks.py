@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los datos sintéticos y de la prueba de carga: misma semilla,
+mismas fotos y filas; la prueba de carga solo escribe en su propia base.
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.images import make_photo
+from generate_data import SyntheticShop
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def test_same_seed_generates_same_photo():
+    assert make_photo((96, 64), seed=5).tobytes() == make_photo((96, 64), seed=5).tobytes()
+    assert make_photo((96, 64), seed=5).tobytes() != make_photo((96, 64), seed=6).tobytes()
+
+
+def test_same_seed_generates_same_rows():
+    end_date = datetime(2026, 10, 19)
+    first = SyntheticShop(seed=7, end_date=end_date)
+    second = SyntheticShop(seed=7, end_date=end_date)
+
+    assert first.photos == second.photos
+    assert list(first.rows(50)) == list(second.rows(50))
+
+
+def test_load_test_only_touches_its_own_database(tmp_path):
+    production = tmp_path / "prod.db"
+    production.write_bytes(b"no tocar")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{production}",
+        "PYTHONPATH": str(BACKEND_DIR),
+        "LOG_LEVEL": "WARNING",
+    }
+
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_test", "--cards", "5", "--concurrency", "1",
+         "--iterations", "1", "--output", str(tmp_path / "result.json")],
+        cwd=tmp_path, env=env, check=True, capture_output=True, timeout=120,
+    )
+
+    assert production.read_bytes() == b"no tocar"
+    assert (tmp_path / "loadtest.db").exists()
+    assert not (tmp_path / "repair_cards.db").exists()
+    assert (tmp_path / "result.json").exists()
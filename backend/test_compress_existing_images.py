@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Pruebas de compress_existing_images.py: una imagen reemplazada mientras se
+comprimía el lote (aunque tenga el mismo largo) no se pisa, y solo las filas
+actualizadas reciben metadatos.
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from benchmarks.images import encode, make_photo, to_data_uri
+from compress_existing_images import CompressionJob
+from models import Base, ImageMetadata, RepairCard
+
+PHOTO = to_data_uri(encode(make_photo((1200, 900), seed=1)))
+# Otra foto del mismo largo que PHOTO (mismo data URI con un carácter base64 distinto)
+SAME_LENGTH = PHOTO[:-8] + ("B" if PHOTO[-8] != "B" else "C") + PHOTO[-7:]
+MIN_SIZE = 1000
+
+
+def add_repairs(engine, count: int):
+    with Session(engine) as db:
+        for i in range(count):
+            db.add(RepairCard(owner_name=f"Cliente {i}", problem_type="Pantalla", whatsapp_number="3001234567",
+                              due_date=datetime(2026, 10, 19), status="ingresado", image_url=PHOTO))
+        db.commit()
+
+
+def replace_during_compression(job: CompressionJob, changes: dict):
+    """Aplicar `changes` (id -> data URI) justo antes de que el job escriba el lote"""
+    write_batch = job.write_batch
+
+    def racing_write(updates):
+        with job.engine.begin() as conn:
+            set_version = ", version = version + 1" if job.has_version else ""
+            for repair_id, image_url in changes.items():
+                conn.execute(text(f"UPDATE repair_cards SET image_url = :image_url{set_version} WHERE id = :id"),
+                             {'id': repair_id, 'image_url': image_url})
+        return write_batch(updates)
+
+    job.write_batch = racing_write
+
+
+def images(engine) -> dict:
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT id, image_url FROM repair_cards ORDER BY id")).all())
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_rows_replaced_during_compression_survive(tmp_path, monkeypatch, returning):
+    engine = create_engine(f"sqlite:///{tmp_path / 'repairs.db'}")
+    monkeypatch.setattr(engine.dialect, "update_returning", returning)
+    Base.metadata.create_all(bind=engine)
+    add_repairs(engine, 3)
+
+    job = CompressionJob(engine, workers=1, min_size=MIN_SIZE, checkpoint_path=str(tmp_path / "checkpoint.json"))
+    # 2: otra imagen de otro largo; 3: otra imagen del mismo largo
+    replace_during_compression(job, {2: PHOTO + "AAAA", 3: SAME_LENGTH})
+    stats = job.run()
+
+    stored = images(engine)
+    assert len(stored[1]) < len(PHOTO)
+    assert stored[2] == PHOTO + "AAAA"
+    assert stored[3] == SAME_LENGTH
+    assert stats['compressed'] == 1
+    with Session(engine) as db:
+        assert [repair.version for repair in db.query(RepairCard).order_by(RepairCard.id)] == [2, 2, 2]
+        assert [record.repair_id for record in db.query(ImageMetadata)] == [1]
+
+
+def test_without_version_column_compares_the_whole_image(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE repair_cards (id INTEGER PRIMARY KEY, image_url TEXT)"))
+        for repair_id in (1, 2):
+            conn.execute(text("INSERT INTO repair_cards (id, image_url) VALUES (:id, :image_url)"),
+                         {'id': repair_id, 'image_url': PHOTO})
+
+    job = CompressionJob(engine, workers=1, min_size=MIN_SIZE, checkpoint_path=str(tmp_path / "checkpoint.json"))
+    assert not job.has_version and not job.has_metadata
+    replace_during_compression(job, {2: SAME_LENGTH})
+    job.run()
+
+    stored = images(engine)
+    assert len(stored[1]) < len(PHOTO)
+    assert stored[2] == SAME_LENGTH
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Pruebas del control de concurrencia optimista: If-Match en PUT y PATCH de
+estado (409 con versión vieja, versión y ETag nuevos con la correcta) y
+reintento de notas agregadas al mismo tiempo sin If-Match.
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main
+from crud import VersionConflictError, repair_crud
+from database import get_db
+from models import Base, RepairCard
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    # Archivo y no memoria: cada sesión con su propia conexión y transacción
+    engine = create_engine(f"sqlite:///{tmp_path / 'repairs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(RepairCard(owner_name="Ana", problem_type="Pantalla", whatsapp_number="3001234567",
+                      due_date=datetime(2026, 10, 19), status="ingresado", notes=[]))
+    db.commit()
+    db.close()
+    yield Session
+    engine.dispose()
+
+
+@pytest.fixture
+def client(sessions, monkeypatch):
+    def override_db():
+        session = sessions()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(main, "IMAGE_SCAN_ON_STARTUP", False)
+    main.app.dependency_overrides[get_db] = override_db
+    try:
+        with TestClient(main.app) as test_client:
+            yield test_client
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+
+
+def stored(sessions, repair_id: int = 1) -> RepairCard:
+    db = sessions()
+    try:
+        return db.get(RepairCard, repair_id)
+    finally:
+        db.close()
+
+
+def test_parse_if_match():
+    assert main.parse_if_match(None) is None
+    assert main.parse_if_match("*") is None
+    assert main.parse_if_match('"3"') == 3
+    assert main.parse_if_match('W/"4"') == 4
+    assert main.parse_if_match("5") == 5
+    with pytest.raises(HTTPException) as error:
+        main.parse_if_match('"abc"')
+    assert error.value.status_code == 400
+
+
+def test_stale_if_match_is_rejected(client, sessions):
+    response = client.put("/api/repairs/1", json={"description": "Cambio de display"},
+                          headers={"If-Match": '"7"'})
+    assert response.status_code == 409
+    assert response.headers["ETag"] == '"1"'
+
+    response = client.patch("/api/repairs/1/status", json={"status": "listos", "note": "Lista"},
+                            headers={"If-Match": '"7"'})
+    assert response.status_code == 409
+
+    repair = stored(sessions)
+    assert (repair.version, repair.description, repair.status, repair.notes) == (1, "", "ingresado", [])
+
+
+def test_matching_if_match_bumps_version(client, sessions):
+    response = client.put("/api/repairs/1", json={"description": "Cambio de display"},
+                          headers={"If-Match": '"1"'})
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == '"2"'
+
+    response = client.patch("/api/repairs/1/status", json={"status": "diagnosticada"},
+                            headers={"If-Match": response.headers["ETag"]})
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] == '"3"'
+
+    repair = stored(sessions)
+    assert (repair.version, repair.description, repair.status) == (3, "Cambio de display", "diagnosticada")
+
+
+def test_conditional_update_with_stale_version(sessions):
+    db = sessions()
+    try:
+        with pytest.raises(VersionConflictError) as error:
+            repair_crud._conditional_update(db, 1, 9, {"description": "x"})
+        assert (error.value.expected_version, error.value.current_version) == (9, 1)
+        assert repair_crud._conditional_update(db, 2, None, {"description": "x"}) is False
+    finally:
+        db.close()
+    assert stored(sessions).description == ""
+
+
+def test_concurrent_notes_without_if_match_both_survive(client, sessions, monkeypatch):
+    read_repair = repair_crud.get_repair_by_id
+    raced = []
+
+    def racing_read(db, repair_id):
+        repair = read_repair(db, repair_id)
+        # Otra petición agrega su nota entre la lectura y la escritura de esta
+        if not raced:
+            raced.append(repair.version)
+            other = sessions()
+            try:
+                repair_crud.add_note_to_repair(other, repair_id, "Nota B")
+            finally:
+                other.close()
+        return repair
+
+    monkeypatch.setattr(repair_crud, "get_repair_by_id", racing_read)
+
+    response = client.patch("/api/repairs/1/status", json={"status": "diagnosticada", "note": "Nota A"})
+
+    assert response.status_code == 200, response.text
+    assert raced == [1]
+    repair = stored(sessions)
+    assert repair.version == 3
+    assert sorted(note["content"] for note in repair.notes) == ["Nota A", "Nota B"]
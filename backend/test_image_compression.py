@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Pruebas de calidad de la compresión con Pillow (decodificación draft de JPEG)
+
+Compara la salida de ImageServicePillow contra el camino anterior (decodificar
+la imagen completa, reducir con LANCZOS y guardar JPEG con la misma calidad)
+usando SSIM por bloques contra la referencia sin pérdida.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+from benchmarks.images import encode, make_photo, to_data_uri
+from services.image_service_pillow import ImageServicePillow
+
+# SSIM mínimo entre la salida nueva y la del camino anterior
+MIN_PARITY_SSIM = 0.97
+# Pérdida máxima de SSIM (contra la referencia sin pérdida) respecto al camino anterior
+MAX_SSIM_DROP = 0.01
+
+
+def ssim(a: Image.Image, b: Image.Image, block: int = 8) -> float:
+    """SSIM medio sobre bloques de 8x8 en escala de grises"""
+    assert a.size == b.size, f"{a.size} != {b.size}"
+    width, height = a.size
+    pixels_a = a.convert('L').load()
+    pixels_b = b.convert('L').load()
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    total, count = 0.0, 0
+    for y0 in range(0, height - block + 1, block):
+        for x0 in range(0, width - block + 1, block):
+            values_a = [pixels_a[x, y] for y in range(y0, y0 + block) for x in range(x0, x0 + block)]
+            values_b = [pixels_b[x, y] for y in range(y0, y0 + block) for x in range(x0, x0 + block)]
+            n = len(values_a)
+            mean_a = sum(values_a) / n
+            mean_b = sum(values_b) / n
+            var_a = sum((v - mean_a) ** 2 for v in values_a) / n
+            var_b = sum((v - mean_b) ** 2 for v in values_b) / n
+            cov = sum((va - mean_a) * (vb - mean_b) for va, vb in zip(values_a, values_b)) / n
+            total += ((2 * mean_a * mean_b + c1) * (2 * cov + c2)) / (
+                (mean_a ** 2 + mean_b ** 2 + c1) * (var_a + var_b + c2)
+            )
+            count += 1
+    return total / count
+
+
+def photo_bytes(size, orientation: int = 1) -> bytes:
+    exif = Image.Exif()
+    if orientation != 1:
+        exif[0x0112] = orientation
+    return encode(make_photo(size, seed=7), exif=exif.tobytes())
+
+
+def reference(data: bytes, max_width: int = 800) -> Image.Image:
+    """Decodificación completa + LANCZOS + rotación (camino sin draft)"""
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(data)).convert('RGB'))
+    height = round(img.height * max_width / img.width)
+    return img.resize((max_width, height), Image.Resampling.LANCZOS)
+
+
+def legacy(data: bytes, quality: int = 85) -> Image.Image:
+    """Salida del camino anterior: referencia guardada como JPEG"""
+    buffer = io.BytesIO()
+    reference(data).save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def assert_quality_parity(output: Image.Image, data: bytes) -> float:
+    expected = reference(data)
+    previous = legacy(data)
+    parity = ssim(output, previous)
+    assert parity >= MIN_PARITY_SSIM, f"SSIM vs camino anterior {parity:.4f} < {MIN_PARITY_SSIM}"
+    drop = ssim(previous, expected) - ssim(output, expected)
+    assert drop <= MAX_SSIM_DROP, f"Pérdida de SSIM {drop:.4f} > {MAX_SSIM_DROP}"
+    return parity
+
+
+def compress(service: ImageServicePillow, data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(service.compress_image_bytes(to_data_uri(data))))
+
+
+def test_draft_decoding_keeps_quality():
+    service = ImageServicePillow()
+    data = photo_bytes((4032, 3024))
+
+    output = compress(service, data)
+
+    assert output.size == (800, 600), output.size
+    score = assert_quality_parity(output, data)
+    print(f"✅ SSIM draft vs decodificación completa: {score:.4f}")
+
+
+def test_exif_orientation_applied_after_resize():
+    service = ImageServicePillow()
+    data = photo_bytes((4032, 3024), orientation=6)
+
+    output = compress(service, data)
+
+    # Foto vertical: el ancho visible es el que se limita a 800px
+    assert output.size == (800, 1067), output.size
+    score = assert_quality_parity(output, data)
+    print(f"✅ Orientación EXIF aplicada, SSIM: {score:.4f}")
+
+
+def test_small_images_are_not_resized():
+    service = ImageServicePillow()
+    output = compress(service, photo_bytes((640, 480)))
+    assert output.size == (640, 480), output.size
+    print("✅ Imágenes pequeñas conservan su tamaño")
+
+
+if __name__ == "__main__":
+    test_draft_decoding_keeps_quality()
+    test_exif_orientation_applied_after_resize()
+    test_small_images_are_not_resized()
+
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Pruebas de migrate_db.py entre dos bases SQLite locales
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import MetaData, Table, create_engine, select, text, update
+
+import migrate_db
+from checkpoints import load_checkpoint
+from generate_data import generate
+from models import Base, RepairCard
+
+TOTAL_ROWS = 23
+
+
+def make_databases(directory: str):
+    source_url = f"sqlite:///{directory}/origen.db"
+    target_url = f"sqlite:///{directory}/destino.db"
+    source = create_engine(source_url)
+    target = create_engine(target_url)
+    Base.metadata.create_all(source)
+    Base.metadata.create_all(target)
+
+    generate(source, TOTAL_ROWS, batch_size=10, seed=7, image_sizes={'tiny': 1}, image_ratio=0.5,
+             end_date=datetime(2026, 10, 19, 9, 0, 0, 250000))
+    # Casos que el generador no produce: imagen NULL y centavos
+    with source.begin() as conn:
+        conn.execute(update(RepairCard).where(RepairCard.id % 5 == 0).values(image_url=None))
+        conn.execute(update(RepairCard).where(RepairCard.id % 3 == 0).values(estimated_cost=Decimal("1500.50")))
+    return source_url, target_url, source, target
+
+
+def table_rows(engine):
+    """Filas con tipos (SQLite guarda los DATETIME como texto con formatos distintos)"""
+    table = Table("repair_cards", MetaData(), autoload_with=engine)
+    with engine.connect() as conn:
+        return conn.execute(select(table).order_by(table.c.id)).fetchall()
+
+
+def migrate(source_url, target_url, checkpoint, *extra):
+    return migrate_db.main([
+        "--source", source_url, "--target", target_url,
+        "--batch-size", "4", "--concurrency", "3", "--checkpoint", checkpoint, *extra,
+    ])
+
+
+def test_migration_copies_all_rows():
+    with tempfile.TemporaryDirectory() as directory:
+        source_url, target_url, source, target = make_databases(directory)
+        checkpoint = os.path.join(directory, "checkpoint.json")
+
+        stats = migrate(source_url, target_url, checkpoint)
+
+        assert stats['rows'] == TOTAL_ROWS
+        assert table_rows(target) == table_rows(source)
+        assert not os.path.exists(checkpoint)
+        print(f"✅ {TOTAL_ROWS} filas migradas y verificadas")
+
+
+def test_migration_resumes_from_checkpoint():
+    with tempfile.TemporaryDirectory() as directory:
+        source_url, target_url, source, target = make_databases(directory)
+        checkpoint = os.path.join(directory, "checkpoint.json")
+
+        # Fallar el cuarto lote (ids 13..16)
+        original_write = migrate_db.TableMigration.write_batch
+
+        def failing_write(self, number, rows):
+            if number == 3:
+                raise RuntimeError("conexión perdida")
+            return original_write(self, number, rows)
+
+        migrate_db.TableMigration.write_batch = failing_write
+        try:
+            migrate(source_url, target_url, checkpoint)
+            raise AssertionError("La migración debía fallar")
+        except SystemExit:
+            pass
+        finally:
+            migrate_db.TableMigration.write_batch = original_write
+
+        # El checkpoint no salta el lote fallido aunque terminen lotes posteriores
+        assert load_checkpoint(checkpoint)['last_id'] == 12, load_checkpoint(checkpoint)
+
+        stats = migrate(source_url, target_url, checkpoint)
+        assert stats['rows'] >= TOTAL_ROWS
+        assert table_rows(target) == table_rows(source)
+        print("✅ Migración reanudada desde el checkpoint")
+
+
+def test_checksum_detects_altered_rows():
+    with tempfile.TemporaryDirectory() as directory:
+        source_url, target_url, source, target = make_databases(directory)
+        checkpoint = os.path.join(directory, "checkpoint.json")
+        # El destino modifica silenciosamente lo que se escribe
+        with target.begin() as conn:
+            conn.execute(text("""
+                CREATE TRIGGER alter_owner AFTER INSERT ON repair_cards
+                BEGIN
+                    UPDATE repair_cards SET owner_name = 'otro' WHERE id = NEW.id AND NEW.id = 6;
+                END
+            """))
+
+        try:
+            migrate(source_url, target_url, checkpoint)
+            raise AssertionError("La verificación debía fallar")
+        except SystemExit:
+            pass
+        assert load_checkpoint(checkpoint)['last_id'] == 4, load_checkpoint(checkpoint)
+        print("✅ Checksum por lote detecta diferencias")
+
+
+if __name__ == "__main__":
+    test_migration_copies_all_rows()
+    test_migration_resumes_from_checkpoint()
+    test_checksum_detects_altered_rows()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Pruebas del auditor de consultas: contar filas y bytes leídos no cambia lo
+que devuelve la consulta (ORM, resultados por lotes y sentencias sin filas).
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from models import Base, RepairCard
+from query_audit import QueryAuditor, normalize_sql
+
+IMAGE = "data:image/jpeg;base64," + "A" * 4000
+CARDS = 25
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'repairs.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        for i in range(CARDS):
+            db.add(RepairCard(owner_name=f"Cliente {i}", problem_type="Pantalla", whatsapp_number="3001234567",
+                              due_date=datetime(2026, 10, 19), status="ingresado",
+                              image_url=IMAGE if i % 2 == 0 else ""))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def audited(engine, label: str = "prueba"):
+    return QueryAuditor(engine, explain=False).install().audit(label)
+
+
+def test_orm_select_rows_and_bytes(engine):
+    with Session(engine) as db, audited(engine) as audit:
+        cards = db.query(RepairCard.id, RepairCard.image_url).order_by(RepairCard.id).all()
+
+    assert [(card.id, card.image_url) for card in cards] == [
+        (i + 1, IMAGE if i % 2 == 0 else "") for i in range(CARDS)
+    ]
+    [record] = audit.statements
+    assert record.is_select
+    assert record.rows == CARDS
+    # 8 bytes por id + el largo de cada imagen
+    assert record.bytes == CARDS * 8 + len(IMAGE) * ((CARDS + 1) // 2)
+
+
+def test_batched_results_are_counted_intact(engine):
+    with Session(engine) as db, audited(engine) as audit:
+        cards = db.scalars(select(RepairCard).order_by(RepairCard.id).execution_options(yield_per=4))
+        owners = [card.owner_name for card in cards]
+
+    assert owners == [f"Cliente {i}" for i in range(CARDS)]
+    [record] = audit.statements
+    assert record.rows == CARDS
+    assert record.bytes > len(IMAGE) * ((CARDS + 1) // 2)
+
+
+def test_statements_without_rows_use_rowcount(engine):
+    with Session(engine) as db, audited(engine) as audit:
+        db.execute(update(RepairCard).where(RepairCard.id <= 3).values(status="listos"))
+        db.commit()
+
+    [record] = [record for record in audit.statements if record.normalized.startswith("UPDATE")]
+    assert (record.rows, record.bytes) == (3, 0)
+
+
+def test_normalize_sql_groups_literals_and_in_lists():
+    assert normalize_sql("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'") == \
+        normalize_sql("SELECT * FROM t WHERE id IN (?, ?) AND name = 'y'")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Prueba de equivalencia entre la serialización rápida y RepairCardResponse
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, RepairCard
+from schemas import RepairCardResponse
+from serializers import REPAIR_COLUMNS, serialize_repair_rows
+
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def seed(db):
+    now = datetime(2026, 10, 19, 12, 30, 15, 123456)
+    db.add_all([
+        RepairCard(
+            owner_name="María Pérez",
+            problem_type="Pantalla rota",
+            whatsapp_number="+573001234567",
+            due_date=now + timedelta(days=2),
+            description="Cambio de display",
+            status="diagnosticada",
+            priority="high",
+            estimated_cost=Decimal("150000.50"),
+            actual_cost=Decimal("0"),
+            image_url="data:image/jpeg;base64,/9j/4AAQ",
+            has_charger=True,
+            created_at=now,
+            updated_at=now,
+            notes=[{"content": "Llegó sin batería", "author": "Juan", "type": "user_note"}],
+        ),
+        RepairCard(
+            owner_name="Pedro",
+            problem_type="No enciende",
+            whatsapp_number="3109876543",
+            due_date=now,
+            status="ingresado",
+            priority="normal",
+            created_at=now,
+            updated_at=now,
+        ),
+    ])
+    db.commit()
+
+
+def test_fast_serializer_matches_response_model():
+    db = make_session()
+    seed(db)
+
+    repairs = db.query(RepairCard).order_by(RepairCard.id).all()
+    expected = [RepairCardResponse.model_validate(repair).model_dump(mode="json") for repair in repairs]
+
+    rows = db.query(*REPAIR_COLUMNS).order_by(RepairCard.id).all()
+    actual = json.loads(serialize_repair_rows(rows))
+
+    assert actual == expected, f"\n{actual}\n!=\n{expected}"
+    print(f"✅ {len(actual)} reparaciones serializadas de forma equivalente")
+
+
+if __name__ == "__main__":
+    test_fast_serializer_matches_response_model()
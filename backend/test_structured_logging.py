@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Pruebas del logging estructurado: request_id por petición (también en el
+threadpool), muestreo por evento, cola que descarta sin bloquear y campos
+extra en el JSON.
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+import io
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import structured_logging
+from structured_logging import (
+    DroppingQueueHandler, JsonFormatter, RequestIdMiddleware, SamplingFilter,
+    current_request_id, log_event, setup_logging, shutdown_logging,
+)
+
+logger = logging.getLogger("test_structured_logging")
+
+
+@pytest.fixture
+def output():
+    """setup_logging() hacia un stream en memoria; devuelve una función que lee las líneas JSON"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    setup_logging(level="INFO", levels="", log_format="json", sample_rates="", stream=stream)
+
+    def lines() -> list:
+        shutdown_logging()  # vacía la cola antes de leer
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    try:
+        yield lines
+    finally:
+        shutdown_logging()
+        root.handlers, root.level = handlers, level
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/async")
+    async def async_endpoint():
+        log_event(logger, "test.async", "En el event loop")
+        return {"request_id": current_request_id()}
+
+    @app.get("/sync")
+    def sync_endpoint():
+        # Las rutas def corren en el threadpool
+        log_event(logger, "test.sync", "En el threadpool")
+        return {"request_id": current_request_id()}
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def record(event: str = None, **fields) -> logging.LogRecord:
+    extra = {'event': event, **fields} if event else fields
+    return logging.makeLogRecord({'name': 'prueba', 'levelno': logging.INFO, 'levelname': 'INFO',
+                                  'msg': 'mensaje', **extra})
+
+
+def test_valid_request_id_is_reused_and_echoed(client):
+    response = client.get("/async", headers={"X-Request-ID": "pedido-123"})
+
+    assert response.headers["X-Request-ID"] == "pedido-123"
+    assert response.json()["request_id"] == "pedido-123"
+
+
+@pytest.mark.parametrize("request_id", [None, "", "con espacios", "x" * 65, "a\"b"])
+def test_invalid_request_id_is_replaced(client, request_id):
+    headers = {"X-Request-ID": request_id} if request_id is not None else {}
+
+    response = client.get("/async", headers=headers)
+
+    generated = response.headers["X-Request-ID"]
+    assert generated != request_id
+    assert structured_logging.REQUEST_ID_PATTERN.match(generated)
+    assert response.json()["request_id"] == generated
+
+
+def test_request_id_reaches_threadpool_logs(client, output):
+    response = client.get("/sync", headers={"X-Request-ID": "hilo-1"})
+    client.get("/async", headers={"X-Request-ID": "loop-2"})
+
+    assert response.json()["request_id"] == "hilo-1"
+    events = {line["event"]: line for line in output() if line.get("event", "").startswith("test.")}
+    assert events["test.sync"]["request_id"] == "hilo-1"
+    assert events["test.async"]["request_id"] == "loop-2"
+    assert current_request_id() is None
+
+
+def test_sampling_filter(monkeypatch):
+    sampling = SamplingFilter({'alto.volumen': 0.25, 'nunca': 0.0, 'siempre': 1.0})
+
+    assert sampling.filter(record('otro'))
+    assert sampling.filter(record())
+    assert sampling.filter(record('siempre'))
+    assert not sampling.filter(record('nunca'))
+
+    monkeypatch.setattr(structured_logging.random, "random", lambda: 0.2)
+    sampled = record('alto.volumen')
+    assert sampling.filter(sampled)
+    assert sampled.sample_rate == 0.25
+    monkeypatch.setattr(structured_logging.random, "random", lambda: 0.3)
+    assert not sampling.filter(record('alto.volumen'))
+
+
+def test_dropping_queue_handler_counts_drops():
+    handler = DroppingQueueHandler(queue.Queue(2))
+
+    for _ in range(5):
+        handler.handle(record('lleno'))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_queue_handler_resolves_args_and_exceptions():
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("falló")
+    except ValueError:
+        error = logging.makeLogRecord({'msg': 'reparación %s', 'args': (7,), 'exc_info': sys.exc_info()})
+
+    handler.handle(error)
+
+    queued = handler.queue.get_nowait()
+    assert (queued.msg, queued.args, queued.exc_info) == ("reparación 7", None, None)
+    assert "ValueError: falló" in queued.exc_text
+
+
+def test_json_formatter_emits_extra_fields():
+    formatted = json.loads(JsonFormatter().format(record('repair.created', repair_id=12, status='ingresado')))
+
+    assert formatted["message"] == "mensaje"
+    assert formatted["level"] == "INFO"
+    assert formatted["logger"] == "prueba"
+    assert (formatted["event"], formatted["repair_id"], formatted["status"]) == ("repair.created", 12, "ingresado")
+    assert "request_id" not in formatted
+
+
+def test_setup_logging_writes_json_lines(output):
+    log_event(logger, "repair.deleted", "Reparación eliminada", repair_id=3)
+    log_event(logger, "repair.debug", "No se registra", level=logging.DEBUG)
+
+    [line] = [line for line in output() if line["logger"] == logger.name]
+    assert (line["event"], line["repair_id"], line["message"]) == ("repair.deleted", 3, "Reparación eliminada")
+
+
+def test_api_configures_logging_on_startup(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "IMAGE_SCAN_ON_STARTUP", False)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    shutdown_logging()
+    try:
+        assert structured_logging.queue_handler is None
+        with TestClient(main.app):
+            assert root.handlers == [structured_logging.queue_handler]
+        assert structured_logging.queue_handler is None
+    finally:
+        shutdown_logging()
+        root.handlers, root.level = handlers, level
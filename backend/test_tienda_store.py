@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Pruebas del store de la tienda: ningún pedido se pierde con
+POST /orders en paralelo, lo que queda en disco coincide con la memoria y
+el diario de pedidos sobrevive snapshots y líneas incompletas; el backend
+SQLite filtra y pagina con índices a partir de los JSON importados.
+"""
+import importlib
+import json
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+PARALLEL_ORDERS = 200
+WORKERS = 16
+
+
+def load_app(data_dir, monkeypatch):
+    monkeypatch.setenv("TIENDA_DATA_DIR", str(data_dir))
+    sys.modules.pop("app.main", None)
+    return importlib.import_module("app.main")
+
+
+def test_parallel_orders_are_not_lost(tmp_path, monkeypatch):
+    tienda = load_app(tmp_path, monkeypatch)
+
+    with TestClient(tienda.app) as client:
+        def place_order(i):
+            response = client.post("/orders", json={
+                "name": f"Cliente {i}",
+                "email": f"cliente{i}@example.com",
+                "address": "Calle 1",
+                "items": [{"product_id": "pc-01", "qty": 1}, {"product_id": "sp-03", "qty": 2}],
+            })
+            assert response.status_code == 200, response.text
+            return response.json()["id"]
+
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            ids = list(pool.map(place_order, range(PARALLEL_ORDERS)))
+
+        listed = client.get("/orders").json()
+
+    assert len(set(ids)) == PARALLEL_ORDERS
+    assert {order["id"] for order in listed} == set(ids)
+    assert all(order["total_usd"] == 1497 for order in listed)
+
+    # Cada pedido quedó en el diario, una línea por alta
+    journal = (tmp_path / "orders.ndjson").read_text(encoding="utf-8").splitlines()
+    assert {json.loads(line)["id"] for line in journal} == set(ids)
+
+    # Un proceso nuevo lee lo mismo que quedó en memoria
+    tienda.orders_store.close()
+    reloaded = load_app(tmp_path, monkeypatch)
+    assert [order["id"] for order in reloaded.orders_store.list()] == [order["id"] for order in listed]
+
+
+def test_products_crud_persists(tmp_path, monkeypatch):
+    tienda = load_app(tmp_path, monkeypatch)
+    product = {"name": "Mouse", "description": "Inalámbrico", "price": 25, "category": "accesorios", "image": ""}
+
+    with TestClient(tienda.app) as client:
+        created = client.post("/products", json=product).json()
+        assert client.get("/products").json()[0]["id"] == created["id"]
+        assert client.put(f"/products/{created['id']}", json={**product, "price": 30}).json()["price"] == 30
+        assert client.delete("/products/pc-01").status_code == 200
+        assert client.delete("/products/pc-01").status_code == 404
+        assert client.put("/rates", json={"USD": 1, "EUR": 0.9, "COP": 4000, "MXN": 18}).status_code == 200
+
+    reloaded = load_app(tmp_path, monkeypatch)
+    products = reloaded.products_store.list()
+    assert products[0] == {"id": created["id"], **product, "price": 30}
+    assert reloaded.products_store.get("pc-01") is None
+    assert len(products) == 6
+    assert reloaded.rates_store.get()["COP"] == 4000
+
+
+def test_order_journal_snapshot_and_partial_line(tmp_path):
+    from app.journal import JournaledCollection
+
+    orders = JournaledCollection(tmp_path / "orders.json", snapshot_every=10)
+    ids = [orders.add({"n": i})["id"] for i in range(25)]
+    orders.close()
+
+    # Las primeras altas pasaron al snapshot (newest-first); el resto sigue en el diario.
+    # El snapshot se copia en segundo plano y puede incluir también altas del diario nuevo
+    snapshot = json.loads((tmp_path / "orders.json").read_text(encoding="utf-8"))
+    journal = [json.loads(line)["id"] for line in
+               (tmp_path / "orders.ndjson").read_text(encoding="utf-8").splitlines()]
+    assert len(snapshot) >= 10 and len(journal) < 10
+    assert [order["id"] for order in snapshot] == ids[:len(snapshot)][::-1]
+    assert journal == ids[len(ids) - len(journal):]
+    assert len(snapshot) + len(journal) >= len(ids)
+    assert not (tmp_path / "orders.ndjson.compacting").exists()
+
+    # Caída a mitad de una línea: se descarta y la siguiente alta queda bien
+    with (tmp_path / "orders.ndjson").open("a", encoding="utf-8") as journal:
+        journal.write('{"id":"roto","n":')
+    orders = JournaledCollection(tmp_path / "orders.json", snapshot_every=10)
+    assert [order["id"] for order in orders.list()] == ids[::-1]
+    last = orders.add({"n": 25})
+    orders.close()
+
+    reloaded = JournaledCollection(tmp_path / "orders.json")
+    assert [order["id"] for order in reloaded.list()] == [last["id"]] + ids[::-1]
+    reloaded.close()
+
+
+def test_sqlite_backend_filters_paginates_and_imports(tmp_path, monkeypatch):
+    from app.sqlite_store import import_json
+
+    # Datos JSON con pedidos en snapshot y en diario
+    tienda = load_app(tmp_path, monkeypatch)
+    ids = []
+    with TestClient(tienda.app) as client:
+        for i in range(12):
+            if i == 8:
+                tienda.orders_store.snapshot()
+            ids.append(client.post("/orders", json={
+                "name": "Cliente", "email": f"c{i % 3}@example.com", "address": "Calle 1",
+                "items": [{"product_id": "sp-01", "qty": 1}],
+            }).json()["id"])
+    tienda.orders_store.close()
+    assert len(json.loads((tmp_path / "orders.json").read_text(encoding="utf-8"))) == 8
+
+    counts = import_json(tmp_path, tmp_path / "tienda.db")
+    assert counts == {"products": 6, "orders": 12, "rates": 4}
+
+    monkeypatch.setenv("TIENDA_STORAGE", "sqlite")
+    tienda = load_app(tmp_path, monkeypatch)
+    with TestClient(tienda.app) as client:
+        assert [o["id"] for o in client.get("/orders").json()] == ids[::-1]
+        page = client.get("/orders", params={"limit": 5, "offset": 5}).json()
+        assert [o["id"] for o in page] == ids[::-1][5:10]
+        by_email = client.get("/orders", params={"email": "c1@example.com"}).json()
+        assert [o["id"] for o in by_email] == [ids[i] for i in range(12) if i % 3 == 1][::-1]
+        assert client.get(f"/orders/{ids[0]}").json()["items"] == [{"product_id": "sp-01", "qty": 1}]
+        assert client.get("/orders", params={"limit": 0}).status_code == 422
+
+        speakers = client.get("/products", params={"category": "parlantes"}).json()
+        assert [p["id"] for p in speakers] == ["sp-01", "sp-02", "sp-03"]
+        created = client.post("/orders", json={
+            "name": "Nuevo", "email": "n@example.com", "address": "Calle 2",
+            "items": [{"product_id": "pc-02", "qty": 2}],
+        }).json()
+        assert created["total_usd"] == 1798
+        assert client.get("/orders", params={"limit": 1}).json()[0]["id"] == created["id"]
+        assert client.put("/rates", json={"USD": 1, "EUR": 0.9, "COP": 4000, "MXN": 18}).json()["COP"] == 4000
+        assert client.get("/rates").json()["COP"] == 4000
+
+    # Las consultas filtradas usan los índices
+    connection = sqlite3.connect(tmp_path / "tienda.db")
+    plan = " ".join(str(row) for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM orders WHERE email = ? ORDER BY rowid DESC LIMIT 5", ("x",)
+    ))
+    assert "ix_orders_email" in plan
+    plan = " ".join(str(row) for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM products WHERE category = ? ORDER BY rowid DESC", ("x",)
+    ))
+    assert "ix_products_category" in plan
+    connection.close()
+
+
+def test_sqlite_rates_fall_back_to_defaults(tmp_path, monkeypatch):
+    from app.sqlite_store import import_json
+
+    # Datos sin rates.json: la base importada queda sin tasas
+    (tmp_path / "products.json").write_text("[]", encoding="utf-8")
+    assert import_json(tmp_path, tmp_path / "tienda.db")["rates"] == 0
+
+    monkeypatch.setenv("TIENDA_STORAGE", "sqlite")
+    tienda = load_app(tmp_path, monkeypatch)
+    with TestClient(tienda.app) as client:
+        response = client.get("/rates")
+        assert response.status_code == 200
+        assert response.json() == tienda.DEFAULT_RATES
+
+
+def test_reimport_keeps_newer_orders_first(tmp_path, monkeypatch):
+    from app.sqlite_store import import_json
+
+    tienda = load_app(tmp_path, monkeypatch)
+    with TestClient(tienda.app) as client:
+        imported = [client.post("/orders", json={
+            "name": "Cliente", "email": "c@example.com", "address": "Calle 1",
+            "items": [{"product_id": "sp-01", "qty": 1}],
+        }).json()["id"] for _ in range(3)]
+    tienda.orders_store.snapshot()
+    tienda.orders_store.close()
+    import_json(tmp_path, tmp_path / "tienda.db")
+
+    monkeypatch.setenv("TIENDA_STORAGE", "sqlite")
+    tienda = load_app(tmp_path, monkeypatch)
+    with TestClient(tienda.app) as client:
+        created = client.post("/orders", json={
+            "name": "Nuevo", "email": "n@example.com", "address": "Calle 2",
+            "items": [{"product_id": "pc-02", "qty": 1}],
+        }).json()["id"]
+
+    # Reimportar los JSON (con un pedido corregido) no sube los pedidos viejos sobre el nuevo
+    orders = json.loads((tmp_path / "orders.json").read_text(encoding="utf-8"))
+    [first] = [order for order in orders if order["id"] == imported[0]]
+    first["address"] = "Calle 9"
+    (tmp_path / "orders.json").write_text(json.dumps(orders), encoding="utf-8")
+    import_json(tmp_path, tmp_path / "tienda.db")
+
+    tienda = load_app(tmp_path, monkeypatch)
+    with TestClient(tienda.app) as client:
+        assert [o["id"] for o in client.get("/orders").json()] == [created] + imported[::-1]
+        assert client.get(f"/orders/{imported[0]}").json()["address"] == "Calle 9"
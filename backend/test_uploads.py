@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Pruebas de POST /api/repairs/{id}/image: límite de tamaño (413), archivos que
+no son imagen (415), una subida multipart correcta que queda guardada y la
+cuota total de imágenes (507).
+"""
+import os
+os.environ["DATABASE_URL"] = "sqlite://"  # nunca la base configurada por el desarrollador
+
+import io
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import main
+import storage
+import uploads
+from database import get_db
+from models import Base, RepairCard
+from scan_images import ImageScanner
+
+
+def png_bytes(size=(32, 24)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def sessions():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(RepairCard(owner_name="Ana", problem_type="Pantalla", whatsapp_number="3001234567",
+                      due_date=datetime(2026, 10, 19), status="ingresado"))
+    db.commit()
+    db.close()
+    return Session
+
+
+@pytest.fixture
+def client(sessions, monkeypatch):
+    Session = sessions
+
+    def override_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(main, "IMAGE_SCAN_ON_STARTUP", False)
+    main.app.dependency_overrides[get_db] = override_db
+    try:
+        with TestClient(main.app) as test_client:
+            yield test_client
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+
+
+def test_upload_over_size_cap_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_IMAGE_UPLOAD_MB", 1)
+    data = png_bytes() + b"\0" * (1024 * 1024)
+
+    response = client.post("/api/repairs/1/image", files={"file": ("foto.png", data, "image/png")})
+
+    assert response.status_code == 413
+    assert not client.get("/api/repairs/1").json()["image_url"]
+
+
+def test_upload_of_non_image_is_rejected(client):
+    response = client.post(
+        "/api/repairs/1/image", files={"file": ("foto.png", b"%PDF-1.7 no es una imagen", "image/png")}
+    )
+    assert response.status_code == 415
+
+    response = client.post("/api/repairs/1/image", content=b"hola", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_multipart_upload_is_stored(client):
+    data = png_bytes()
+
+    response = client.post("/api/repairs/1/image", files={"file": ("foto.png", data, "image/png")})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["image_url"].startswith("data:image/png;base64,")
+    assert response.headers["ETag"] == f'"{body["version"]}"'
+
+    image = client.get("/api/images/1")
+    assert image.status_code == 200
+    assert image.content == data
+
+
+def test_total_quota_counts_backfilled_images(client, sessions, monkeypatch):
+    monkeypatch.setattr(storage, "MAX_TOTAL_IMAGES_MB", 1)
+    # Imagen anterior a image_metadata: el escaneo la registra una vez y desde ahí cuenta
+    db = sessions()
+    db.add(RepairCard(owner_name="Luis", problem_type="Batería", whatsapp_number="3007654321",
+                      due_date=datetime(2026, 10, 19), status="ingresado",
+                      image_url="data:image/jpeg;base64," + "A" * (1024 * 1024)))
+    db.commit()
+    db.close()
+    ImageScanner(sessions).run()
+
+    response = client.post("/api/repairs/1/image", files={"file": ("foto.png", png_bytes(), "image/png")})
+
+    assert response.status_code == 507
+
+
+def test_total_quota_is_rechecked_inside_the_write(client, sessions, monkeypatch):
+    monkeypatch.setattr(storage, "MAX_TOTAL_IMAGES_MB", 1)
+    # Otra escritura entra después de la verificación previa del endpoint
+    monkeypatch.setattr(main, "enforce_image_quota", lambda *args, **kwargs: None)
+    db = sessions()
+    db.add(RepairCard(owner_name="Luis", problem_type="Batería", whatsapp_number="3007654321",
+                      due_date=datetime(2026, 10, 19), status="ingresado",
+                      image_url="data:image/jpeg;base64," + "A" * (1024 * 1024)))
+    db.commit()
+    db.close()
+    ImageScanner(sessions).run()
+
+    response = client.post("/api/repairs/1/image", files={"file": ("foto.png", png_bytes(), "image/png")})
+
+    assert response.status_code == 507
+    assert not client.get("/api/repairs/1").json()["image_url"]
+
+
+def test_corrupt_image_is_rejected(client):
+    # Cabecera PNG válida (pasa el sniff) pero datos que Pillow no puede abrir
+    data = png_bytes()[:16] + b"\0" * 512
+
+    response = client.post("/api/repairs/1/image", files={"file": ("foto.png", data, "image/png")})
+
+    assert response.status_code == 400
+    assert "Imagen inválida" in response.text, response.text
@@ -0,0 +1,165 @@
+"""
+Subida de imágenes en binario (multipart/form-data o cuerpo image/*).
+
+El cuerpo se lee en streaming hacia un `SpooledTemporaryFile` (memoria hasta
+`UPLOAD_SPOOL_BYTES`, disco después) cortando en cuanto supera el límite, y el
+tipo se valida con los primeros bytes del archivo en lugar de confiar en el
+Content-Type o el nombre enviados por el cliente.
+"""
+
+import os
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+
+from starlette.requests import Request
+
+from services.image_pipeline import sniff_image_type
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # nombre anterior del paquete python-multipart
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Tamaño máximo de una foto subida
+MAX_IMAGE_UPLOAD_MB = int(os.getenv("MAX_IMAGE_UPLOAD_MB", 15))
+# A partir de este tamaño el buffer temporal pasa de memoria a disco
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+# Bytes necesarios para reconocer el formato
+SNIFF_BYTES = 16
+# Campos del formulario que se aceptan como archivo
+FILE_FIELDS = (b'file', b'image')
+
+
+class UploadError(Exception):
+    """Subida rechazada; `status_code` es el código HTTP a devolver"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ImageUpload:
+    """Archivo subido en un buffer temporal con su tipo detectado"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.file = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        self.size = 0
+        self.mime_type: Optional[str] = None
+        self._head = b''
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(
+                f"La imagen supera el máximo de {self.max_bytes // (1024 * 1024)}MB", status_code=413
+            )
+        if self.mime_type is None:
+            self._head += chunk[:SNIFF_BYTES]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        self.file.write(chunk)
+
+    def _sniff(self):
+        self.mime_type = sniff_image_type(self._head)
+        if self.mime_type is None:
+            raise UploadError("El archivo no es una imagen soportada", status_code=415)
+
+    def finish(self) -> 'ImageUpload':
+        if self.size == 0:
+            raise UploadError("No se recibió ninguna imagen")
+        if self.mime_type is None:
+            self._sniff()
+        self.file.seek(0)
+        return self
+
+    def read(self) -> bytes:
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+
+async def read_image_upload(request: Request, max_bytes: Optional[int] = None) -> ImageUpload:
+    """
+    Leer la imagen de la petición sin cargar el cuerpo completo en memoria.
+
+    Acepta `multipart/form-data` (campo `file` o `image`) o el binario directo
+    con Content-Type `image/*` / `application/octet-stream`.
+    """
+    max_bytes = max_bytes or MAX_IMAGE_UPLOAD_MB * 1024 * 1024
+
+    # Rechazar antes de leer si el cliente ya declara un cuerpo demasiado grande
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + 64 * 1024:
+        raise UploadError(f"La imagen supera el máximo de {max_bytes // (1024 * 1024)}MB", status_code=413)
+
+    upload = ImageUpload(max_bytes)
+    try:
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type == b'multipart/form-data':
+            await _read_multipart(request, params.get(b'boundary'), upload)
+        elif content_type.startswith(b'image/') or content_type == b'application/octet-stream':
+            async for chunk in request.stream():
+                upload.write(chunk)
+        else:
+            raise UploadError("Content-Type debe ser multipart/form-data o image/*", status_code=415)
+        return upload.finish()
+    except Exception:
+        upload.close()
+        raise
+
+
+async def _read_multipart(request: Request, boundary: Optional[bytes], upload: ImageUpload):
+    """Pasar el cuerpo por el parser de python-multipart escribiendo solo la parte del archivo"""
+    if not boundary:
+        raise UploadError("Falta el boundary de multipart/form-data")
+
+    state = {'header_field': b'', 'headers': {}, 'target': False, 'found': False}
+
+    def on_part_begin():
+        state['headers'] = {}
+
+    def on_header_field(data, start, end):
+        state['header_field'] += data[start:end]
+
+    def on_header_value(data, start, end):
+        field = state['header_field'].lower()
+        state['headers'][field] = state['headers'].get(field, b'') + data[start:end]
+
+    def on_header_end():
+        state['header_field'] = b''
+
+    def on_headers_finished():
+        _, options = parse_options_header(state['headers'].get(b'content-disposition', b''))
+        # Solo la primera parte de archivo con un nombre de campo aceptado
+        state['target'] = (
+            not state['found'] and options.get(b'name') in FILE_FIELDS and b'filename' in options
+        )
+        state['found'] = state['found'] or state['target']
+
+    def on_part_data(data, start, end):
+        if state['target']:
+            upload.write(data[start:end])
+
+    parser = MultipartParser(boundary, {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': on_part_data,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except UploadError:
+        raise
+    except Exception as e:
+        raise UploadError(f"Cuerpo multipart inválido: {e}")
+
+    if not state['found']:
+        raise UploadError("Falta el archivo (campo 'file' o 'image')")
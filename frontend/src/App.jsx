@@ -82,7 +82,8 @@ function App() {
 
   const handleUpdateRepair = async (id, payload) => {
     try {
-      const data = await repairService.updateRepair(id, payload)
+      const current = repairs.find((repair) => repair.id === id)
+      const data = await repairService.updateRepair(id, payload, current?.version)
       setRepairs((prev) => prev.map((repair) => (repair.id === id ? data : repair)))
       setEditingRepair(null)
       setIsModalOpen(false)
@@ -111,7 +112,8 @@ function App() {
 
   const handleStatusChange = async (id, newStatus) => {
     try {
-      const data = await repairService.changeStatus(id, newStatus)
+      const current = repairs.find((repair) => repair.id === id)
+      const data = await repairService.changeStatus(id, newStatus, '', current?.version)
       setRepairs((prev) => prev.map((repair) => (repair.id === id ? data : repair)))
       const statusNames = {
         ingresado: 'Ingresado',
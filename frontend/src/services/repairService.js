@@ -170,13 +170,15 @@ export const repairService = {
     return normalizeRepair(transformKeysToCamel(response.data))
   },
 
-  async updateRepair(id, data) {
-    const response = await api.put(`${API_PREFIX}/repairs/${id}`, data)
+  async updateRepair(id, data, version) {
+    const headers = version ? { 'If-Match': `"${version}"` } : {}
+    const response = await api.put(`${API_PREFIX}/repairs/${id}`, data, { headers })
     return normalizeRepair(transformKeysToCamel(response.data))
   },
 
-  async changeStatus(id, status, note = '') {
-    const response = await api.patch(`${API_PREFIX}/repairs/${id}/status`, { status, note })
+  async changeStatus(id, status, note = '', version) {
+    const headers = version ? { 'If-Match': `"${version}"` } : {}
+    const response = await api.patch(`${API_PREFIX}/repairs/${id}/status`, { status, note }, { headers })
     return normalizeRepair(transformKeysToCamel(response.data))
   },
 
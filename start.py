@@ -48,6 +48,11 @@ def build_frontend():
         print("❌ No se generó el directorio dist")
         return False
     
+    # Generar variantes .br/.gz para servirlas sin comprimir en cada petición
+    print("🗜️  Precomprimiendo archivos estáticos...")
+    if not run_command(f"{sys.executable} precompress_static.py", cwd="backend"):
+        return False
+    
     print("✅ Frontend construido exitosamente")
     return True
 